@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark (test de charge) : parc de faux players réparti sur 1, 2, 4... processus.
+
+Chaque worker fait tourner un superviseur sur sa part des `--players` faux
+players (fakes.fake_box : statut JSON complet décodé à chaque itération, aucun
+appel réseau). CHECK_INTERVAL=0 : chaque moteur boucle sans attendre, le débit
+mesure donc la capacité CPU. On compare les itérations de contrôle par seconde,
+tous workers confondus, au débit d'un seul processus.
+
+Le gain n'est quasi linéaire que jusqu'au nombre de cœurs de la machine.
+
+Usage: python benchmarks/bench_fleet.py [--players 300] [--seconds 3] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Lu par config.py dans les workers (processus neufs) : moteurs sans pause, pas de mapping externe
+os.environ["CHECK_INTERVAL"] = "0"
+os.environ["CHANNEL_MAPPING_FILE"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import fake_box
+from freetv.core.fleet import FleetRunner
+from freetv.core.supervisor import PlayerConfig
+
+
+async def throughput(players, workers: int, seconds: float) -> float:
+    """Itérations de contrôle par seconde, mesurées entre deux rapports de chaque worker."""
+    fleet = FleetRunner(players, workers=workers, client_factory=fake_box, report_interval=0.25)
+    async with fleet:
+        task = asyncio.ensure_future(fleet.run())
+        # Chauffe : tous les workers ont rapporté au moins une itération par player
+        while len(fleet.reports) < len(fleet.shards) or fleet.health()["totals"]["steps"] < len(players):
+            await asyncio.sleep(0.05)
+        first = dict(fleet.reports)
+        await asyncio.sleep(seconds)
+        last = dict(fleet.reports)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def steps(report):
+        return sum(state.get("steps", 0) for state in report["players"].values())
+
+    return sum((steps(last[i]) - steps(first[i])) / (last[i]["at"] - first[i]["at"]) for i in first)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--workers", default="", help="nombres de processus à comparer (défaut : 1, 2, 4... jusqu'aux cœurs)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= max(2, cores):
+            counts.append(counts[-1] * 2)
+    players = [PlayerConfig(f"box{i}", f"10.0.{i // 250}.{i % 250}") for i in range(args.players)]
+
+    print(f"⏱️  {args.players} faux players, {args.seconds:.0f} s par mesure, {cores} cœur(s)\n")
+    print(f"{'workers':>8} {'itérations/s':>14} {'gain':>7} {'efficacité':>11}")
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        rate = asyncio.run(throughput(players, workers, args.seconds))
+        baseline = baseline or rate
+        speedup = rate / baseline
+        print(f"{workers:>8} {rate:>14.0f} {speedup:>6.2f}x {speedup / workers:>10.0%}"
+              f"   ({time.perf_counter() - start:.1f} s)")
+    if max(counts) > cores:
+        print(f"\n⚠️  Au-delà de {cores} cœur(s), les workers se partagent le CPU : gain plafonné")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
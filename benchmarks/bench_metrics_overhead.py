@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark : coût de l'instrumentation (compteurs, histogrammes, décorateur).
+
+Usage: python benchmarks/bench_metrics_overhead.py [--calls 200000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.core.metrics import MetricsRegistry, instrumented
+
+
+async def bare() -> bool:
+    return True
+
+
+@instrumented("bench")
+async def wrapped() -> bool:
+    return True
+
+
+async def per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - start) / calls
+
+
+def main(calls: int) -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "Bench.", ("call", "outcome"))
+    histogram = registry.histogram("bench_seconds", "Bench.", ("call",))
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        counter.inc("status", "ok")
+    inc_ns = (time.perf_counter() - start) / calls * 1e9
+
+    start = time.perf_counter()
+    for i in range(calls):
+        histogram.observe((i % 1000) / 1000, "status")
+    observe_ns = (time.perf_counter() - start) / calls * 1e9
+
+    start = time.perf_counter()
+    for _ in range(100):
+        registry.render()
+    render_us = (time.perf_counter() - start) / 100 * 1e6
+
+    overhead_ns = (asyncio.run(per_call(wrapped, calls)) - asyncio.run(per_call(bare, calls))) * 1e9
+
+    print(f"🧪 {calls} opérations")
+    print(f"  Counter.inc          {inc_ns:7.0f} ns")
+    print(f"  Histogram.observe    {observe_ns:7.0f} ns")
+    print(f"  @instrumented        {overhead_ns:7.0f} ns de plus par appel Freebox")
+    print(f"  render (/metrics)    {render_us:7.0f} µs par scrape")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200000)
+    main(parser.parse_args().calls)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout : latence du mute/démute, appels API et CPU.
+
+Le vrai AutoMuteEngine (vrais FreeboxClient et OqeeClient) tourne contre un
+faux Freebox OS et un faux OQEE servis en HTTP par un processus séparé, avec
+latence et gigue réglables. Les pubs sont courtes et rapprochées pour avoir
+beaucoup de transitions en peu de temps (UNMUTE_BUFFER et AD_MERGE_MAX_GAP
+sont réduits via l'environnement, comme le ferait un utilisateur).
+
+Mesures :
+  - début de pub (moins le buffer) → mute effectif sur la box : percentiles
+  - fin de pub → démute effectif sur la box : percentiles
+  - appels API par minute (Freebox et OQEE, par route)
+  - CPU consommé par le moteur, ramené à une heure de visionnage
+
+Usage: python benchmarks/bench_mute_latency.py [--duration 60] [--fbx-latency 0.03] ...
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Réglages lus par freetv.config à l'import : pubs rapprochées non fusionnées
+os.environ.setdefault("UNMUTE_BUFFER", "1")
+os.environ.setdefault("AD_MERGE_MAX_GAP", "1")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import aiohttp
+
+from fakes import FakeFreebox, FakeOqee, LocalFreeboxClient, start_server
+from freetv.config import UNMUTE_BUFFER
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+from freetv.core.scheduler import MuteTransition, build_transitions
+from freetv.models import AdBreak
+
+
+def serve(conn, ad_breaks: List[Tuple[int, int]], args: argparse.Namespace) -> None:
+    """Processus serveur : les faux services ne comptent pas dans le CPU du moteur."""
+    async def run() -> None:
+        oqee = FakeOqee(ad_breaks, args.oqee_latency, args.oqee_jitter, seed=1)
+        fbx = FakeFreebox(latency=args.fbx_latency, jitter=args.fbx_jitter, seed=2)
+        runners = []
+        urls = []
+        for app in (oqee.app(), fbx.app()):
+            runner, url = await start_server(app)
+            runners.append(runner)
+            urls.append(url)
+        conn.send(urls)
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        for runner in runners:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile au rang le plus proche."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def match_latencies(
+    expected: List[MuteTransition], events: List[Tuple[float, bool]],
+) -> Dict[bool, List[Optional[float]]]:
+    """Associe chaque transition attendue au premier changement d'état correspondant sur la box."""
+    latencies: Dict[bool, List[Optional[float]]] = {True: [], False: []}
+    for i, transition in enumerate(expected):
+        deadline = expected[i + 1].at if i + 1 < len(expected) else float("inf")
+        match = next(
+            (at for at, mute in events if mute == transition.mute and transition.at - 0.5 <= at < deadline),
+            None,
+        )
+        latencies[transition.mute].append(None if match is None else match - transition.at)
+    return latencies
+
+
+def describe(label: str, latencies: List[Optional[float]]) -> str:
+    measured = [lat for lat in latencies if lat is not None]
+    missed = len(latencies) - len(measured)
+    if not measured:
+        return f"  {label} : aucune mesure ({missed} ratées)"
+    stats = " | ".join(
+        f"p{q} {percentile(measured, q) * 1000:6.1f} ms" for q in (50, 95, 99)
+    )
+    return f"  {label} : {stats} | max {max(measured) * 1000:6.1f} ms (n={len(measured)}, ratées={missed})"
+
+
+def describe_calls(name: str, requests: Dict[str, int], minutes: float) -> str:
+    total = sum(requests.values()) / minutes
+    detail = ", ".join(f"{route} {count / minutes:.1f}" for route, count in sorted(requests.items()))
+    return f"  {name:<7} {total:6.1f} /min ({detail})"
+
+
+async def main(args: argparse.Namespace) -> None:
+    now = int(time.time())
+    first = now + args.warmup
+    ads = [
+        (start, start + args.ad_length)
+        for start in range(first, now + args.warmup + int(args.duration) - args.ad_length, args.ad_period)
+    ]
+
+    ctx = multiprocessing.get_context("spawn")
+    conn, child_conn = ctx.Pipe()
+    server = ctx.Process(target=serve, args=(child_conn, ads, args), daemon=True)
+    server.start()
+    oqee_url, fbx_url = conn.recv()
+
+    engine = AutoMuteEngine(fbx_client=LocalFreeboxClient(fbx_url), oqee_client=OqeeClient(base_url=oqee_url))
+    print(
+        f"🧪 {len(ads)} pubs de {args.ad_length}s toutes les {args.ad_period}s, "
+        f"Freebox {args.fbx_latency * 1000:.0f}±{args.fbx_jitter * 1000:.0f} ms, "
+        f"OQEE {args.oqee_latency * 1000:.0f}±{args.oqee_jitter * 1000:.0f} ms"
+    )
+    try:
+        async with engine:
+            wall_start = time.time()
+            cpu_start = time.process_time()
+            task = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(args.warmup + args.duration)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            cpu = time.process_time() - cpu_start
+            wall = time.time() - wall_start
+
+        async with aiohttp.ClientSession() as session:
+            stats = {}
+            for name, url in (("freebox", fbx_url), ("oqee", oqee_url)):
+                async with session.get(f"{url}/_stats") as response:
+                    stats[name] = await response.json()
+    finally:
+        conn.send("stop")
+        server.join(timeout=5)
+
+    merged = engine.oqee_client._merge_close_ad_breaks([AdBreak(start, end) for start, end in ads])
+    expected = [t for t in build_transitions(merged, UNMUTE_BUFFER) if wall_start < t.at < wall_start + wall - 1]
+    latencies = match_latencies(expected, [tuple(event) for event in stats["freebox"]["mute_events"]])
+
+    minutes = wall / 60
+    print("⏱️  Latence (transition prévue → changement appliqué par la box)")
+    print(describe("🔇 début de pub → mute  ", latencies[True]))
+    print(describe("🔊 fin de pub → démute  ", latencies[False]))
+    print("📡 Appels API")
+    print(describe_calls("Freebox", stats["freebox"]["requests"], minutes))
+    print(describe_calls("OQEE", stats["oqee"]["requests"], minutes))
+    print(f"⚙️  CPU moteur : {cpu:.2f} s en {wall:.0f} s, soit {cpu * 3600 / wall:.1f} s par heure de visionnage")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=60, help="durée de visionnage simulée (s)")
+    parser.add_argument("--warmup", type=int, default=4, help="délai avant la première pub (s)")
+    parser.add_argument("--ad-length", type=int, default=4)
+    parser.add_argument("--ad-period", type=int, default=10)
+    parser.add_argument("--fbx-latency", type=float, default=0.03)
+    parser.add_argument("--fbx-jitter", type=float, default=0.02)
+    parser.add_argument("--oqee-latency", type=float, default=0.08)
+    parser.add_argument("--oqee-jitter", type=float, default=0.04)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark : latence de fetch OQEE avec une session par appel vs session poolée.
+
+Lance un faux serveur OQEE local (aiohttp) puis mesure la latence de
+`OqeeClient.fetch_ad_breaks` :
+  - "par appel"  : la session est fermée après chaque requête (ancien comportement,
+                   nouvelle connexion TCP à chaque fetch)
+  - "poolée"     : une seule session keep-alive ouverte par `OqeeClient.open()`
+
+Usage: python benchmarks/bench_oqee_session.py [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+# Mesure la latence réseau, pas le budget de requêtes (lu par config.py)
+os.environ["OQEE_BUDGET_RATE"] = "0"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.core.oqee import OqeeClient
+
+
+def build_app() -> web.Application:
+    """Serveur minimal imitant /live/anti_adskipping/{id}."""
+    async def anti_adskipping(request: web.Request) -> web.Response:
+        now = int(time.time())
+        return web.json_response({
+            "success": True,
+            "result": {"periods": [
+                {"type": "ad_break", "start_time": now + 600, "end_time": now + 780},
+                {"type": "ad_break", "start_time": now + 1800, "end_time": now + 2010},
+            ]},
+        })
+
+    app = web.Application()
+    app.router.add_get("/live/anti_adskipping/{channel_id}", anti_adskipping)
+    return app
+
+
+async def measure(client: OqeeClient, n: int, reopen: bool) -> list:
+    """Mesure n fetchs successifs (en ms)."""
+    samples = []
+    for _ in range(n):
+        if reopen:
+            await client.close()
+        t0 = time.perf_counter()
+        await client.fetch_ad_breaks("536")
+        samples.append((time.perf_counter() - t0) * 1000)
+    await client.close()
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<12} moyenne {statistics.mean(samples):6.2f} ms"
+          f" | médiane {statistics.median(samples):6.2f} ms | p95 {p95:6.2f} ms")
+
+
+async def main(n: int) -> None:
+    runner = web.AppRunner(build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        print(f"🧪 {n} fetchs anti_adskipping sur {base_url}")
+        report("par appel", await measure(OqeeClient(base_url=base_url), n, reopen=True))
+        report("poolée", await measure(OqeeClient(base_url=base_url), n, reopen=False))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark : cadence de rafraîchissement OQEE fixe vs adaptative.
+
+Rejoue en temps virtuel une soirée synthétique sur une chaîne : un programme
+toutes les 50 min, une pub à chaque fin de programme et une au milieu. Chaque
+pub est publiée par l'API `--announce` secondes avant son début (une soirée par
+avance : par défaut 20 s, l'avance minimale OQEE_AD_ANNOUNCE_LEAD, puis 60 s), sans
+end_time (fin estimée à +5 min), puis sa vraie fin est publiée 2 min après son début.
+
+Compare les requêtes OQEE et l'écart des mutes/démutes aux instants idéaux
+(calculés sur le planning final) entre une cadence fixe (OQEE_REFRESH_MIN)
+et la cadence adaptative.
+
+Usage: python benchmarks/bench_refresh_cadence.py [--hours 4] [--announce 20 60]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.config import CHANNEL_MAPPING
+from freetv.core.oqee import EPG_WINDOW, epg_window_start
+from freetv.core.replay import Timeline, replay
+from freetv.core.scheduler import build_transitions
+from freetv.models import AdBreak
+
+CHANNEL = "uuid-webtv-612"
+PROGRAM = 3000
+AD_DURATION = 240
+END_PUBLISHED_AFTER = 120
+
+
+def synthetic_evening(start: int, hours: float, announce: int):
+    end = start + int(hours * 3600)
+    channel_id = CHANNEL_MAPPING[CHANNEL]
+    records = [
+        {"t": start, "kind": "player_status", "data": {
+            "power_state": "running",
+            "player": {"state": {"playback_state": "playing"}},
+            "foreground_app": {"context": {"channel": {"channelUuid": CHANNEL}}},
+        }},
+        {"t": end, "kind": "player_status", "data": {"power_state": "standby"}},
+    ]
+
+    # EPG : programmes de 50 min, publiés dès le début pour chaque fenêtre de 6 h
+    programs = list(range(start, end + PROGRAM, PROGRAM))
+    for window in range(epg_window_start(start), end + EPG_WINDOW, EPG_WINDOW):
+        entries = [
+            {"type": "live", "live": {"title": f"Programme {i}", "start": p, "end": p + PROGRAM}}
+            for i, p in enumerate(programs) if window <= p < window + EPG_WINDOW
+        ]
+        records.append({"t": start - 60, "kind": "oqee", "path": f"/epg/by_channel/{channel_id}/{window}",
+                        "data": {"success": True, "result": {"entries": entries}}})
+
+    # Une pub au milieu et une à la fin de chaque programme
+    ads = sorted(
+        ad for p in programs for ad in (p + PROGRAM // 2, p + PROGRAM - AD_DURATION)
+        if start + announce < ad < end - AD_DURATION
+    )
+    changes = sorted(
+        [(ad - announce, ad, False) for ad in ads] + [(ad + END_PUBLISHED_AFTER, ad, True) for ad in ads]
+    )
+    records.append({"t": start, "kind": "oqee", "path": f"/live/anti_adskipping/{channel_id}",
+                    "data": {"success": True, "result": {"periods": []}}})
+    published = {}
+    for t, ad, with_end in changes:
+        published[ad] = with_end
+        periods = [
+            {"type": "ad_break", "start_time": s, **({"end_time": s + AD_DURATION} if has_end else {})}
+            for s, has_end in sorted(published.items())
+        ]
+        records.append({"t": t, "kind": "oqee", "path": f"/live/anti_adskipping/{channel_id}",
+                        "data": {"success": True, "result": {"periods": periods}}})
+
+    ideal = build_transitions(AdBreak(ad, ad + AD_DURATION) for ad in ads)
+    return Timeline.from_records(records), ideal
+
+
+def run(timeline, ideal, adaptive: bool) -> dict:
+    def setup(engine):
+        client = engine.oqee_client
+        if not adaptive:
+            client.refresh_max = client.refresh_min
+
+    result = replay(timeline, setup=setup)
+    lags = {True: [], False: []}
+    for transition, decision in zip(ideal, result.decisions):
+        assert transition.mute == decision.mute
+        lags[decision.mute].append(decision.at - transition.at)
+    return {
+        "requests": result.oqee_requests,
+        "decisions": len(result.decisions),
+        "mute": lags[True],
+        "unmute": lags[False],
+    }
+
+
+def fmt(lags) -> str:
+    return f"moy {statistics.mean(lags):5.2f} s, max {max(lags):5.2f} s"
+
+
+def main(hours: float, announces: List[int]) -> None:
+    for announce in announces:
+        timeline, ideal = synthetic_evening(int(time.time()) // 3600 * 3600, hours, announce)
+        print(f"🧪 {hours:.0f} h sur une chaîne, {len(ideal) // 2} pubs annoncées {announce} s à l'avance\n")
+
+        results = {}
+        for name, adaptive in (("fixe", False), ("adaptative", True)):
+            results[name] = r = run(timeline, ideal, adaptive)
+            print(f"  {name:<11} {r['requests']:5d} requêtes OQEE | {r['decisions']}/{len(ideal)} transitions"
+                  f" | mute {fmt(r['mute'])} | démute {fmt(r['unmute'])}")
+
+        saved = 1 - results["adaptative"]["requests"] / results["fixe"]["requests"]
+        print(f"\n  → {saved:.0%} de requêtes en moins\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--announce", type=int, nargs="+", default=[20, 60],
+                        help="avances (s) de publication des pubs, une soirée par avance")
+    args = parser.parse_args()
+    main(args.hours, args.announce)
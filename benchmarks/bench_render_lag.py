@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark : retard de la boucle asyncio selon que le rendu Rich y est fait ou non.
+
+Fait tourner le vrai moteur (faux OQEE + faux Freebox) pendant quelques secondes
+avec un rendu à haute fréquence vers un terminal factice :
+  - "inline"   : le panneau est construit et poussé dans la boucle asyncio
+  - "renderer" : StatusRenderer, construction du panneau dans un thread dédié
+
+Usage: python benchmarks/bench_render_lag.py [--seconds 5] [--fps 30]
+"""
+import argparse
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.live import Live
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeFreeboxClient, build_oqee_app, start_server
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+from freetv.ui.display import StatusDisplay
+from freetv.ui.renderer import StatusRenderer
+
+
+async def inline_render(engine: AutoMuteEngine, live: Live, fps: float) -> None:
+    """Ancien fonctionnement : le rendu occupe la boucle asyncio."""
+    while True:
+        live.update(StatusDisplay.from_snapshot(engine.snapshot), refresh=True)
+        await asyncio.sleep(1 / fps)
+
+
+async def run(mode: str, base_url: str, seconds: float, fps: float) -> AutoMuteEngine:
+    engine = AutoMuteEngine(fbx_client=FakeFreeboxClient(), oqee_client=OqeeClient(base_url=base_url))
+    console = Console(file=io.StringIO(), force_terminal=True, width=100)
+    async with engine:
+        # Comme ui/app.py : chaque mode redessine lui-même (pas de thread de rafraîchissement Rich)
+        with Live(console=console, auto_refresh=False) as live:
+            if mode == "inline":
+                render = inline_render(engine, live, fps)
+            else:
+                render = StatusRenderer(engine, live, fps=fps).run()
+            tasks = [asyncio.ensure_future(engine.run()), asyncio.ensure_future(render)]
+            await asyncio.sleep(0.5)
+            engine.loop_lag.reset()
+            await asyncio.sleep(seconds)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return engine
+
+
+async def main(seconds: float, fps: float) -> None:
+    now = int(time.time())
+    # Beaucoup de pubs à venir pour alourdir le panneau
+    ads = [(now + 120 + i * 400, now + 300 + i * 400) for i in range(200)]
+    runner, base_url = await start_server(build_oqee_app(ads))
+    try:
+        print(f"🧪 Rendu à {fps:.0f} images/s pendant {seconds:.0f}s")
+        for mode in ("inline", "renderer"):
+            engine = await run(mode, base_url, seconds, fps)
+            lag = engine.loop_lag
+            print(f"  {mode:<9} retard boucle p50 {lag.percentile(50) * 1000:5.2f} ms"
+                  f" | p99 {lag.percentile(99) * 1000:5.2f} ms | max {lag.max_lag * 1000:5.2f} ms")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--fps", type=float, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.fps))
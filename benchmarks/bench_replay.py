@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark : rejeu d'une soirée synthétique en temps virtuel.
+
+Génère une soirée (zapping toutes les 40 min entre quatre chaînes, une page
+de pub toutes les 15 min, planning OQEE republié toutes les 5 min) et la
+rejoue avec le vrai moteur.
+
+Usage: python benchmarks/bench_replay.py [--hours 8]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.config import CHANNEL_MAPPING
+from freetv.core.replay import Timeline, replay
+
+CHANNELS = ["uuid-webtv-612", "uuid-webtv-613", "uuid-webtv-201", "uuid-webtv-373"]
+
+
+def synthetic_evening(start: int, hours: float) -> Timeline:
+    end = start + int(hours * 3600)
+    records = []
+    for i, t in enumerate(range(start, end, 2400)):
+        channel = CHANNELS[i % len(CHANNELS)]
+        records.append({"t": t, "kind": "player_status", "data": {
+            "power_state": "running",
+            "player": {"state": {"playback_state": "playing"}},
+            "foreground_app": {"context": {"channel": {"channelUuid": channel}}},
+        }})
+    records.append({"t": end, "kind": "player_status", "data": {"power_state": "standby"}})
+    for n, channel in enumerate(CHANNELS):
+        channel_id = CHANNEL_MAPPING[channel]
+        for t in range(start, end, 300):
+            # L'API publie les pubs passées et celle à venir dans la prochaine demi-heure
+            periods = [
+                {"type": "ad_break", "start_time": ad, "end_time": ad + 180}
+                for ad in range(start + 420 + n * 60, min(t + 1800, end), 900)
+            ]
+            records.append({"t": t, "kind": "oqee", "path": f"/live/anti_adskipping/{channel_id}",
+                            "data": {"success": True, "result": {"periods": periods}}})
+    return Timeline.from_records(records)
+
+
+def main(hours: float) -> None:
+    timeline = synthetic_evening(int(time.time()) // 3600 * 3600, hours)
+    result = replay(timeline)
+    mutes = sum(1 for decision in result.decisions if decision.mute)
+    print(f"🧪 {len(timeline.events)} réponses enregistrées sur {hours:.0f} h")
+    print(f"  rejeu en {result.wall_seconds:.2f} s (x{result.simulated_seconds / result.wall_seconds:,.0f})"
+          f" | {mutes} mutes, {len(result.decisions) - mutes} démutes | {result.oqee_requests} requêtes OQEE")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=8)
+    main(parser.parse_args().hours)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark : temps de démarrage et mémoire (RSS) du mode TUI face au mode --headless.
+
+Chaque mode est lancé dans un processus neuf contre un faux OQEE et un faux
+Freebox. On mesure le temps entre le lancement du processus et le premier
+snapshot publié par le moteur, puis le pic de RSS après quelques secondes.
+
+Usage: python benchmarks/bench_startup.py [--runs 3] [--seconds 2]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+async def child(mode: str, base_url: str, seconds: float) -> None:
+    """Processus mesuré : n'importe que ce que le mode demandé importe."""
+    import resource
+    from fakes import FakeFreeboxClient
+    from freetv.core.engine import AutoMuteEngine
+    from freetv.core.oqee import OqeeClient
+
+    if mode == "tui":
+        import io
+        from rich.console import Console
+        from freetv.ui import app
+        console = Console(file=io.StringIO(), force_terminal=True, width=100)
+        app.configure_logging(console)
+        run = lambda engine: app.run(engine, console)
+    else:
+        from freetv import headless
+        headless.configure_logging("WARNING")
+        run = headless.run
+
+    engine = AutoMuteEngine(fbx_client=FakeFreeboxClient(), oqee_client=OqeeClient(base_url=base_url))
+    async with engine:
+        task = asyncio.ensure_future(run(engine))
+        while not engine.snapshot.published_at:
+            await asyncio.sleep(0.005)
+        # Live (TUI) redirige sys.stdout : on écrit sur la vraie sortie
+        print("ready", file=sys.__stdout__, flush=True)
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Ko sous Linux
+    print(f"{rss_mb:.1f} {int('rich' in sys.modules)}", file=sys.__stdout__, flush=True)
+
+
+async def measure(mode: str, base_url: str, seconds: float):
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, __file__, "--child", mode, "--url", base_url, "--seconds", str(seconds),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    assert (await proc.stdout.readline()).strip() == b"ready"
+    startup = time.perf_counter() - start
+    rss, rich_loaded = (await proc.stdout.readline()).split()
+    await proc.wait()
+    return startup, float(rss), rich_loaded == b"1"
+
+
+async def main(runs: int, seconds: float) -> None:
+    from fakes import build_oqee_app, start_server
+
+    now = int(time.time())
+    runner, base_url = await start_server(build_oqee_app([(now + 120, now + 300)]))
+    try:
+        print(f"🧪 {runs} lancements par mode, {seconds:.0f}s de fonctionnement")
+        for mode in ("tui", "headless"):
+            results = [await measure(mode, base_url, seconds) for _ in range(runs)]
+            startup = statistics.median(r[0] for r in results)
+            rss = statistics.median(r[1] for r in results)
+            rich = "oui" if any(r[2] for r in results) else "non"
+            print(f"  {mode:<9} démarrage {startup * 1000:6.0f} ms | RSS max {rss:5.1f} Mo | Rich chargé: {rich}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--child", choices=("tui", "headless"), help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.child, args.url, args.seconds))
+    else:
+        asyncio.run(main(args.runs, args.seconds))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark : temps jusqu'à la première décision correcte après un redémarrage.
+
+Lance deux fois le moteur contre un faux OQEE lent (pub en cours) :
+  - à froid : cache disque vide, il faut attendre le premier fetch
+  - à chaud : le cache disque du premier lancement est rechargé
+
+Usage: python benchmarks/bench_warm_start.py [--latency 0.5]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeFreeboxClient, build_oqee_app, start_server
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+from freetv.core.store import CacheStore
+
+
+async def first_decision(base_url: str, store: CacheStore) -> AutoMuteEngine:
+    """Démarre un moteur et attend sa première décision fondée sur des données OQEE."""
+    engine = AutoMuteEngine(
+        fbx_client=FakeFreeboxClient(),
+        oqee_client=OqeeClient(base_url=base_url, store=store),
+    )
+    async with engine:
+        while engine.time_to_first_decision is None:
+            await engine.run_step()
+            await asyncio.sleep(0.01)
+        # Laisse le premier fetch live se terminer pour qu'il soit persisté
+        while engine.oqee_client.served_from_disk or not engine.oqee_client._ad_breaks_last_fetch:
+            await asyncio.sleep(0.01)
+    return engine
+
+
+async def main(latency: float) -> None:
+    now = int(time.time())
+    runner, base_url = await start_server(build_oqee_app([(now - 30, now + 600)], latency=latency))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CacheStore(Path(tmp) / "cache.sqlite3")
+            print(f"🧪 Faux OQEE avec {latency * 1000:.0f} ms de latence, pub en cours")
+            for label in ("à froid", "à chaud"):
+                engine = await first_decision(base_url, store)
+                muted = engine.fbx_client.mute_calls[:1]
+                print(f"  {label:<8} première décision en {engine.time_to_first_decision * 1000:7.1f} ms"
+                      f" (source: {engine.first_decision_source}, muté: {'oui' if muted else 'non'})")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
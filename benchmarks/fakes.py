@@ -0,0 +1,250 @@
+"""
+Stand-ins locaux pour les benchmarks : faux serveur OQEE et faux Freebox Player.
+
+Deux niveaux :
+  - FakeOqee / FakeFreebox : vrais serveurs HTTP aiohttp (latence + gigue),
+    interrogés par le vrai OqeeClient et le vrai FreeboxClient
+  - FakeFreeboxClient : client en mémoire, pour mesurer le moteur seul
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+from freebox_api.access import Access
+from freebox_api.api.player import Player
+
+from freetv.core.client import FreeboxClient
+from freetv.models import PlayerStatus, VolumeState
+
+
+class _FakeServer:
+    """Base commune : latence + gigue uniforme, compteur de requêtes, route /_stats."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests: Counter = Counter()
+        self._random = random.Random(seed)
+
+    async def _delay(self, endpoint: str) -> None:
+        self.requests[endpoint] += 1
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests)}
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self._stats)
+        self.add_routes(app.router)
+        return app
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        raise NotImplementedError
+
+
+class FakeOqee(_FakeServer):
+    """Faux OQEE servant `anti_adskipping` et `epg/by_channel`."""
+
+    def __init__(self, ad_breaks: List[Tuple[int, int]], latency: float = 0.0, jitter: float = 0.0,
+                 seed: Optional[int] = None):
+        super().__init__(latency, jitter, seed)
+        self.ad_breaks = list(ad_breaks)
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        router.add_get("/live/anti_adskipping/{channel_id}", self.anti_adskipping)
+        router.add_get("/epg/by_channel/{channel_id}/{start}", self.epg)
+
+    async def anti_adskipping(self, request: web.Request) -> web.Response:
+        await self._delay("anti_adskipping")
+        return web.json_response({"success": True, "result": {"periods": [
+            {"type": "ad_break", "start_time": start, "end_time": end} for start, end in self.ad_breaks
+        ]}})
+
+    async def epg(self, request: web.Request) -> web.Response:
+        await self._delay("epg")
+        window = int(request.match_info["start"])
+        return web.json_response({"success": True, "result": {"entries": [
+            {"type": "live", "live": {"title": "Programme", "start": window, "end": window + 21600}},
+        ]}})
+
+
+class FakeFreebox(_FakeServer):
+    """
+    Faux Freebox OS limité à ce qu'utilise FreeboxClient : login, liste des
+    players, statut, lecture et écriture du volume. Chaque changement de mute
+    est horodaté à sa prise en compte par la "box".
+    """
+
+    API_PREFIX = "/api/v4/"
+
+    def __init__(self, channel_uuid: str = "uuid-webtv-612", latency: float = 0.0, jitter: float = 0.0,
+                 seed: Optional[int] = None):
+        super().__init__(latency, jitter, seed)
+        self.channel_uuid = channel_uuid
+        self.power_state = "running"
+        self.mute = False
+        self.volume = 20
+        self.mute_events: List[Tuple[float, bool]] = []
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "mute_events": self.mute_events}
+
+    def add_routes(self, router: web.UrlDispatcher) -> None:
+        p = self.API_PREFIX
+        router.add_get(p + "login", self.login)
+        router.add_post(p + "login/session/", self.session)
+        router.add_get(p + "player", self.players)
+        router.add_get(p + "player/{id}/api/v6/status/", self.status)
+        router.add_get(p + "player/{id}/api/v6/control/volume", self.get_volume)
+        router.add_put(p + "player/{id}/api/v6/control/volume", self.put_volume)
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"success": True, "result": result})
+
+    async def login(self, request: web.Request) -> web.Response:
+        await self._delay("login")
+        return self._ok({"logged_in": False, "challenge": "bench"})
+
+    async def session(self, request: web.Request) -> web.Response:
+        await self._delay("login")
+        return self._ok({"session_token": "bench", "permissions": {"player": True}})
+
+    async def players(self, request: web.Request) -> web.Response:
+        await self._delay("players")
+        return self._ok([{"id": 1}])
+
+    async def status(self, request: web.Request) -> web.Response:
+        await self._delay("status")
+        return self._ok({
+            "power_state": self.power_state,
+            "player": {"state": {"playback_state": "playing"}},
+            "foreground_app": {"context": {"channel": {
+                "channelUuid": self.channel_uuid, "channelNumber": 1, "channelName": "TF1",
+            }}},
+        })
+
+    async def get_volume(self, request: web.Request) -> web.Response:
+        await self._delay("get_volume")
+        return self._ok({"mute": self.mute, "volume": self.volume})
+
+    async def put_volume(self, request: web.Request) -> web.Response:
+        await self._delay("set_volume")
+        data = json.loads(await request.text())  # Freebox OS n'envoie pas de Content-Type JSON
+        if "mute" in data and data["mute"] != self.mute:
+            self.mute = data["mute"]
+            self.mute_events.append((time.time(), self.mute))
+        self.volume = data.get("volume", self.volume)
+        return self._ok({})
+
+
+class LocalFreeboxClient(FreeboxClient):
+    """Vrai FreeboxClient branché sur un FakeFreebox en HTTP clair (pas de TLS ni de jeton stocké)."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    async def connect(self) -> None:
+        session = aiohttp.ClientSession()
+        access = Access(session, self.base_url + FakeFreebox.API_PREFIX, "bench", "fr.freetv.bench", 10)
+        self.fbx = SimpleNamespace(_access=access, player=Player(access), close=session.close)
+        await self._check_permissions()
+
+
+def build_oqee_app(ad_breaks: List[Tuple[int, int]], latency: float = 0.0) -> web.Application:
+    """Faux OQEE avec une latence fixe."""
+    return FakeOqee(ad_breaks, latency).app()
+
+
+async def start_server(app: web.Application) -> Tuple[web.AppRunner, str]:
+    """Démarre l'application sur un port libre et retourne (runner, url)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class FakeFreeboxClient:
+    """Faux FreeboxClient en mémoire (même interface publique)."""
+
+    def __init__(self, channel_uuid: str = "uuid-webtv-612", latency: float = 0.0):
+        self.channel_uuid = channel_uuid
+        self.latency = latency  # Aller-retour simulé de chaque appel (s)
+        self.calls: Counter = Counter()
+        self.mute = False
+        self.mute_calls: List[Tuple[float, bool]] = []
+        self._last_player_status: Optional[PlayerStatus] = None
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def _round_trip(self, call: str) -> None:
+        self.calls[call] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_player_status(self) -> Optional[PlayerStatus]:
+        await self._round_trip("get_player_status")
+        self._last_player_status = PlayerStatus(
+            power_state="running", playback_state="playing", channel_uuid=self.channel_uuid,
+            channel_number=1, channel_name="TF1", is_playing=True,
+        )
+        return self._last_player_status
+
+    async def get_volume_state(self) -> Optional[VolumeState]:
+        await self._round_trip("get_volume_state")
+        return VolumeState(mute=self.mute, volume=20)
+
+    async def set_mute(self, mute: bool) -> bool:
+        await self._round_trip("set_mute")
+        self.mute_calls.append((time.time(), mute))
+        self.mute = mute
+        return True
+
+
+class JsonFakeFreeboxClient(FakeFreeboxClient):
+    """FakeFreeboxClient qui décode à chaque statut une réponse JSON complète (coût CPU d'un vrai client)."""
+
+    def __init__(self, channel_uuid: str = "uuid-webtv-612", latency: float = 0.0):
+        super().__init__(channel_uuid, latency)
+        self.status_body = json.dumps({"success": True, "result": {
+            "power_state": "running",
+            "player": {"state": {"playback_state": "playing", "position": 0, "rate": 1.0}},
+            "foreground_app": {
+                "package": "fr.freebox.tv", "package_id": 1, "cur_version": "5.2.1",
+                "context": {"channel": {
+                    "channelUuid": channel_uuid, "channelNumber": 1, "channelName": "TF1",
+                    "channelSubNumber": 0, "logo": "/api/v8/tv/img/channels/logos/" + channel_uuid + ".png",
+                }},
+            },
+            "volume": {"level": 20, "mute": False},
+            "capabilities": {name: True for name in ("play", "pause", "seek", "record", "epg", "timeshift")},
+        }})
+
+    async def get_player_status(self) -> Optional[PlayerStatus]:
+        await self._round_trip("get_player_status")
+        self._last_player_status = PlayerStatus.from_api_response(json.loads(self.status_body)["result"])
+        return self._last_player_status
+
+
+def fake_box(player) -> FakeFreeboxClient:
+    """Fabrique pour FleetRunner : un faux player sur une chaîne non mappée (aucun appel OQEE)."""
+    return JsonFakeFreeboxClient(channel_uuid=f"uuid-fleet-{player.name}")
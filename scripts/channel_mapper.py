@@ -1,19 +1,34 @@
 """
-Script interactif pour créer le mapping des chaînes Freebox -> OQEE.
+Script pour créer le mapping des chaînes Freebox -> OQEE.
 
-Ce script :
+Mode interactif (par défaut) :
 1. Se connecte à la Freebox
 2. Liste toutes les chaînes disponibles
 3. Pour chaque chaîne, demande l'ID OQEE
 4. Teste l'API OQEE pour valider
 5. Sauvegarde le mapping dans un fichier
+
+Mode découverte (--discover) : sonde une plage d'IDs OQEE en parallèle et
+associe chaque ID à une chaîne Freebox en comparant leurs guides TV (mêmes
+programmes aux mêmes heures). Aucune manipulation de la télécommande.
+
+Usage:
+    python scripts/channel_mapper.py
+    python scripts/channel_mapper.py --discover [--ids 1-1000] [--concurrency 32]
 """
 
+import argparse
 import asyncio
 import json
+import os
+import re
 import sys
+import time
+import unicodedata
+from collections import Counter
 from datetime import datetime
-from typing import Optional, Dict, List
+from pathlib import Path
+from typing import Optional, Dict, List, Set, Tuple
 
 import aiohttp
 from freebox_api import Freepybox
@@ -22,18 +37,72 @@ from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
 from rich import box
-from rich.progress import track
+from rich.progress import track, Progress, BarColumn, MofNCompleteColumn, TextColumn, TimeElapsedColumn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.config import OQEE_API_URL
+from freetv.core.oqee import OqeeClient, epg_window_start
 
 console = Console()
 
+# Programme identifié par (heure de début, titre normalisé)
+ProgramKey = Tuple[int, str]
+
+
+def normalize_title(title: str) -> str:
+    """Titre comparable entre les deux guides (casse, accents, ponctuation)."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode().lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def match_channels(
+    freebox_epg: Dict[str, Set[ProgramKey]],
+    oqee_epg: Dict[str, Set[ProgramKey]],
+    min_common: int = 2,
+) -> Tuple[Dict[str, Tuple[str, int]], Set[str]]:
+    """
+    Associe les chaînes Freebox (UUID) aux IDs OQEE qui diffusent les mêmes programmes.
+
+    Les paires sont retenues de la plus sûre à la moins sûre (programmes en commun),
+    chaque chaîne et chaque ID au plus une fois. Une chaîne dont deux IDs libres
+    sont aussi plausibles est déclarée ambiguë (chaînes jumelles, régions).
+
+    Returns:
+        (UUID -> (ID OQEE, programmes en commun), UUIDs ambigus)
+    """
+    candidates = []
+    for uuid, programs in freebox_epg.items():
+        for oqee_id, oqee_programs in oqee_epg.items():
+            common = len(programs & oqee_programs)
+            if common >= min_common:
+                candidates.append((common, uuid, oqee_id))
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+    result: Dict[str, Tuple[str, int]] = {}
+    ambiguous: Set[str] = set()
+    used: Set[str] = set()
+    for common, uuid, oqee_id in candidates:
+        if uuid in result or uuid in ambiguous or oqee_id in used:
+            continue
+        if any(c[0] == common and c[1] == uuid and c[2] != oqee_id and c[2] not in used for c in candidates):
+            ambiguous.add(uuid)
+            continue
+        result[uuid] = (oqee_id, common)
+        used.add(oqee_id)
+    return result, ambiguous
+
 
 class ChannelMapper:
     """Outil de mapping des chaînes."""
     
-    def __init__(self):
+    def __init__(self, oqee_base_url: str = OQEE_API_URL):
         self.fbx: Optional[Freepybox] = None
         self.mappings: Dict[str, str] = {}
         self.channels_info: List[Dict] = []
+        self.oqee_base_url = oqee_base_url.rstrip('/')
+        # Motifs d'échec des sondes OQEE (http_404, timeout, ...)
+        self.probe_failures: Counter = Counter()
         
     async def connect(self):
         """Connecte à la Freebox."""
@@ -99,39 +168,169 @@ class ChannelMapper:
             console.print(f"[red]❌ Erreur récupération chaîne: {e}[/red]")
             return None
     
-    async def test_oqee_api(self, channel_id: str) -> Optional[Dict]:
+    async def test_oqee_api(self, channel_id: str, session: Optional[aiohttp.ClientSession] = None) -> Optional[Dict]:
         """
         Teste l'API OQEE pour un channel_id.
         
         Args:
             channel_id: ID OQEE à tester
+            session: Session partagée (mode découverte), sinon une session jetable
             
         Returns:
-            Infos de l'API ou None si erreur
+            Infos de l'API ou None si erreur (motif compté dans probe_failures)
         """
-        url = f"https://api.oqee.net/api/v1/live/anti_adskipping/{channel_id}"
+        url = f"{self.oqee_base_url}/live/anti_adskipping/{channel_id}"
         
+        own_session = session is None
+        if own_session:
+            session = aiohttp.ClientSession()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status != 200:
-                        return None
-                    
-                    data = await response.json()
-                    
-                    if not data.get('success'):
-                        return None
-                    
-                    periods = data.get('result', {}).get('periods', [])
-                    ad_breaks = [p for p in periods if p.get('type') == 'ad_break']
-                    
-                    return {
-                        'total_periods': len(periods),
-                        'ad_breaks': len(ad_breaks),
-                        'success': True
-                    }
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status != 200:
+                    self.probe_failures[f"http_{response.status}"] += 1
+                    return None
+                
+                data = await response.json(content_type=None)
+                
+                if not data.get('success'):
+                    self.probe_failures["no_success"] += 1
+                    return None
+                
+                periods = data.get('result', {}).get('periods', [])
+                ad_breaks = [p for p in periods if p.get('type') == 'ad_break']
+                
+                return {
+                    'total_periods': len(periods),
+                    'ad_breaks': len(ad_breaks),
+                    'success': True
+                }
+        except asyncio.TimeoutError:
+            self.probe_failures["timeout"] += 1
+            return None
         except Exception:
+            self.probe_failures["error"] += 1
             return None
+        finally:
+            if own_session:
+                await session.close()
+
+    async def fetch_oqee_programs(self, channel_id: str, session: aiohttp.ClientSession, window_start: int) -> Set[ProgramKey]:
+        """Programmes du bloc EPG OQEE de 6h commençant à `window_start` (vide si erreur)."""
+        url = f"{self.oqee_base_url}/epg/by_channel/{channel_id}/{window_start}"
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status != 200:
+                    self.probe_failures[f"epg_http_{response.status}"] += 1
+                    return set()
+                block = OqeeClient._parse_epg_block(window_start, await response.json(content_type=None))
+        except Exception:
+            self.probe_failures["epg_error"] += 1
+            return set()
+        if block is None:
+            return set()
+        return {(p.start_time, normalize_title(p.title)) for p in block.programs if p.title}
+
+    async def get_freebox_epg(self, window_start: int) -> Tuple[Dict[str, Dict], Dict[str, Set[ProgramKey]]]:
+        """
+        Chaînes du bouquet Freebox et leurs programmes sur la fenêtre de 6h.
+        
+        Returns:
+            (UUID -> infos de la chaîne, UUID -> programmes)
+        """
+        names, bouquet = await asyncio.gather(
+            self.fbx.tv.get_tv_channels(), self.fbx.tv.get_tv_default_bouquet_channels(),
+        )
+        channels: Dict[str, Dict] = {}
+        for entry in bouquet or []:
+            uuid = entry.get('uuid')
+            if uuid and uuid not in channels and entry.get('available', True):
+                info = (names or {}).get(uuid, {})
+                channels[uuid] = {'number': entry.get('number', 999), 'name': info.get('name', uuid), 'uuid': uuid}
+        
+        # Le guide Freebox répond par tranche horaire : quatre instants couvrent la fenêtre OQEE
+        epg: Dict[str, Set[ProgramKey]] = {uuid: set() for uuid in channels}
+        slices = await asyncio.gather(*(
+            self.fbx.tv.get_tv_programs_by_date(window_start + offset) for offset in range(0, 21600, 5400)
+        ))
+        for by_channel in slices:
+            for uuid, programs in (by_channel or {}).items():
+                if uuid not in epg:
+                    continue
+                for program in programs.values():
+                    if program.get('title') and program.get('date'):
+                        epg[uuid].add((int(program['date']), normalize_title(program['title'])))
+        return channels, epg
+
+    async def discover(self, oqee_ids: range, concurrency: int = 32, output: str = "channel_mappings.json"):
+        """
+        Mode découverte : sonde les IDs OQEE en parallèle et les associe aux chaînes Freebox par leur guide TV.
+        
+        Args:
+            oqee_ids: IDs OQEE à sonder
+            concurrency: Nombre maximal de sondes simultanées
+            output: Fichier JSON de sortie
+        """
+        window = epg_window_start(time.time())
+        console.print("[cyan]📺 Lecture des chaînes et du guide TV de la Freebox...[/cyan]")
+        channels, freebox_epg = await self.get_freebox_epg(window)
+        console.print(f"[green]✅ {len(channels)} chaînes, {sum(map(len, freebox_epg.values()))} programmes[/green]\n")
+        
+        oqee_epg: Dict[str, Set[ProgramKey]] = {}
+        valid = 0
+        semaphore = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        start = time.perf_counter()
+        
+        async with aiohttp.ClientSession(connector=connector) as session:
+            with Progress(
+                TextColumn("[cyan]🔍 Sondage OQEE[/cyan]"), BarColumn(), MofNCompleteColumn(),
+                TextColumn("[green]{task.fields[valid]} valides[/green]"), TimeElapsedColumn(),
+                console=console,
+            ) as progress:
+                task = progress.add_task("probe", total=len(oqee_ids), valid=0)
+                
+                async def probe(oqee_id: str) -> None:
+                    nonlocal valid
+                    async with semaphore:
+                        if await self.test_oqee_api(oqee_id, session):
+                            valid += 1
+                            programs = await self.fetch_oqee_programs(oqee_id, session, window)
+                            if programs:
+                                oqee_epg[oqee_id] = programs
+                    progress.update(task, advance=1, valid=valid)
+                
+                await asyncio.gather(*(probe(str(oqee_id)) for oqee_id in oqee_ids))
+        
+        elapsed = time.perf_counter() - start
+        matched, ambiguous = match_channels(freebox_epg, oqee_epg)
+        
+        for uuid, (oqee_id, common) in matched.items():
+            self.mappings[uuid] = oqee_id
+            self.channels_info.append({
+                **channels[uuid],
+                'type': None,
+                'oqee_id': oqee_id,
+                'epg_matches': common,
+                'tested_at': datetime.now().isoformat()
+            })
+        
+        # Statistiques
+        table = Table(title="📊 Découverte", box=box.SIMPLE, show_header=False)
+        table.add_column("Label", style="cyan")
+        table.add_column("Value", style="white bold")
+        table.add_row("Sondes", f"{len(oqee_ids)} en {elapsed:.1f} s ({len(oqee_ids) / elapsed:.0f}/s, {concurrency} en parallèle)")
+        table.add_row("IDs OQEE valides", f"{valid} ({len(oqee_epg)} avec guide TV)")
+        table.add_row("Échecs", ", ".join(f"{k}: {v}" for k, v in self.probe_failures.most_common()) or "aucun")
+        table.add_row("Chaînes associées", f"{len(matched)} / {len(channels)}")
+        if ambiguous:
+            table.add_row("Ambiguës", ", ".join(sorted(channels[u]['name'] for u in ambiguous)))
+        console.print(table)
+        
+        if self.mappings:
+            self.save_mappings(output)
+            self.save_python_config()
+        else:
+            console.print("\n[yellow]⚠️  Aucune chaîne associée[/yellow]")
     
     def display_channel_info(self, channel_info: Dict):
         """Affiche les infos d'une chaîne."""
@@ -245,8 +444,11 @@ class ChannelMapper:
             'channels_details': self.channels_info
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        # Écriture atomique : le moteur recharge ce fichier à chaud et ne doit jamais le lire à moitié écrit
+        tmp = f"{filename}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, filename)
         
         console.print(f"\n[green]💾 Mappings sauvegardés dans {filename}[/green]")
     
@@ -370,28 +572,58 @@ class ChannelMapper:
             console.print("\n[yellow]⚠️  Aucune chaîne mappée[/yellow]")
 
 
+def positive_int(value: str) -> int:
+    """Entier >= 1 (un sémaphore à 0 bloquerait la découverte)."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"entier >= 1 attendu: {value!r}")
+    return number
+
+
+def parse_id_range(value: str) -> range:
+    """'1-1000' -> range(1, 1001)."""
+    low, _, high = value.partition('-')
+    try:
+        return range(int(low), int(high or low) + 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"plage d'IDs invalide: {value!r} (attendu: 1-1000)")
+
+
 async def main():
     """Point d'entrée principal."""
+    parser = argparse.ArgumentParser(description="Mapping des chaînes Freebox -> OQEE")
+    parser.add_argument("--discover", action="store_true", help="découverte automatique (sans télécommande)")
+    parser.add_argument("--ids", type=parse_id_range, default=range(1, 1001), help="IDs OQEE à sonder (défaut : 1-1000)")
+    parser.add_argument("--concurrency", type=positive_int, default=32, help="sondes simultanées (défaut : 32)")
+    parser.add_argument("-o", "--output", default="channel_mappings.json", help="fichier JSON de sortie")
+    args = parser.parse_args()
+    
     mapper = ChannelMapper()
     
     try:
         await mapper.connect()
         
-        # Demander la chaîne de départ
-        start = Prompt.ask(
-            "[cyan]Numéro de la première chaîne ?[/cyan]",
-            default="1"
-        )
-        
-        max_channels = Prompt.ask(
-            "[cyan]Combien de chaînes maximum à parcourir ?[/cyan]",
-            default="30"
-        )
-        
-        await mapper.interactive_mapping(
-            start_channel=int(start),
-            max_channels=int(max_channels)
-        )
+        if args.discover:
+            await mapper.discover(args.ids, concurrency=args.concurrency, output=args.output)
+        else:
+            # Demander la chaîne de départ
+            start = Prompt.ask(
+                "[cyan]Numéro de la première chaîne ?[/cyan]",
+                default="1"
+            )
+            
+            max_channels = Prompt.ask(
+                "[cyan]Combien de chaînes maximum à parcourir ?[/cyan]",
+                default="30"
+            )
+            
+            await mapper.interactive_mapping(
+                start_channel=int(start),
+                max_channels=int(max_channels)
+            )
         
     finally:
         await mapper.disconnect()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Rejoue un enregistrement (statuts Freebox + réponses OQEE) en temps virtuel.
+
+Chaque décision de mute est écrite en JSON, une par ligne : comparer deux
+sorties avec `diff` après une modification de la fusion des pubs ou du buffer.
+
+Usage:
+    python scripts/replay.py capture.jsonl.gz [autres segments...] [-o decisions.jsonl]
+    python scripts/replay.py ~/.cache/freetv/captures [-o decisions.jsonl]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from freetv.core.replay import Timeline, replay
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rejeu en temps virtuel d'un enregistrement Freebox/OQEE")
+    parser.add_argument("timeline", nargs="+", help="fichiers .jsonl/.jsonl.gz (dans l'ordre) ou répertoire de capture")
+    parser.add_argument("-o", "--output", help="fichier de sortie des décisions (défaut : stdout)")
+    parser.add_argument("--start", type=float, help="début du rejeu (timestamp Unix)")
+    parser.add_argument("--end", type=float, help="fin du rejeu (timestamp Unix)")
+    args = parser.parse_args()
+
+    timeline = Timeline.load(*args.timeline)
+    if not timeline.events:
+        print("❌ Enregistrement vide", file=sys.stderr)
+        return 1
+
+    result = replay(timeline, start=args.start, end=args.end)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for decision in result.decisions:
+            out.write(decision.to_json() + "\n")
+    finally:
+        if args.output:
+            out.close()
+
+    print(
+        f"✅ {result.simulated_seconds / 3600:.1f} h rejouées en {result.wall_seconds:.1f} s : "
+        f"{len(result.decisions)} décisions, {result.oqee_requests} requêtes OQEE",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,54 +3,56 @@ Main Entry Point.
 """
 import sys
 import asyncio
-from rich.live import Live
+import argparse
 
-from .core.engine import AutoMuteEngine
-from .ui.console import console
-from .ui.display import StatusDisplay
-from .config import CHECK_INTERVAL_TV_OFF
+from .config import FREEBOX_PLAYERS, FLEET_WORKERS
 
-async def main():
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="freetv", description="Auto-mute des publicités pour Freebox Player")
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="sans interface : journal texte uniquement (systemd, Raspberry Pi)",
+    )
+    parser.add_argument(
+        "--players", default=FREEBOX_PLAYERS, metavar="NOM=HÔTE[:PORT],... | @FICHIER",
+        help="plusieurs Freebox Players dans un seul processus, client OQEE partagé (implique --headless)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=FLEET_WORKERS, metavar="N",
+        help="avec --players : répartit les players sur N processus (0 = un par cœur)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
     """Point d'entrée principal."""
+    args = parse_args(argv)
+    if args.players:
+        from .core.supervisor import parse_players
+        from .headless import fleet, supervise
+        try:
+            # "@chemin" : un player par ligne (grands parcs)
+            spec = open(args.players[1:], encoding="utf-8").read() if args.players.startswith("@") else args.players
+            players = parse_players(spec)
+        except (OSError, ValueError) as e:
+            print(f"--players invalide: {e}", file=sys.stderr)
+            return 2
+        try:
+            if args.workers != 1:
+                return asyncio.run(fleet(players, args.workers))
+            return asyncio.run(supervise(players))
+        except KeyboardInterrupt:
+            return 0
+    # Import différé : le mode headless ne doit jamais charger Rich
+    if args.headless:
+        from .headless import main as app_main
+    else:
+        from .ui.app import main as app_main
     try:
-        async with AutoMuteEngine() as engine:
-            console.clear()
-            console.print("[bold green]🚀 Démarrage du moteur Auto-Mute...[/bold green]\n")
-            
-            with Live(console=console, refresh_per_second=2, screen=True) as live:
-                while True:
-                    await engine.run_step()
-                    
-                    # Update Display
-                    state = engine.get_display_state()
-                    panel = StatusDisplay.create_panel(
-                        player_status=state["player_status"],
-                        volume_state=await engine.fbx_client.get_volume_state(), # Note: Double fetch? Engine could cache it.
-                        ad_breaks=state["ad_breaks"],
-                        active_ad=state["active_ad"],
-                        next_ad=state["next_ad"],
-                        current_program=state["current_program"],
-                        ad_last_fetch=engine.oqee_client._ad_breaks_last_fetch
-                    )
-                    
-                    live.update(panel)
-                    
-                    # Délai dynamique : 5s si TV OFF, 1s si TV ON
-                    player_status = state["player_status"]
-                    if player_status and player_status.is_tv_on:
-                        await asyncio.sleep(engine.check_interval)  # 1s quand TV ON
-                    else:
-                        await asyncio.sleep(CHECK_INTERVAL_TV_OFF)  # 5s quand TV OFF
-                    
+        return asyncio.run(app_main())
     except KeyboardInterrupt:
-        console.print("\n[yellow]👋 Au revoir ![/yellow]")
-    except Exception as e:
-        console.print(f"\n[red]❌ Erreur fatale: {e}[/red]")
-        # import traceback
-        # traceback.print_exc()
+        return 0
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        sys.exit(0)
+    sys.exit(main())
@@ -7,12 +7,21 @@ import os
 # Freebox Connection
 FREEBOX_HOST = os.getenv("FREEBOX_HOST", "mafreebox.freebox.fr")
 FREEBOX_PORT = os.getenv("FREEBOX_PORT", "443")
+# Plusieurs Freebox Players dans un seul processus (client OQEE partagé), mode headless :
+# "salon=192.168.1.10,chambre=192.168.1.11:8443" ; vide = un seul player (FREEBOX_HOST)
+FREEBOX_PLAYERS = os.getenv("FREEBOX_PLAYERS", "")
+# Grand parc de Freebox : players répartis sur N processus (un superviseur chacun),
+# santé et métriques agrégées par le processus parent ; 0 = un processus par cœur
+FLEET_WORKERS = int(os.getenv("FLEET_WORKERS", "1"))
+FLEET_REPORT_INTERVAL = float(os.getenv("FLEET_REPORT_INTERVAL", "5"))  # Période (s) des rapports des workers
 
 # Application Settings
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "1"))
 CHECK_INTERVAL_TV_OFF = int(os.getenv("CHECK_INTERVAL_TV_OFF", "5"))  # Délai plus long quand TV éteinte
 AD_BREAKS_CACHE_TTL = int(os.getenv("AD_BREAKS_CACHE_TTL", "3"))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+RENDER_FPS = float(os.getenv("RENDER_FPS", "2"))  # Images/s de l'interface, indépendant de la boucle de contrôle
+VOLUME_REVALIDATE_INTERVAL = int(os.getenv("VOLUME_REVALIDATE_INTERVAL", "10"))  # Relecture du volume réel (s)
 
 # Unmute buffer in seconds (avoid unmuting between close ads)
 UNMUTE_BUFFER = int(os.getenv("UNMUTE_BUFFER", "10"))
@@ -20,6 +29,71 @@ UNMUTE_BUFFER = int(os.getenv("UNMUTE_BUFFER", "10"))
 # Max gap between ads to merge them (avoid unmuting for 10s of jingle)
 AD_MERGE_MAX_GAP = int(os.getenv("AD_MERGE_MAX_GAP", "60"))
 
+# OQEE HTTP API
+OQEE_API_URL = os.getenv("OQEE_API_URL", "https://api.oqee.net/api/v1")
+OQEE_REQUEST_TIMEOUT = float(os.getenv("OQEE_REQUEST_TIMEOUT", "10"))
+OQEE_MAX_CONNECTIONS_PER_HOST = int(os.getenv("OQEE_MAX_CONNECTIONS_PER_HOST", "4"))
+OQEE_KEEPALIVE_TIMEOUT = float(os.getenv("OQEE_KEEPALIVE_TIMEOUT", "60"))  # Garde la connexion ouverte entre deux refresh
+OQEE_DNS_CACHE_TTL = int(os.getenv("OQEE_DNS_CACHE_TTL", "300"))
+OQEE_MAX_STALENESS = int(os.getenv("OQEE_MAX_STALENESS", "120"))  # Âge max du dernier planning connu si l'API échoue
+# Budget de requêtes OQEE (seau à jetons partagé) : au-delà, les requêtes attendent, servies
+# par priorité (planning regardé, revalidation, EPG, préchauffage). 0 = pas de limite
+OQEE_BUDGET_RATE = float(os.getenv("OQEE_BUDGET_RATE", "2"))  # Requêtes par seconde en régime établi
+OQEE_BUDGET_BURST = float(os.getenv("OQEE_BUDGET_BURST", "10"))  # Rafale maximale
+
+# Cadence adaptative du planning pub : rare loin de toute pub ou fin de programme,
+# resserrée à leur approche, minimale pendant une pub dont la fin est estimée
+OQEE_REFRESH_MIN = float(os.getenv("OQEE_REFRESH_MIN", str(AD_BREAKS_CACHE_TTL)))
+OQEE_REFRESH_MAX = float(os.getenv("OQEE_REFRESH_MAX", "30"))
+OQEE_REFRESH_LEAD_FACTOR = float(os.getenv("OQEE_REFRESH_LEAD_FACTOR", "0.25"))  # Intervalle = fraction du temps restant
+# Avance minimale (s) avec laquelle OQEE publie une pub : l'intervalle reste sous cette avance
+# moins UNMUTE_BUFFER, pour qu'une pub annoncée au calme soit vue avant son mute anticipé
+OQEE_AD_ANNOUNCE_LEAD = float(os.getenv("OQEE_AD_ANNOUNCE_LEAD", "20"))
+
+# Disjoncteurs : après N échecs d'affilée, un endpoint n'est plus appelé pendant un délai
+# exponentiel (avec aléa), puis un seul appel test décide de sa réouverture
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_BASE_DELAY = float(os.getenv("BREAKER_BASE_DELAY", "2"))  # Premier délai (s), doublé à chaque échec du test
+OQEE_BREAKER_MAX_DELAY = float(os.getenv("OQEE_BREAKER_MAX_DELAY", "300"))
+FREEBOX_BREAKER_MAX_DELAY = float(os.getenv("FREEBOX_BREAKER_MAX_DELAY", "30"))  # Court : les commandes de mute en dépendent
+
+# Porte d'accès par box : appels simultanés bornés et espacés, lectures identiques partagées
+# (en cours, ou obtenues depuis moins de FREEBOX_READ_WINDOW s), mute déjà dans l'état demandé non renvoyé
+FREEBOX_MAX_CONCURRENT = int(os.getenv("FREEBOX_MAX_CONCURRENT", "2"))  # Statut et volume lus ensemble
+FREEBOX_MIN_INTERVAL = float(os.getenv("FREEBOX_MIN_INTERVAL", "0.02"))  # Écart minimal (s) entre deux départs
+FREEBOX_READ_WINDOW = float(os.getenv("FREEBOX_READ_WINDOW", "0.5"))  # Sous CHECK_INTERVAL : un moteur seul relit toujours la box
+
+# Cache EPG : un bloc de 6h par chaîne, revalidé rarement, fenêtre suivante préchargée
+EPG_BLOCK_TTL = int(os.getenv("EPG_BLOCK_TTL", "3600"))
+EPG_PREFETCH_LEAD = int(os.getenv("EPG_PREFETCH_LEAD", "600"))  # Secondes avant la bascule de fenêtre
+
+# Cache disque (SQLite) des plannings pub et de l'EPG pour redémarrer "à chaud"
+PERSISTENT_CACHE = os.getenv("PERSISTENT_CACHE", "0") == "1"
+CACHE_DIR = os.getenv("CACHE_DIR", "")  # Vide = $XDG_CACHE_HOME/freetv
+PERSISTENT_CACHE_MAX_AGE = int(os.getenv("PERSISTENT_CACHE_MAX_AGE", "21600"))  # Plannings plus vieux ignorés au démarrage
+
+# Préchauffage des plannings pub/EPG de plusieurs chaînes (zapping instantané)
+WARMER_ENABLED = os.getenv("WARMER_ENABLED", "0") == "1"
+WARMER_CHANNELS = [c.strip() for c in os.getenv("WARMER_CHANNELS", "").split(",") if c.strip()]  # UUIDs, vide = toutes
+WARMER_INTERVAL = int(os.getenv("WARMER_INTERVAL", "30"))
+WARMER_CONCURRENCY = int(os.getenv("WARMER_CONCURRENCY", "4"))
+
+# Capture de tout le trafic API (statuts Freebox, réponses OQEE) pour rejouer un incident
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "0") == "1"
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "")  # Vide = <cache>/captures
+CAPTURE_SEGMENT_BYTES = int(os.getenv("CAPTURE_SEGMENT_BYTES", str(5 * 1024 * 1024)))  # Taille max d'un segment gzip
+CAPTURE_MAX_SEGMENTS = int(os.getenv("CAPTURE_MAX_SEGMENTS", "20"))  # Les plus anciens sont supprimés
+
+# Endpoint Prometheus /metrics (servi par la boucle du moteur)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 pour un scrape depuis une autre machine
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Fichier de mapping écrit par scripts/channel_mapper.py : complète/remplace le mapping
+# ci-dessous, rechargé à chaud (SIGHUP ou modification du fichier) sans redémarrer
+CHANNEL_MAPPING_FILE = os.getenv("CHANNEL_MAPPING_FILE", "channel_mappings.json")  # Vide = désactivé
+CHANNEL_MAPPING_RELOAD_INTERVAL = float(os.getenv("CHANNEL_MAPPING_RELOAD_INTERVAL", "5"))  # Période de vérification (s)
+
 # Channel Mapping (OQEE UUID -> API ID)
 # Default mapping (can be extended via config file later if needed)
 CHANNEL_MAPPING = {
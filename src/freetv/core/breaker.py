@@ -0,0 +1,131 @@
+"""
+Circuit Breakers.
+Stop calling a failing endpoint for a jittered exponential backoff, then probe it once.
+"""
+import random
+import logging
+import functools
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ..config import BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_DELAY, FREEBOX_BREAKER_MAX_DELAY
+from .clock import SYSTEM_CLOCK, Clock
+from .metrics import BREAKER_OPENED, BREAKER_OPEN_SECONDS, BREAKER_REJECTED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'un endpoint.
+
+    - fermé : les appels passent ; `failure_threshold` échecs d'affilée l'ouvrent.
+    - ouvert : les appels sont refusés pendant le délai de backoff.
+    - semi-ouvert : un seul appel test passe ; s'il réussit le disjoncteur se
+      referme, sinon il se rouvre avec un délai doublé (plafonné à `max_delay`).
+
+    Le délai est tiré entre `delay * (1 - jitter)` et `delay` pour que plusieurs
+    clients ne réessaient pas tous au même instant.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_delay: float = BREAKER_BASE_DELAY,
+        max_delay: float = FREEBOX_BREAKER_MAX_DELAY,
+        jitter: float = 0.5,
+        clock: Clock = SYSTEM_CLOCK,
+        rng: Optional[random.Random] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        self.state = CLOSED
+        self.failures = 0  # Échecs consécutifs
+        self.opens = 0  # Ouvertures depuis la dernière fermeture (exposant du backoff)
+        self.retry_at: float = 0.0
+        self._opened_at: float = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Vrai si l'appel peut partir (en semi-ouvert : le seul appel test)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock.monotonic() >= self.retry_at:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        BREAKER_REJECTED.inc(self.name)
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            duration = self.clock.monotonic() - self._opened_at
+            BREAKER_OPEN_SECONDS.observe(duration, self.name)
+            logger.info("Disjoncteur %s refermé après %.1f s", self.name, duration)
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._open()
+
+    def release(self) -> None:
+        """Abandon de l'appel sans verdict (annulation) : un autre appel test pourra partir."""
+        self._probing = False
+
+    def _open(self) -> None:
+        if self.state == CLOSED:
+            self._opened_at = self.clock.monotonic()
+        delay = min(self.max_delay, self.base_delay * 2 ** self.opens)
+        delay *= 1 - self.jitter * self.rng.random()
+        self.opens += 1
+        self.state = OPEN
+        self.retry_at = self.clock.monotonic() + delay
+        self._probing = False
+        BREAKER_OPENED.inc(self.name)
+        logger.warning("Disjoncteur %s ouvert (%d échecs), nouvel essai dans %.1f s", self.name, self.failures, delay)
+
+
+def guarded(failed: T = None) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Décore une méthode async de FreeboxClient avec le disjoncteur `self.breaker(nom)`
+    (nom de la méthode, sans le `_` d'une implémentation privée).
+
+    Ces méthodes renvoient None/False en cas d'erreur au lieu de lever : ce
+    résultat compte comme un échec, et `failed` est renvoyé sans appel quand
+    le disjoncteur est ouvert.
+    """
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs) -> T:
+            breaker = self.breaker(fn.__name__.lstrip("_"))
+            if not breaker.allow():
+                return failed
+            try:
+                result = await fn(self, *args, **kwargs)
+            except BaseException:
+                breaker.release()
+                raise
+            if result is None or result is False:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return result
+        return wrapper
+    return decorator
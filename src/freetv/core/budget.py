@@ -0,0 +1,118 @@
+"""
+OQEE Request Budget.
+Token bucket shared by every OqeeClient user; queued requests are served by priority.
+"""
+import heapq
+import asyncio
+import weakref
+import itertools
+from enum import IntEnum
+from typing import Hashable, List, Optional
+
+from .clock import SYSTEM_CLOCK, Clock
+from .metrics import OQEE_BUDGET_DEFERRAL, REGISTRY
+
+
+class Priority(IntEnum):
+    """Ordre de service quand le budget est épuisé (plus petit = plus urgent)."""
+    WATCHED = 0  # Planning pub de la chaîne regardée, rien de servi (démarrage, zapping)
+    REFRESH = 1  # Revalidation du planning regardé (cadence adaptative : serrée près des bornes)
+    EPG = 2      # Guide des programmes
+    WARMING = 3  # Préchauffage des autres chaînes
+
+
+# Budgets vivants, lus par la jauge sans les garder en vie
+_BUDGETS: "weakref.WeakSet[RequestBudget]" = weakref.WeakSet()
+
+
+class RequestBudget:
+    """
+    Seau à jetons : `rate` requêtes/s en régime établi, rafales jusqu'à `burst`.
+
+    Sans jeton disponible, une requête attend dans une file triée par priorité puis
+    par ordre d'arrivée : elle est différée, jamais abandonnée. Un appelant plus
+    urgent qui rejoint une requête en attente (même clé) la remonte avec boost().
+    """
+
+    def __init__(self, rate: float, burst: float = 1, clock: Clock = SYSTEM_CLOCK):
+        if rate <= 0:
+            raise ValueError("rate doit être > 0")
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock.monotonic()
+        # [priorité, n° d'arrivée, future, entrée en file, clé] ; future None = entrée remplacée par boost()
+        self._queue: List[list] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted: int = 0
+        self.deferred: int = 0
+        _BUDGETS.add(self)
+
+    def _refill(self) -> None:
+        now = self.clock.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _waiting(self) -> List[list]:
+        return [entry for entry in self._queue if entry[2] is not None and not entry[2].done()]
+
+    @property
+    def depth(self) -> int:
+        """Requêtes en attente d'un jeton."""
+        return len(self._waiting())
+
+    async def acquire(self, priority: Priority = Priority.REFRESH, key: Optional[Hashable] = None) -> float:
+        """Attend un jeton. Retourne le temps passé en file (0 si servi tout de suite)."""
+        self._refill()
+        if self._tokens >= 1 and not self._waiting():
+            self._tokens -= 1
+            self.granted += 1
+            OQEE_BUDGET_DEFERRAL.observe(0.0, priority.name.lower())
+            return 0.0
+
+        enqueued_at = self.clock.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._seq), future, enqueued_at, key])
+        self.deferred += 1
+        if self._timer is None:
+            self._dispatch()
+        served_as = await future
+        deferral = self.clock.monotonic() - enqueued_at
+        OQEE_BUDGET_DEFERRAL.observe(deferral, served_as.name.lower())
+        return deferral
+
+    def boost(self, key: Hashable, priority: Priority) -> None:
+        """Remonte à `priority` les requêtes en attente de cette clé."""
+        for entry in self._waiting():
+            if entry[4] == key and entry[0] > priority:
+                heapq.heappush(self._queue, [priority, entry[1], entry[2], entry[3], key])
+                entry[2] = None
+
+    def _dispatch(self) -> None:
+        """Sert la file dans l'ordre des priorités, puis se replanifie pour le prochain jeton."""
+        self._timer = None
+        self._refill()
+        while self._queue and self._tokens >= 1:
+            priority, _, future, _, _ = heapq.heappop(self._queue)
+            if future is None or future.done():
+                continue  # Remplacée (boost) ou appelant annulé : pas de jeton consommé
+            self._tokens -= 1
+            self.granted += 1
+            future.set_result(priority)
+        while self._queue and (self._queue[0][2] is None or self._queue[0][2].done()):
+            heapq.heappop(self._queue)
+        if self._queue:
+            delay = (1 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def close(self) -> None:
+        """Annule le prochain service de la file (fermeture du client)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+REGISTRY.gauge("freetv_oqee_budget_queue_depth", "Requêtes OQEE en attente d'un jeton du budget.",
+               lambda: sum(budget.depth for budget in list(_BUDGETS)))
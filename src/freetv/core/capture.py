@@ -0,0 +1,168 @@
+"""
+API Capture Log.
+Appends every Freebox status/volume response and OQEE payload to rotated gzip segments.
+"""
+import gzip
+import json
+import queue
+import logging
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+from ..config import CAPTURE_DIR, CAPTURE_SEGMENT_BYTES, CAPTURE_MAX_SEGMENTS
+from .clock import SYSTEM_CLOCK, Clock
+from .store import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_GLOB = "capture-*.jsonl.gz"
+
+_STOP = object()
+
+
+def default_capture_dir() -> Path:
+    return Path(CAPTURE_DIR) if CAPTURE_DIR else default_cache_dir() / "captures"
+
+
+class CaptureLog:
+    """
+    Journal de capture lisible par `Timeline.load` (rejeu), une réponse par ligne :
+
+        {"t": 1700000000.1, "kind": "player_status", "latency": 0.031, "data": {...}}
+        {"t": 1700000000.2, "kind": "volume", "latency": 0.028, "data": {"mute": false, "volume": 20}}
+        {"t": 1700000000.4, "kind": "oqee", "path": "/live/anti_adskipping/536", "status": 200,
+         "latency": 0.084, "data": {...}}
+
+    `t` est l'heure de réception, `latency` la durée de l'appel (s). `data` est le
+    `result` Freebox ou le corps OQEE tel que reçu (null si ce n'est pas du JSON,
+    absent pour un 304). Les segments `capture-<ms>-<index>.jsonl.gz` tournent à
+    `segment_bytes` compressés ; au-delà de `max_segments`, les plus anciens
+    sont supprimés.
+
+    `record()` ne fait qu'empiler : sérialisation, compression et écriture
+    ont lieu dans un thread dédié.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        segment_bytes: int = CAPTURE_SEGMENT_BYTES,
+        max_segments: int = CAPTURE_MAX_SEGMENTS,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        self.directory = Path(directory) if directory else default_capture_dir()
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.clock = clock
+        self.records = 0
+        self.dropped = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._gzip: Optional[gzip.GzipFile] = None
+        self._raw = None
+        self._segment_index = 0
+
+    # --- Côté boucle asyncio : empiler uniquement ---
+
+    def record(self, kind: str, data: Any, latency: float, path: Optional[str] = None,
+               status: Optional[int] = None) -> None:
+        """Empile une réponse. `data` peut être un objet JSON ou le corps brut (bytes)."""
+        if self._thread is None:
+            self.dropped += 1
+            return
+        self._queue.put((self.clock.time(), kind, path, status, latency, data))
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="freetv-capture", daemon=True)
+        self._thread.start()
+        logger.info("Capture du trafic API dans %s", self.directory)
+
+    def stop(self) -> None:
+        """Vide la file, finalise le segment courant et arrête le thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def segments(self) -> List[Path]:
+        """Segments existants, du plus ancien au plus récent."""
+        return sorted(self.directory.glob(SEGMENT_GLOB))
+
+    # --- Thread d'écriture ---
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    # Au calme : on rend lisible ce qui a été écrit (segment tronqué si crash)
+                    if self._gzip is not None:
+                        self._gzip.flush()
+                    continue
+                if item is _STOP:
+                    break
+                try:
+                    self._write(self._encode(*item))
+                    self.records += 1
+                except Exception as e:
+                    self.dropped += 1
+                    logger.warning("Capture: écriture impossible: %s", e)
+        finally:
+            self._close_segment()
+
+    @staticmethod
+    def _encode(t: float, kind: str, path: Optional[str], status: Optional[int], latency: float, data: Any) -> bytes:
+        meta = {"t": round(t, 3), "kind": kind}
+        if path is not None:
+            meta["path"] = path
+        if status is not None:
+            meta["status"] = status
+        meta["latency"] = round(latency, 4)
+        head = json.dumps(meta, ensure_ascii=False)[:-1].encode()
+        if status == 304:
+            return head + b"}\n"
+        if isinstance(data, (bytes, bytearray)):
+            # Corps OQEE : recopié tel quel s'il est bien du JSON sur une ligne
+            try:
+                json.loads(data)
+                body = bytes(data).replace(b"\n", b" ")
+            except ValueError:
+                body = b"null"
+        else:
+            body = json.dumps(data, ensure_ascii=False).encode()
+        return head + b', "data": ' + body + b"}\n"
+
+    def _write(self, line: bytes) -> None:
+        if self._gzip is None:
+            self._open_segment()
+        self._gzip.write(line)
+        if self._raw.tell() >= self.segment_bytes:
+            self._close_segment()
+
+    def _open_segment(self) -> None:
+        # Nom horodaté, trié chronologiquement ; l'index départage deux rotations dans la même ms
+        self._segment_index += 1
+        name = f"capture-{int(self.clock.time() * 1000):013d}-{self._segment_index:04d}.jsonl.gz"
+        self._raw = open(self.directory / name, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        self._prune()
+
+    def _close_segment(self) -> None:
+        if self._gzip is not None:
+            self._gzip.close()
+            self._raw.close()
+            self._gzip = None
+            self._raw = None
+
+    def _prune(self) -> None:
+        for old in self.segments()[:-self.max_segments]:
+            try:
+                old.unlink()
+            except OSError as e:
+                logger.warning("Capture: suppression de %s impossible: %s", old, e)
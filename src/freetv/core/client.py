@@ -1,26 +1,47 @@
 """
 Freebox API Client Wrapper.
 """
+import time
+import random
+import logging
 from typing import Optional, Dict
 
 from freebox_api import Freepybox
-from rich.console import Console
-from rich.panel import Panel
-from rich import box
 
-from ..config import FREEBOX_HOST, FREEBOX_PORT
+from ..config import FREEBOX_HOST, FREEBOX_PORT, FREEBOX_BREAKER_MAX_DELAY
 from ..models import PlayerStatus, VolumeState
+from .breaker import CircuitBreaker, guarded
+from .capture import CaptureLog
+from .clock import SYSTEM_CLOCK, Clock
+from .gate import ApiGate
+from .metrics import FREEBOX_SAVED, instrumented
 
-console = Console()
+logger = logging.getLogger(__name__)
 
 class FreeboxClient:
     """Wrapper pour l'API Freebox."""
     
-    def __init__(self, host: str = FREEBOX_HOST, port: str = FREEBOX_PORT):
+    def __init__(
+        self,
+        host: str = FREEBOX_HOST,
+        port: str = FREEBOX_PORT,
+        clock: Clock = SYSTEM_CLOCK,
+        gate: Optional[ApiGate] = None,
+    ):
         self.host = host
         self.port = port
+        self.clock = clock
         self.fbx: Optional[Freepybox] = None
         self._last_player_status: Optional[PlayerStatus] = None
+        # Porte d'accès à la box (à partager entre clients d'une même box) et dernier mute confirmé
+        self.gate = gate or ApiGate(clock=clock)
+        self.confirmed_mute: Optional[bool] = None
+        self._mute_commands: int = 0
+        # Un disjoncteur par méthode : une Freebox injoignable n'est plus sollicitée à chaque tick
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.backoff_rng = random.Random()
+        # Journal de capture optionnel (réponses brutes, pour le rejeu)
+        self.capture: Optional[CaptureLog] = None
 
     async def connect(self) -> None:
         """Connecte à la Freebox."""
@@ -36,68 +57,94 @@ class FreeboxClient:
     async def _check_permissions(self) -> None:
         """Vérifie les permissions."""
         if not hasattr(self.fbx, '_access') or not self.fbx._access:
-            console.print("[yellow]⚠️  Impossible de vérifier les permissions[/yellow]")
+            logger.warning("Impossible de vérifier les permissions")
             return
         
         perms = await self.fbx._access.get_permissions()
         if not perms:
-            console.print("[yellow]⚠️  Impossible de récupérer les permissions[/yellow]")
+            logger.warning("Impossible de récupérer les permissions")
             return
         
         if not perms.get('player', False):
-            self._print_permission_error()
             raise PermissionError("Permission 'Contrôle du Freebox Player' manquante.")
 
-    def _print_permission_error(self):
-        console.print()
-        console.print(Panel(
-            "[bold red]⚠️  PERMISSION MANQUANTE[/bold red]\n\n"
-            "L'application n'a pas la permission [yellow]'Contrôle du Freebox Player'[/yellow].\n\n"
-            "[bold]📋 SOLUTION :[/bold]\n\n"
-            "1. Ouvrez votre navigateur : [cyan]http://192.168.1.254[/cyan]\n"
-            "   (ou http://mafreebox.freebox.fr)\n\n"
-            "2. Connectez-vous avec votre mot de passe Freebox\n\n"
-            "3. Allez dans :\n"
-            "   • Paramètres de la Freebox\n"
-            "   • Gestion des accès\n"
-            "   • Onglet 'Applications'\n\n"
-            "4. Trouvez l'application [cyan]'Freepybox'[/cyan] et activez :\n"
-            "   [green]✅ Contrôle du Freebox Player[/green]\n\n"
-            "5. Sauvegardez et relancez l'application\n\n"
-            "[dim]💡 Ou utilisez l'assistant : [cyan]./setup.sh[/cyan][/dim]",
-            title="[bold]Configuration requise[/bold]",
-            border_style="red",
-            box=box.DOUBLE
-        ))
-        console.print()
+    def breaker(self, call: str) -> CircuitBreaker:
+        breaker = self.breakers.get(call)
+        if breaker is None:
+            breaker = self.breakers[call] = CircuitBreaker(
+                f"freebox/{call}", max_delay=FREEBOX_BREAKER_MAX_DELAY, clock=self.clock, rng=self.backoff_rng,
+            )
+        return breaker
 
     async def get_player_status(self) -> Optional[PlayerStatus]:
-        """Récupère le statut du lecteur."""
+        """Récupère le statut du lecteur (lecture partagée avec les appels simultanés ou très récents)."""
+        return await self.gate.read("get_player_status", self._get_player_status)
+
+    async def get_volume_state(self) -> Optional[VolumeState]:
+        """Récupère l'état du volume (lecture partagée avec les appels simultanés ou très récents)."""
+        commands = self._mute_commands
+        volume_state = await self.gate.read("get_volume_state", self._get_volume_state)
+        # Une lecture partie avant une commande de mute ne dit rien de l'état actuel
+        if volume_state is not None and commands == self._mute_commands:
+            self.confirmed_mute = volume_state.mute
+        return volume_state
+
+    async def set_mute(self, mute: bool) -> bool:
+        """
+        Active/désactive le mute.
+        
+        Les commandes sont envoyées une à la fois ; celle qui demande l'état déjà
+        confirmé par la box (dernier volume lu ou dernier mute réussi) n'est pas envoyée.
+        """
+        return await self.gate.write(lambda: self._set_mute_unless_confirmed(mute))
+
+    async def _set_mute_unless_confirmed(self, mute: bool) -> bool:
+        if self.confirmed_mute is mute:
+            FREEBOX_SAVED.inc("set_mute", "skipped")
+            return True
+        self._mute_commands += 1
+        done = await self._set_mute(mute)
+        # En cas d'échec l'état réel est inconnu : la commande suivante partira
+        self.confirmed_mute = mute if done else None
+        self.gate.invalidate("get_volume_state")
+        return done
+
+    @guarded()
+    @instrumented("get_player_status")
+    async def _get_player_status(self) -> Optional[PlayerStatus]:
         try:
+            start = time.perf_counter()
             status_data = await self.fbx.player.get_player_status()
+            if self.capture is not None:
+                self.capture.record("player_status", status_data, time.perf_counter() - start)
             self._last_player_status = PlayerStatus.from_api_response(status_data)
             return self._last_player_status
         except Exception as e:
-            console.print(f"[red]❌ Erreur statut: {e}[/red]")
+            logger.error("Erreur statut: %s", e)
             return None
 
-    async def get_volume_state(self) -> Optional[VolumeState]:
-        """Récupère l'état du volume."""
+    @guarded()
+    @instrumented("get_volume_state")
+    async def _get_volume_state(self) -> Optional[VolumeState]:
         try:
+            start = time.perf_counter()
             volume_data = await self.fbx.player.get_player_volume()
+            if self.capture is not None:
+                self.capture.record("volume", volume_data, time.perf_counter() - start)
             return VolumeState(
                 mute=volume_data.get('mute', False),
                 volume=volume_data.get('volume', 0)
             )
         except Exception as e:
-            console.print(f"[red]❌ Erreur volume: {e}[/red]")
+            logger.error("Erreur volume: %s", e)
             return None
     
-    async def set_mute(self, mute: bool) -> bool:
-        """Active/désactive le mute."""
+    @guarded(False)
+    @instrumented("set_mute")
+    async def _set_mute(self, mute: bool) -> bool:
         try:
             await self.fbx.player.set_player_volume({"mute": mute})
             return True
         except Exception as e:
-            console.print(f"[red]❌ Erreur mute: {e}[/red]")
+            logger.error("Erreur mute: %s", e)
             return False
@@ -0,0 +1,83 @@
+"""
+Clocks.
+Wall-clock access for the engine, real or virtual (replay at full speed).
+"""
+import time
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Clock:
+    """Horloge système : heure Unix et temps monotone réels."""
+
+    # False pour une horloge virtuelle : les mesures en temps réel (retard de boucle) n'ont pas de sens
+    realtime = True
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class VirtualClock(Clock):
+    """
+    Horloge virtuelle qui avance d'un coup jusqu'au prochain timer asyncio.
+
+    La boucle créée par `new_event_loop()` lit son temps sur cette horloge et,
+    quand plus rien n'est prêt, saute directement à l'échéance suivante au lieu
+    d'attendre : `asyncio.sleep`, `call_at` et `wait_for` s'exécutent donc
+    instantanément, dans le même ordre qu'en temps réel. Nécessite une boucle à
+    sélecteur (Linux, macOS).
+    """
+
+    realtime = False
+
+    def __init__(self, start: float):
+        self.start = start
+        self._elapsed = 0.0
+
+    def time(self) -> float:
+        return self.start + self._elapsed
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def advance(self, seconds: float) -> None:
+        if seconds > 0:
+            self._elapsed += seconds
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """Boucle asyncio pilotée par cette horloge."""
+        loop = asyncio.SelectorEventLoop()
+        selector = loop._selector
+        real_select = selector.select
+
+        def select(timeout: Optional[float] = None):
+            # `timeout` est le délai jusqu'au prochain timer : on le "dort" virtuellement
+            if timeout is None:
+                return real_select(None)
+            self.advance(timeout)
+            return real_select(0)
+
+        selector.select = select
+        loop.time = self.monotonic
+        return loop
+
+    def run(self, main: Awaitable[T]) -> T:
+        """Équivalent de `asyncio.run` en temps virtuel."""
+        loop = self.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(main)
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
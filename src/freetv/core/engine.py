@@ -4,85 +4,415 @@ Combines Freebox Client and OQEE Client to perform auto-mute.
 """
 import time
 import asyncio
-from typing import Optional
+import logging
+from typing import Dict, List, Optional, Set, Tuple
 
-from ..config import CHECK_INTERVAL, UNMUTE_BUFFER
+from ..config import (
+    CHECK_INTERVAL, CHECK_INTERVAL_TV_OFF, WARMER_ENABLED, WARMER_CHANNELS,
+    PERSISTENT_CACHE, VOLUME_REVALIDATE_INTERVAL, METRICS_ENABLED, CAPTURE_ENABLED,
+    CHANNEL_MAPPING, CHANNEL_MAPPING_FILE,
+)
+from .capture import CaptureLog
 from .client import FreeboxClient
+from .clock import SYSTEM_CLOCK, Clock
+from .lag import LoopLagMonitor
+from .mapping import ChannelMappingWatcher
+from .metrics import MUTE_ACTIONS, MUTE_LAG, REGISTRY, Gauge, MetricsServer
 from .oqee import OqeeClient
-from ..models import AdBreak
+from .scheduler import MuteScheduler
+from .store import CacheStore
+from .warmer import ScheduleWarmer
+from ..models import AdBreakIndex, EngineSnapshot, VolumeState
+
+logger = logging.getLogger(__name__)
+
+
+def _open_store() -> Optional[CacheStore]:
+    try:
+        return CacheStore()
+    except Exception as e:
+        logger.warning("Cache disque désactivé: %s", e)
+        return None
+
+
+def load_configured_mapping(watcher: Optional[ChannelMappingWatcher] = None) -> Dict[str, str]:
+    """
+    Mapping des chaînes lu maintenant : config.py complété par CHANNEL_MAPPING_FILE.
+
+    Fichier illisible : valeurs de config.py seules (avec un avertissement).
+    """
+    if watcher is None:
+        if not CHANNEL_MAPPING_FILE:
+            return dict(CHANNEL_MAPPING)
+        watcher = ChannelMappingWatcher(CHANNEL_MAPPING_FILE, lambda mapping: None)
+    try:
+        return watcher.load()
+    except (OSError, ValueError) as e:
+        logger.warning("Mapping des chaînes %s ignoré: %s", watcher.path, e)
+        return dict(watcher.defaults)
+
+
+def build_oqee_client(clock: Clock = SYSTEM_CLOCK) -> Tuple[OqeeClient, Optional[ChannelMappingWatcher]]:
+    """Client OQEE configuré (cache disque, mapping du fichier JSON) et sa surveillance du mapping."""
+    oqee_client = OqeeClient(store=_open_store() if PERSISTENT_CACHE else None, clock=clock)
+    if not CHANNEL_MAPPING_FILE:
+        return oqee_client, None
+    watcher = ChannelMappingWatcher(CHANNEL_MAPPING_FILE, oqee_client.set_channel_mapping)
+    oqee_client.set_channel_mapping(load_configured_mapping(watcher))
+    return oqee_client, watcher
+
 
 class AutoMuteEngine:
-    """Moteur principal de l'auto-mute."""
+    """
+    Moteur principal de l'auto-mute.
     
-    def __init__(self):
-        self.fbx_client = FreeboxClient()
-        self.oqee_client = OqeeClient()
+    `supervised` : moteur d'un lecteur parmi d'autres (voir core.supervisor). Le
+    superviseur porte alors seul les services du processus : /metrics, capture,
+    préchauffage et mesure du retard de la boucle.
+    
+    `capture`, `warm`, `serve_metrics` : services du processus, réglés par défaut
+    par la configuration (un rejeu les coupe, voir core.replay).
+    """
+    
+    def __init__(
+        self,
+        fbx_client: Optional[FreeboxClient] = None,
+        oqee_client: Optional[OqeeClient] = None,
+        clock: Clock = SYSTEM_CLOCK,
+        supervised: bool = False,
+        capture: bool = CAPTURE_ENABLED,
+        warm: bool = WARMER_ENABLED,
+        serve_metrics: bool = METRICS_ENABLED,
+    ):
+        self.clock = clock
+        self.fbx_client = fbx_client or FreeboxClient(clock=clock)
+        self.supervised = supervised
+        
+        # Mapping des chaînes depuis le fichier JSON (rechargé à chaud), sauf client OQEE fourni
+        self.mapping_watcher: Optional[ChannelMappingWatcher] = None
+        if oqee_client is None:
+            oqee_client, self.mapping_watcher = build_oqee_client(clock)
+        self.oqee_client = oqee_client
         self.check_interval = CHECK_INTERVAL
         self._is_muted_by_us = False
+        
+        # État du volume faisant autorité : mis à jour après chaque set_mute réussi,
+        # revalidé auprès de la Freebox seulement toutes les volume_revalidate_interval secondes
+        self._volume_state: Optional[VolumeState] = None
+        self._volume_checked_at: float = 0
+        self.volume_revalidate_interval = VOLUME_REVALIDATE_INTERVAL
+        # Commandes de mute réussies : une lecture partie avant l'une d'elles est ignorée
+        self._mute_commands: int = 0
+        
+        # Planning des transitions mute/unmute (timers)
+        self._scheduler = MuteScheduler(self._on_transition, clock=clock)
+        self._scheduled_channel: Optional[str] = None
+        self._scheduled_index: Optional[AdBreakIndex] = None
+        self._mute_lock = asyncio.Lock()
+        self._pending: Set[asyncio.Future] = set()
+        
+        # Les données OQEE sont rafraîchies en tâche de fond : le moteur ne lit que la mémoire
+        self._watched_channel: Optional[str] = None
+        self.oqee_client.on_update = self._on_oqee_update
+        self.last_step_duration: float = 0.0
+        self.steps: int = 0
+        
+        # Temps entre le démarrage et la première décision fondée sur des données OQEE
+        self._started_at: float = self.clock.monotonic()
+        self.time_to_first_decision: Optional[float] = None
+        self.first_decision_source: Optional[str] = None
+        
+        # Snapshots immuables publiés pour l'affichage (le rendu ne touche jamais au moteur)
+        self.snapshot = EngineSnapshot()
+        self.loop_lag = LoopLagMonitor()
+        
+        self.capture: Optional[CaptureLog] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.warmer: Optional[ScheduleWarmer] = None
+        # Jauges du processus, enregistrées du démarrage à l'arrêt (le registre ne garde pas le moteur)
+        self._gauges: List[Gauge] = []
+        if supervised:
+            return
+        
+        # Capture optionnelle du trafic API (écrite par un thread dédié)
+        if capture:
+            self.capture = CaptureLog(clock=clock)
+            for client in (self.fbx_client, self.oqee_client):
+                if hasattr(client, "capture"):
+                    client.capture = self.capture
+        
+        # Endpoint /metrics optionnel, servi par la même boucle
+        if serve_metrics:
+            self.metrics_server = MetricsServer()
+        
+        # Préchauffage optionnel des autres chaînes
+        if warm:
+            self.warmer = ScheduleWarmer(self.oqee_client, WARMER_CHANNELS or None)
 
     async def __aenter__(self):
-        await self.fbx_client.connect()
+        self._started_at = self.clock.monotonic()
+        if self.capture:
+            try:
+                self.capture.start()
+            except OSError as e:
+                logger.warning("Capture désactivée: %s", e)
+                self.capture = None
+        await self.oqee_client.open()
+        try:
+            await self.fbx_client.connect()
+        except BaseException:
+            await self.oqee_client.close()
+            if self.capture:
+                self.capture.stop()
+            raise
+        self.oqee_client.start_refresher()
+        if not self.supervised:
+            self._gauges = [
+                REGISTRY.gauge("freetv_loop_lag_p99_seconds", "Retard p99 de la boucle asyncio.",
+                               lambda: self.loop_lag.percentile(99)),
+                REGISTRY.gauge("freetv_step_duration_seconds", "Durée de la dernière itération de contrôle.",
+                               lambda: self.last_step_duration),
+            ]
+        if self.mapping_watcher:
+            self.mapping_watcher.start()
+        if self.clock.realtime and not self.supervised:
+            self.loop_lag.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.warning("Endpoint /metrics désactivé: %s", e)
+                self.metrics_server = None
+        if self.warmer:
+            self.warmer.start()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Plus de transition planifiée ; les commandes déjà lancées vont au bout avant la fermeture du client
+        self._clear_schedule()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        # Ne pas laisser la TV muette après l'arrêt
+        if self._is_muted_by_us:
+            await self._apply_mute(False)
+        if self.mapping_watcher:
+            await self.mapping_watcher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        for gauge in self._gauges:
+            REGISTRY.unregister(gauge)
+        self._gauges = []
+        await self.loop_lag.stop()
+        if self.warmer:
+            await self.warmer.stop()
+        await self.oqee_client.stop_refresher()
         await self.fbx_client.disconnect()
+        await self.oqee_client.close()
+        if self.capture:
+            # Vidage de la file et finalisation du segment hors de la boucle
+            await asyncio.get_running_loop().run_in_executor(None, self.capture.stop)
+
+    async def run(self) -> None:
+        """Boucle de contrôle : vérifie, publie un snapshot, attend. Aucun rendu ici."""
+        while True:
+            await self.run_step()
+            self._publish()
+            
+            # Délai dynamique : 5s si TV OFF, 1s si TV ON
+            player_status = self.fbx_client._last_player_status
+            if player_status and player_status.is_tv_on:
+                await asyncio.sleep(self.check_interval)
+            else:
+                await asyncio.sleep(CHECK_INTERVAL_TV_OFF)
 
     async def run_step(self) -> None:
-        """Exécute une itération de vérification."""
-        player_status = await self.fbx_client.get_player_status()
+        """Exécute une itération de vérification (changement de chaîne + rattrapage)."""
+        step_start = time.perf_counter()
+        try:
+            await self._run_step()
+        finally:
+            self.last_step_duration = time.perf_counter() - step_start
+            self.steps += 1
+
+    async def _run_step(self) -> None:
+        # Statut et volume sont indépendants : quand le volume est à revalider (et que la
+        # TV était allumée), les deux requêtes partent ensemble, sinon seul le statut est lu
+        last_status = self.fbx_client._last_player_status
+        volume_fetched = self._volume_due() and last_status is not None and last_status.is_tv_on
+        if volume_fetched:
+            commands = self._mute_commands
+            player_status, volume_state = await asyncio.gather(
+                self.fbx_client.get_player_status(), self.fbx_client.get_volume_state(),
+                return_exceptions=True,
+            )
+            if isinstance(volume_state, Exception):
+                logger.error("Erreur volume: %s", volume_state)
+            else:
+                self._store_volume_state(volume_state, commands)
+            if isinstance(player_status, BaseException):
+                raise player_status
+        else:
+            player_status = await self.fbx_client.get_player_status()
         
         if not player_status:
             return
         
         # Si la télé est éteinte ou aucune chaîne n'est regardée, on s'arrête ici
         if not player_status.is_tv_on:
+            if self._watched_channel:
+                logger.info("TV éteinte")
+            self._watched_channel = None
+            self.oqee_client.watch(None)
+            self._clear_schedule()
             return
             
-        # Mise à jour des données OQEE uniquement si une chaîne est regardée
-        await self.oqee_client.update_cache(player_status.channel_uuid)
-        
-        # Logique de mute
-        current_time = int(time.time())
-        active_ad = self.oqee_client.get_active_ad_break(current_time)
-        
-        # Vérification pub imminente (buffer)
-        imminent_ad = None
-        if not active_ad:
-            for ad in self.oqee_client.ad_breaks:
-                time_until = ad.start_time - current_time
-                if 0 < time_until <= UNMUTE_BUFFER:
-                    imminent_ad = ad
-                    break
-        
-        volume_state = await self.fbx_client.get_volume_state()
+        # Le rafraîchisseur OQEE suit la chaîne regardée (non bloquant)
+        if player_status.channel_uuid != self._watched_channel:
+            logger.info("Chaîne regardée: %s", player_status.channel_uuid)
+        self._watched_channel = player_status.channel_uuid
+        self.oqee_client.watch(player_status.channel_uuid)
+        
+        # Replanification des timers si la chaîne ou les pubs ont changé
+        self._sync_schedule(player_status.channel_uuid)
+        
+        volume_state = self._volume_state if volume_fetched else await self._get_volume_state()
         if not volume_state:
             return
-            
-        should_stay_muted = active_ad is not None or imminent_ad is not None
+        
+        # Rattrapage : les timers font le travail, mais si l'état réel diverge
+        # (mute manuel annulé, timer raté pendant une reconnexion...) on corrige.
+        should_stay_muted = self._scheduler.expected_state(self.clock.time())
         
         if should_stay_muted:
             if not volume_state.mute:
-                await self.fbx_client.set_mute(True)
-                self._is_muted_by_us = True
+                await self._apply_mute(True)
         else:
-            if volume_state.mute and self._is_muted_by_us: 
-                # On ne démute QUE si c'est nous qui avons muté (sécurité basique)
-                # Mais le script original démutait tout le temps "si volume_state.mute".
-                # Pour être fidèle à l'original :
-                await self.fbx_client.set_mute(False)
-                self._is_muted_by_us = False
+            if volume_state.mute and self._is_muted_by_us:
+                await self._apply_mute(False)
+
+    def _volume_due(self) -> bool:
+        """Vrai si l'état du volume connu est absent ou trop ancien."""
+        return (
+            self._volume_state is None
+            or self.clock.time() - self._volume_checked_at >= self.volume_revalidate_interval
+        )
+
+    def _store_volume_state(self, volume_state: Optional[VolumeState], commands: int) -> None:
+        """Garde un volume lu, sauf si une commande de mute a abouti pendant la lecture (état d'avant)."""
+        if volume_state and commands == self._mute_commands:
+            self._volume_state = volume_state
+            self._volume_checked_at = self.clock.time()
+
+    async def _get_volume_state(self, force: bool = False) -> Optional[VolumeState]:
+        """Retourne l'état du volume connu, revalidé auprès de la Freebox si trop ancien."""
+        if force or self._volume_due():
+            commands = self._mute_commands
+            self._store_volume_state(await self.fbx_client.get_volume_state(), commands)
+        return self._volume_state
+
+    def _set_volume_mute(self, mute: bool) -> None:
+        """Mise à jour optimiste après un set_mute réussi."""
+        volume = self._volume_state.volume if self._volume_state else 0
+        self._volume_state = VolumeState(mute=mute, volume=volume)
+        self._mute_commands += 1
+
+    def _sync_schedule(self, channel_uuid: str) -> None:
+        """Reconstruit le planning des transitions si les données OQEE ont changé."""
+        index = self.oqee_client.ad_index if self.oqee_client.ad_breaks_channel == channel_uuid else AdBreakIndex()
+        if channel_uuid == self._scheduled_channel and index == self._scheduled_index:
+            return
+        
+        self._scheduled_channel = channel_uuid
+        self._scheduled_index = index
+        expected = self._scheduler.schedule(index)
+        
+        if self.time_to_first_decision is None and self.oqee_client.ad_breaks_channel == channel_uuid:
+            self.time_to_first_decision = self.clock.monotonic() - self._started_at
+            self.first_decision_source = "disk" if self.oqee_client.served_from_disk else "live"
+        
+        if expected != self._is_muted_by_us:
+            self._on_transition(expected)
+
+    def _on_oqee_update(self) -> None:
+        """Appelé par le rafraîchisseur OQEE quand le planning change."""
+        if self._watched_channel:
+            self._sync_schedule(self._watched_channel)
+
+    def _clear_schedule(self) -> None:
+        self._scheduler.cancel()
+        self._scheduled_channel = None
+        self._scheduled_index = None
+
+    def _on_transition(self, mute: bool) -> None:
+        """Callback des timers : lance la commande de mute sans bloquer la boucle."""
+        task = asyncio.ensure_future(self._apply_mute(mute))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _apply_mute(self, mute: bool) -> None:
+        """Applique un état de mute (sérialisé pour éviter les commandes croisées)."""
+        async with self._mute_lock:
+            if self._volume_state is None:
+                await self._get_volume_state(force=True)
+            
+            if mute:
+                # Déjà muté (par l'utilisateur ou par nous) : rien à faire
+                if self._volume_state and self._volume_state.mute:
+                    return
+                if await self.fbx_client.set_mute(True):
+                    self._is_muted_by_us = True
+                    self._set_volume_mute(True)
+                    self._publish()
+                    self._record_mute(True)
+                    logger.info("Mute (publicité sur %s)", self._watched_channel)
+                else:
+                    MUTE_ACTIONS.inc("mute", "error")
+            else:
+                # On ne démute QUE si c'est nous qui avons muté
+                if not self._is_muted_by_us:
+                    return
+                if await self.fbx_client.set_mute(False):
+                    self._is_muted_by_us = False
+                    self._set_volume_mute(False)
+                    self._publish()
+                    self._record_mute(False)
+                    logger.info("Démute (fin de publicité sur %s)", self._watched_channel)
+                else:
+                    MUTE_ACTIONS.inc("unmute", "error")
+
+    def _record_mute(self, mute: bool) -> None:
+        """Compte la commande et mesure son retard par rapport au début (ou à la fin) de la pub."""
+        action = "mute" if mute else "unmute"
+        MUTE_ACTIONS.inc(action, "ok")
+        transition = self._scheduler.last_transition(self.clock.time())
+        if transition is not None and transition.mute == mute:
+            MUTE_LAG.observe(self.clock.time() - transition.boundary, action)
+
+    def _publish(self) -> None:
+        """Publie un nouveau snapshot immuable de l'état."""
+        self.snapshot = EngineSnapshot(
+            player_status=self.fbx_client._last_player_status,
+            volume_state=self._volume_state,
+            ad_index=self.oqee_client.ad_index,
+            current_program=self.oqee_client.current_program,
+            ad_last_fetch=self.oqee_client._ad_breaks_last_fetch,
+            ad_next_refresh=self.oqee_client.next_ad_refresh,
+            time_to_first_decision=self.time_to_first_decision,
+            loop_lag_p99=self.loop_lag.percentile(99),
+            loop_lag_max=self.loop_lag.max_lag,
+            published_at=self.clock.time(),
+        )
 
     def get_display_state(self):
         """Retourne l'état actuel pour l'affichage."""
-        current_time = int(time.time())
+        current_time = int(self.clock.time())
+        ad_index = self.oqee_client.ad_index
         return {
             "player_status": self.fbx_client._last_player_status,
-            "ad_breaks": self.oqee_client.ad_breaks,
-            "active_ad": self.oqee_client.get_active_ad_break(current_time),
-            "next_ad": self.oqee_client.get_next_ad_break(current_time),
+            "ad_index": ad_index,
+            "active_ad": ad_index.active(current_time),
+            "next_ad": ad_index.next(current_time),
             "current_program": self.oqee_client.current_program,
-            # Note: volume_state needs to be fetched fresh usually, but for display
-            # we might need to cache it or fetch it inside the UI loop?
-            # Actually, the UI loop in original script called get_volume_state() every loop.
-            # We'll leave it to the UI loop to call client methods or engine methods.
+            "volume_state": self._volume_state,
+            "time_to_first_decision": self.time_to_first_decision,
         }
@@ -0,0 +1,255 @@
+"""
+Sharded Fleet Runner.
+Spreads many Freebox Players over worker processes (one Supervisor each); the parent aggregates health and metrics.
+"""
+import os
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing
+from collections import Counter
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Dict, List, Optional
+
+from ..config import LOG_LEVEL, FLEET_REPORT_INTERVAL, METRICS_ENABLED
+from .client import FreeboxClient
+from .metrics import REGISTRY, MetricsRegistry, MetricsServer, merge_exports
+from .supervisor import PlayerConfig, Supervisor
+
+logger = logging.getLogger(__name__)
+
+# Construit le client d'un player dans le worker (fonction de module : elle est picklée)
+ClientFactory = Callable[[PlayerConfig], FreeboxClient]
+
+
+def freebox_client(player: PlayerConfig) -> FreeboxClient:
+    return FreeboxClient(player.host, player.port)
+
+
+def shard_players(players: List[PlayerConfig], workers: int) -> List[List[PlayerConfig]]:
+    """Répartit les players en `workers` lots de tailles égales à un près (lots vides écartés)."""
+    shards: List[List[PlayerConfig]] = [[] for _ in range(max(1, workers))]
+    for i, player in enumerate(players):
+        shards[i % len(shards)].append(player)
+    return [shard for shard in shards if shard]
+
+
+def _report(index: int, supervisor: Supervisor) -> dict:
+    return {
+        "worker": index,
+        "pid": os.getpid(),
+        "at": time.time(),
+        "players": supervisor.health(),
+        "loop_lag_p99": supervisor.loop_lag.percentile(99),
+        "metrics": REGISTRY.export(),
+    }
+
+
+async def _worker(index: int, players: List[PlayerConfig], connection: Connection,
+                  client_factory: ClientFactory, report_interval: float) -> None:
+    # SIGTERM du parent : arrêt propre (AutoMuteEngine.__aexit__ démute les TV mutées par nous)
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    # Seul le parent écoute sur METRICS_PORT : les workers lui envoient leurs métriques
+    supervisor = Supervisor({player.name: client_factory(player) for player in players}, serve_metrics=False)
+    async with supervisor:
+        task = asyncio.ensure_future(supervisor.run())
+        try:
+            while not stopping.is_set():
+                connection.send(_report(index, supervisor))
+                try:
+                    await asyncio.wait_for(stopping.wait(), report_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def _worker_main(index: int, players: List[PlayerConfig], connection: Connection,
+                 client_factory: ClientFactory, report_interval: float) -> None:
+    """Point d'entrée d'un processus worker : une boucle asyncio, un superviseur."""
+    # Ctrl+C atteint tout le groupe de processus : c'est le parent qui orchestre l'arrêt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # SIGHUP relayé par le parent : ignoré sauf si le surveillant du mapping s'y abonne
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    logging.basicConfig(
+        level=LOG_LEVEL.upper(),
+        format=f"%(asctime)s level=%(levelname)s worker={index} logger=%(name)s %(message)s",
+    )
+    asyncio.run(_worker(index, players, connection, client_factory, report_interval))
+
+
+class FleetRunner:
+    """
+    Répartit les players sur plusieurs processus, chacun avec sa boucle asyncio et son
+    superviseur (un client OQEE partagé par processus).
+
+    Les workers envoient toutes les `report_interval` secondes l'état de leurs players
+    et l'export de leurs métriques ; le parent en tire santé et /metrics agrégés, et
+    relance un worker mort.
+    """
+
+    def __init__(
+        self,
+        players: List[PlayerConfig],
+        workers: int = 0,
+        client_factory: ClientFactory = freebox_client,
+        report_interval: float = FLEET_REPORT_INTERVAL,
+    ):
+        if not players:
+            raise ValueError("aucun player à superviser")
+        self.shards = shard_players(players, workers or os.cpu_count() or 1)
+        self.client_factory = client_factory
+        self.report_interval = report_interval
+        # spawn : des workers neufs, sans la boucle ni les threads du parent
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+        self.processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        # Un tube par worker (une file partagée resterait verrouillée par un worker tué en pleine écriture)
+        self._connections: Dict[int, Connection] = {}
+        self.reports: Dict[int, dict] = {}
+        self.worker_restarts: Counter = Counter()
+        self._collector: Optional[asyncio.Task] = None
+        self.metrics_server: Optional[MetricsServer] = (
+            MetricsServer(self, health=self.health) if METRICS_ENABLED else None
+        )
+
+    def _spawn(self, index: int) -> None:
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main, name=f"freetv-worker-{index}", daemon=True,
+            args=(index, self.shards[index], writer, self.client_factory, self.report_interval),
+        )
+        process.start()
+        writer.close()  # Seul le worker écrit : sa mort ferme le tube (EOF)
+        self.processes[index] = process
+        self._connections[index] = reader
+
+    async def __aenter__(self):
+        self._collector = asyncio.ensure_future(self._collect())
+        for index in range(len(self.shards)):
+            self._spawn(index)
+        # `kill -HUP` au parent : chaque worker recharge son mapping (action par défaut : tout le parc tué)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload_mapping)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # Windows (pas de SIGHUP) / thread secondaire
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.warning("Endpoint /metrics désactivé: %s", e)
+                self.metrics_server = None
+        logger.info("%d players répartis sur %d processus", sum(map(len, self.shards)), len(self.shards))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        try:
+            loop.remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass
+        for process in self.processes.values():
+            process.terminate()
+        # Le collecteur continue de lire les tubes : un worker bloqué sur un envoi ne se terminerait pas
+        for process in self.processes.values():
+            await loop.run_in_executor(None, process.join, self.report_interval + 5)
+            if process.is_alive():
+                logger.warning("Worker %s arrêté de force", process.name)
+                process.kill()
+                await loop.run_in_executor(None, process.join)
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+
+    def reload_mapping(self) -> None:
+        """Relaie SIGHUP aux workers en vie (rechargement du mapping des chaînes)."""
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+        logger.info("SIGHUP relayé à %d workers", len(self.processes))
+
+    async def _collect(self) -> None:
+        """Lit les rapports des workers (attente des tubes dans un thread)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            for report in await loop.run_in_executor(None, self._receive, 0.2):
+                self.reports[report["worker"]] = report
+
+    def _receive(self, timeout: float) -> List[dict]:
+        connections = [conn for conn in self._connections.values() if not conn.closed]
+        reports = []
+        try:
+            ready = wait(connections, timeout)
+        except OSError:
+            return reports  # Tube fermé entre-temps : il sera ignoré au prochain tour
+        for conn in ready:
+            try:
+                reports.append(conn.recv())
+            except (EOFError, OSError):
+                conn.close()  # Worker mort : run() le relancera avec un nouveau tube
+        return reports
+
+    async def run(self) -> None:
+        """Surveille les workers jusqu'à annulation ; relance ceux qui meurent."""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            for index, process in list(self.processes.items()):
+                if process.is_alive() or self._stopping:
+                    continue
+                self.worker_restarts[index] += 1
+                logger.error("Worker %d mort (code %s), relance", index, process.exitcode)
+                self.reports.pop(index, None)
+                self._spawn(index)
+
+    def health(self) -> dict:
+        """Santé agrégée : par worker, par player, et totaux."""
+        now = time.time()
+        workers: Dict[str, dict] = {}
+        players: Dict[str, dict] = {}
+        for index, process in self.processes.items():
+            report = self.reports.get(index)
+            workers[str(index)] = {
+                "pid": process.pid,
+                "alive": process.is_alive(),
+                "restarts": self.worker_restarts[index],
+                "players": len(self.shards[index]),
+                "report_age": round(now - report["at"], 3) if report else None,
+                "loop_lag_p99": report["loop_lag_p99"] if report else None,
+            }
+            for name, state in (report["players"] if report else {}).items():
+                players[name] = {**state, "worker": index}
+        connected = [state for state in players.values() if state["connected"]]
+        return {
+            "workers": workers,
+            "players": players,
+            "totals": {
+                "workers_alive": sum(worker["alive"] for worker in workers.values()),
+                "players": sum(map(len, self.shards)),
+                "connected": len(connected),
+                "tv_on": sum(state["tv_on"] for state in connected),
+                "steps": sum(state["steps"] for state in connected),
+            },
+        }
+
+    def registry(self) -> MetricsRegistry:
+        """Métriques des workers agrégées, plus celles du parc."""
+        registry = merge_exports({str(index): report["metrics"] for index, report in self.reports.items()})
+        registry.gauge("freetv_fleet_workers_alive", "Processus workers en vie.",
+                       lambda: sum(process.is_alive() for process in self.processes.values()))
+        registry.gauge("freetv_fleet_worker_restarts", "Workers relancés depuis le démarrage.",
+                       lambda: sum(self.worker_restarts.values()))
+        registry.gauge("freetv_fleet_players_connected", "Players connectés, tous workers confondus.",
+                       lambda: self.health()["totals"]["connected"])
+        return registry
+
+    def render(self) -> str:
+        """Exposition Prometheus agrégée (interface attendue par MetricsServer)."""
+        return self.registry().render()
@@ -0,0 +1,104 @@
+"""
+Freebox API Gate.
+Per-box limiter: bounded concurrency, spaced calls, coalesced reads and serialized writes.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from ..config import FREEBOX_MAX_CONCURRENT, FREEBOX_MIN_INTERVAL, FREEBOX_READ_WINDOW
+from .clock import SYSTEM_CLOCK, Clock
+from .metrics import FREEBOX_SAVED
+
+T = TypeVar("T")
+
+
+class ApiGate:
+    """
+    Porte d'accès à l'API d'une box, partagée par tous ses appelants.
+
+    - au plus `max_concurrent` lectures en cours, leurs départs espacés d'au moins `min_interval` ;
+    - un appelant qui arrive pendant une lecture identique en attend le résultat, et une
+      lecture réussie est resservie pendant `read_window` secondes ;
+    - écritures (write) : une à la fois, l'appelant suivant voit l'état laissé par la
+      précédente. Elles passent devant les lectures (une commande de mute n'attend pas un statut).
+
+    Les primitives asyncio sont créées au premier appel, dans la boucle qui les utilise.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = FREEBOX_MAX_CONCURRENT,
+        min_interval: float = FREEBOX_MIN_INTERVAL,
+        read_window: float = FREEBOX_READ_WINDOW,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = min_interval
+        self.read_window = read_window
+        self.clock = clock
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._next_start: float = 0.0
+        # Dernière lecture réussie par nom : (instant monotone, résultat)
+        self._reads: Dict[str, Tuple[float, Any]] = {}
+        # Incrémenté par invalidate : une lecture partie avant l'écriture n'est pas gardée
+        self._generation: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Exécute une lecture de la box dans les limites de concurrence et de cadence."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots:
+            # Créneau réservé avant d'attendre : les départs restent espacés sous concurrence
+            # (temps de la boucle, celui de asyncio.sleep ; virtuel sous VirtualClock)
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            return await fn()
+
+    async def read(self, name: str, fn: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Lecture coalescée : partagée si déjà en cours, resservie si assez récente (None n'est pas gardé)."""
+        cached = self._reads.get(name)
+        if cached is not None and self.clock.monotonic() - cached[0] < self.read_window:
+            FREEBOX_SAVED.inc(name, "recent")
+            return cached[1]
+        pending = self._inflight.get(name)
+        if pending is not None:
+            FREEBOX_SAVED.inc(name, "coalesced")
+            return await asyncio.shield(pending)
+        pending = self._inflight[name] = asyncio.get_running_loop().create_future()
+        generation = self._generation.get(name, 0)
+        result = None
+        try:
+            result = await self.call(fn)
+            if result is not None and self._generation.get(name, 0) == generation:
+                self._reads[name] = (self.clock.monotonic(), result)
+            return result
+        finally:
+            # invalidate() a pu détacher cette lecture : ne pas retirer celle partie après
+            if self._inflight.get(name) is pending:
+                del self._inflight[name]
+            pending.set_result(result)
+
+    async def write(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Écriture sérialisée avec les autres écritures de la box."""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            # La lecture suivante laisse passer min_interval après la commande
+            self._next_start = max(self._next_start, asyncio.get_running_loop().time() + self.min_interval)
+            return await fn()
+
+    def invalidate(self, name: str) -> None:
+        """
+        Oublie la dernière lecture `name` (l'écriture qui vient de la rendre fausse).
+        
+        Une lecture encore en cours est détachée : ses appelants gardent son résultat,
+        mais l'appel suivant relit la box au lieu de la rejoindre.
+        """
+        self._reads.pop(name, None)
+        self._inflight.pop(name, None)
+        self._generation[name] = self._generation.get(name, 0) + 1
@@ -0,0 +1,51 @@
+"""
+Event Loop Lag Monitor.
+Measures how late the asyncio loop wakes up compared to what was asked.
+"""
+import asyncio
+from collections import deque
+from typing import Deque, Optional
+
+
+class LoopLagMonitor:
+    """Mesure le retard de réveil de la boucle asyncio (un callback bloquant le fait grimper)."""
+
+    def __init__(self, interval: float = 0.05, window: int = 1200):
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.max_lag: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self.max_lag = 0.0
+
+    def percentile(self, q: float) -> float:
+        """Retard (s) au percentile `q` (0-100) sur la fenêtre glissante."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
@@ -0,0 +1,120 @@
+"""
+Channel Mapping.
+Loads the Freebox UUID -> OQEE ID mapping from JSON and reloads it on SIGHUP or file change.
+"""
+import json
+import signal
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from ..config import CHANNEL_MAPPING, CHANNEL_MAPPING_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def load_channel_mapping(path: Union[str, Path]) -> Dict[str, str]:
+    """
+    Lit un mapping UUID -> ID OQEE.
+
+    Accepte le fichier écrit par `scripts/channel_mapper.py` ({"mappings": {...}, ...})
+    ou un simple objet {"uuid-webtv-612": "536", ...}.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    mappings = data.get("mappings", data) if isinstance(data, dict) else None
+    if not isinstance(mappings, dict):
+        raise ValueError("objet JSON attendu (UUID -> ID OQEE)")
+    return {str(uuid): str(oqee_id) for uuid, oqee_id in mappings.items() if oqee_id}
+
+
+class ChannelMappingWatcher:
+    """
+    Surveille le fichier de mapping et publie chaque nouvelle version via `on_change`.
+
+    Le mapping publié est toujours un dict neuf et complet (valeurs par défaut de
+    config.py complétées par le fichier) : l'échange est atomique pour le lecteur.
+    Un fichier illisible ou incomplet (écriture en cours) laisse le mapping inchangé.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        on_change: Callable[[Dict[str, str]], None],
+        defaults: Dict[str, str] = CHANNEL_MAPPING,
+        interval: float = CHANNEL_MAPPING_RELOAD_INTERVAL,
+    ):
+        self.path = Path(path).expanduser()
+        self.on_change = on_change
+        self.defaults = dict(defaults)
+        self.interval = interval
+        self.mapping: Dict[str, str] = dict(self.defaults)
+        self.reloads: int = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sighup = False
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> Dict[str, str]:
+        """Lit le fichier (valeurs par défaut s'il n'existe pas) sans rien publier."""
+        self._signature = self._stat()
+        if self._signature is None:
+            self.mapping = dict(self.defaults)
+        else:
+            self.mapping = {**self.defaults, **load_channel_mapping(self.path)}
+        return self.mapping
+
+    def reload(self) -> bool:
+        """Relit le fichier et publie le mapping s'il a changé. Retourne True si publié."""
+        previous = self.mapping
+        try:
+            mapping = self.load()
+        except (OSError, ValueError) as e:
+            self.mapping = previous
+            logger.warning("Mapping des chaînes %s illisible, version précédente conservée: %s", self.path, e)
+            return False
+        if mapping == previous:
+            return False
+        added = mapping.keys() - previous.keys()
+        removed = previous.keys() - mapping.keys()
+        changed = {uuid for uuid in mapping.keys() & previous.keys() if mapping[uuid] != previous[uuid]}
+        logger.info("Mapping des chaînes rechargé: %d ajoutées, %d modifiées, %d retirées",
+                    len(added), len(changed), len(removed))
+        self.reloads += 1
+        self.on_change(mapping)
+        return True
+
+    def start(self) -> None:
+        """Surveille le fichier (mtime/taille) et recharge sur SIGHUP."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload)
+            self._sighup = True
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # Windows (pas de SIGHUP) / thread secondaire : la surveillance du fichier suffit
+
+    async def stop(self) -> None:
+        if self._sighup:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._sighup = False
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._stat() != self._signature:
+                self.reload()
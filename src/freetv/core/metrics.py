@@ -0,0 +1,328 @@
+"""
+Engine Metrics.
+In-process counters/histograms and an optional Prometheus `/metrics` endpoint.
+"""
+import time
+import functools
+import logging
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from aiohttp import web
+
+from ..config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+T = TypeVar("T")
+
+# Latences réseau (s) : de la milliseconde à la dizaine de secondes (timeout)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Durée d'ouverture d'un disjoncteur (s) : de la panne passagère à l'heure
+BREAKER_OPEN_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+# Retard du mute par rapport au début de la pub (négatif = muté avant la pub, le cas normal)
+MUTE_LAG_BUCKETS = (-10.0, -5.0, -2.0, -1.0, -0.5, 0.0, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+# Attente d'un jeton du budget OQEE (s) : 0 = servi tout de suite, jusqu'au préchauffage différé
+DEFERRAL_BUCKETS = (0.0, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur monotone, une valeur par combinaison de labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def export(self) -> Dict[LabelValues, float]:
+        return dict(self._values)
+
+    def merge(self, values: Mapping[LabelValues, float]) -> None:
+        for labels, value in values.items():
+            self.inc(*labels, amount=value)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histogramme à seaux fixes (un bisect et une incrémentation par observation)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [compte par seau (+Inf en dernier), somme]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def export(self) -> Dict[LabelValues, Tuple[List[int], float]]:
+        return {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+
+    def merge(self, series: Mapping[LabelValues, Tuple[List[int], float]]) -> None:
+        for labels, (counts, total) in series.items():
+            mine = self._series.get(labels)
+            if mine is None:
+                mine = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            for i, count in enumerate(counts):
+                mine[0][i] += count
+            mine[1][0] += total
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Jauge lue au moment du scrape (aucun coût entre deux scrapes)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Optional[float]]):
+        super().__init__(name, documentation)
+        self.read = read
+
+    def render(self) -> List[str]:
+        value = self.read()
+        if value is None:
+            return []
+        return self._header() + [f"{self.name} {_format_value(value)}"]
+
+    def export(self) -> Optional[float]:
+        return self.read()
+
+
+class LabeledGauge(Counter):
+    """Jauge à labels dont les valeurs sont posées (agrégation de plusieurs processus)."""
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, documentation, read))
+
+    def unregister(self, metric: _Metric) -> None:
+        """Retire `metric`, s'il n'a pas été remplacé depuis par une métrique du même nom."""
+        if self._metrics.get(metric.name) is metric:
+            del self._metrics[metric.name]
+
+    def render(self) -> str:
+        """Format texte d'exposition Prometheus (0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def export(self) -> Dict[str, Tuple[str, str, LabelValues, Optional[Tuple[float, ...]], Any]]:
+        """Valeurs brutes de chaque métrique (picklables), pour agrégation par un autre processus."""
+        return {
+            name: (metric.kind, metric.documentation, metric.labelnames, getattr(metric, "buckets", None), metric.export())
+            for name, metric in self._metrics.items()
+        }
+
+
+def merge_exports(exports: Mapping[str, Mapping[str, tuple]], label: str = "worker") -> MetricsRegistry:
+    """
+    Registre agrégé des exports de plusieurs processus (MetricsRegistry.export).
+
+    Compteurs et histogrammes sont sommés ; les jauges, qui n'ont pas de sens une
+    fois additionnées (retard de boucle...), sont gardées par processus sous le label `label`.
+    """
+    registry = MetricsRegistry()
+    for source, export in exports.items():
+        for name, (kind, documentation, labelnames, buckets, data) in export.items():
+            metric = registry._metrics.get(name)
+            if kind == "gauge":
+                if data is None:
+                    continue
+                if metric is None:
+                    metric = registry.register(LabeledGauge(name, documentation, (label,)))
+                metric.set(data, source)
+            elif kind == "counter":
+                if metric is None:
+                    metric = registry.counter(name, documentation, labelnames)
+                metric.merge(data)
+            else:
+                if metric is None:
+                    metric = registry.histogram(name, documentation, labelnames, buckets)
+                metric.merge(data)
+    return registry
+
+
+REGISTRY = MetricsRegistry()
+
+FREEBOX_REQUESTS = REGISTRY.counter(
+    "freetv_freebox_requests_total", "Appels FreeboxClient par méthode et résultat.", ("call", "outcome"))
+FREEBOX_LATENCY = REGISTRY.histogram(
+    "freetv_freebox_request_seconds", "Durée des appels FreeboxClient.", ("call",))
+FREEBOX_SAVED = REGISTRY.counter(
+    "freetv_freebox_saved_total",
+    "Appels Freebox évités : lecture partagée (coalesced, recent) ou mute déjà dans l'état demandé (skipped).",
+    ("call", "reason"))
+OQEE_REQUESTS = REGISTRY.counter(
+    "freetv_oqee_requests_total",
+    "Requêtes OQEE par route et résultat (changed, unchanged, not_modified, error).", ("endpoint", "outcome"))
+OQEE_LATENCY = REGISTRY.histogram(
+    "freetv_oqee_request_seconds", "Durée des requêtes OQEE.", ("endpoint",))
+OQEE_COALESCED = REGISTRY.counter(
+    "freetv_oqee_coalesced_total",
+    "Appels OQEE servis par une requête (ou un rafraîchissement) déjà en cours pour la même chaîne.", ("endpoint",))
+OQEE_BUDGET_DEFERRAL = REGISTRY.histogram(
+    "freetv_oqee_budget_deferral_seconds",
+    "Attente d'un jeton du budget OQEE avant envoi (0 = servi tout de suite), par priorité de service.",
+    ("priority",), buckets=DEFERRAL_BUCKETS)
+OQEE_AD_CACHE = REGISTRY.counter(
+    "freetv_oqee_ad_cache_total",
+    "Planning pub servi depuis le cache (hit) ou rafraîchi (refresh/miss), par chemin.", ("path", "result"))
+MUTE_ACTIONS = REGISTRY.counter(
+    "freetv_mute_actions_total", "Commandes de mute/démute envoyées.", ("action", "outcome"))
+MUTE_LAG = REGISTRY.histogram(
+    "freetv_mute_lag_seconds",
+    "Instant du mute appliqué moins AdBreak.start_time (démute : moins AdBreak.end_time).",
+    ("action",), buckets=MUTE_LAG_BUCKETS)
+BREAKER_OPEN_SECONDS = REGISTRY.histogram(
+    "freetv_breaker_open_seconds", "Durée pendant laquelle un disjoncteur est resté ouvert, par endpoint.",
+    ("endpoint",), buckets=BREAKER_OPEN_BUCKETS)
+BREAKER_REJECTED = REGISTRY.counter(
+    "freetv_breaker_rejected_total", "Appels non envoyés car le disjoncteur de l'endpoint était ouvert.", ("endpoint",))
+BREAKER_OPENED = REGISTRY.counter(
+    "freetv_breaker_opened_total", "Ouvertures (et réouvertures après un test raté) des disjoncteurs.", ("endpoint",))
+
+
+def instrumented(call: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Décore une méthode async de FreeboxClient : durée et résultat de l'appel.
+
+    Ces méthodes renvoient None/False en cas d'erreur au lieu de lever.
+    """
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs) -> T:
+            start = time.perf_counter()
+            result = await fn(*args, **kwargs)
+            FREEBOX_LATENCY.observe(time.perf_counter() - start, call)
+            FREEBOX_REQUESTS.inc(call, "error" if result is None or result is False else "ok")
+            return result
+        return wrapper
+    return decorator
+
+
+class MetricsServer:
+    """
+    Sert `/metrics` depuis la boucle asyncio du moteur.
+
+    `registry` : tout objet doté de render() (MetricsRegistry, ou un agrégat calculé au scrape).
+    `health` : si fourni, servi en JSON sur `/health`.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = METRICS_HOST, port: int = METRICS_PORT,
+                 health: Optional[Callable[[], dict]] = None):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.health = health
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.health())
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        if self.health is not None:
+            app.router.add_get("/health", self._health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port effectif (utile avec port=0)
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info("Métriques exposées sur http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,106 +1,610 @@
 """
 OQEE API Client and Logic.
 """
+import json
 import time
+import logging
+import asyncio
+import random
+import hashlib
 import aiohttp
-from typing import List, Optional
-from rich.console import Console
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
 
-from ..models import AdBreak, TVProgram
-from ..config import CHANNEL_MAPPING, AD_BREAKS_CACHE_TTL, AD_MERGE_MAX_GAP
+from ..models import AdBreak, AdBreakIndex, EpgBlock, TVProgram
+from ..config import (
+    CHANNEL_MAPPING, AD_MERGE_MAX_GAP, UNMUTE_BUFFER,
+    OQEE_API_URL, OQEE_REQUEST_TIMEOUT, OQEE_MAX_CONNECTIONS_PER_HOST,
+    OQEE_KEEPALIVE_TIMEOUT, OQEE_DNS_CACHE_TTL, OQEE_MAX_STALENESS,
+    OQEE_REFRESH_MIN, OQEE_REFRESH_MAX, OQEE_REFRESH_LEAD_FACTOR, OQEE_AD_ANNOUNCE_LEAD,
+    EPG_BLOCK_TTL, EPG_PREFETCH_LEAD, PERSISTENT_CACHE_MAX_AGE, OQEE_BREAKER_MAX_DELAY,
+    OQEE_BUDGET_RATE, OQEE_BUDGET_BURST,
+)
+from .breaker import CircuitBreaker
+from .capture import CaptureLog
+from .clock import SYSTEM_CLOCK, Clock
+from .budget import Priority, RequestBudget
+from .metrics import OQEE_AD_CACHE, OQEE_COALESCED, OQEE_LATENCY, OQEE_REQUESTS
+from .store import CacheStore
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# L'API EPG découpe la journée en blocs de 6h
+EPG_WINDOW = 21600
+
+# Brotli n'est négocié que si le décodeur est installé
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+@dataclass
+class FetchStats:
+    """Compteurs de trafic OQEE d'une chaîne."""
+    requests: int = 0
+    bytes_received: int = 0
+    not_modified: int = 0
+    parse_skips: int = 0
+    errors: int = 0
+    coalesced: int = 0  # Appels servis par une requête déjà en cours
+
+
+@dataclass
+class _HttpCacheEntry:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: bytes
+    parsed: Any
+
+
+@dataclass
+class _AdCacheEntry:
+    index: AdBreakIndex
+    fetched_at: float
+    provisional: bool = False  # Chargé depuis le disque, en attente du premier fetch live
+
+
+@dataclass
+class _EpgCacheEntry:
+    block: EpgBlock
+    fetched_at: float
+
+
+def epg_window_start(current_time: float) -> int:
+    """Début de la fenêtre EPG de 6h contenant `current_time` (alignement de l'API)."""
+    return (int(current_time) // EPG_WINDOW) * EPG_WINDOW
+
+
+class SharedOqeeState:
+    """
+    État commun à un OqeeClient et à ses vues (OqeeClient.view).
+    
+    Tout ce qui décrit l'API et les chaînes plutôt qu'un lecteur : mapping, session,
+    caches pub/EPG, validateurs HTTP, statistiques, disjoncteurs, requêtes en cours,
+    budget, capture, cache disque et cadence de rafraîchissement. Un réglage modifié
+    depuis n'importe quel client vaut pour tous.
+    """
+    
+    def __init__(
+        self,
+        channel_mapping: Dict[str, str],
+        base_url: str,
+        store: Optional[CacheStore],
+        session: Optional[aiohttp.ClientSession],
+        clock: Clock,
+        budget: Optional[RequestBudget],
+    ):
+        # UUID Freebox -> ID OQEE, remplacé d'un bloc par set_channel_mapping (rechargement à chaud)
+        self.channel_mapping: Dict[str, str] = dict(channel_mapping)
+        self.base_url = base_url.rstrip('/')
+        self.clock = clock
+        
+        # Session HTTP partagée (keep-alive + cache DNS), ouverte par open() si non fournie
+        self.session: Optional[aiohttp.ClientSession] = session
+        
+        # Caches par chaîne (ID OQEE), alimentés par les rafraîchisseurs et le préchauffage
+        self.ad_cache: Dict[str, _AdCacheEntry] = {}
+        self.epg_cache: Dict[Tuple[str, int], _EpgCacheEntry] = {}
+        self.epg_attempts: Dict[Tuple[str, int], float] = {}
+        self.ad_attempts: Dict[str, float] = {}
+        
+        # Validateurs HTTP et dernier résultat parsé par URL (requêtes conditionnelles)
+        self.http_cache: Dict[str, _HttpCacheEntry] = {}
+        self.fetch_stats: Dict[str, FetchStats] = {}
+        # Journal de capture optionnel (corps bruts, pour le rejeu)
+        self.capture: Optional[CaptureLog] = None
+        # Un disjoncteur par route : pendant une panne OQEE, plus de requête à chaque tick
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.backoff_rng = random.Random()
+        # Requêtes et rafraîchissements en cours par (endpoint, ID OQEE[, URL]) : les appelants
+        # concurrents (moteurs, préchauffage, autres lecteurs) attendent le même résultat
+        self.inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        # Budget de requêtes (None = pas de limite)
+        if budget is None and OQEE_BUDGET_RATE > 0:
+            budget = RequestBudget(OQEE_BUDGET_RATE, OQEE_BUDGET_BURST, clock=clock)
+        self.budget = budget
+        
+        # Cadence adaptative du planning pub (voir OqeeClient.ad_refresh_interval) : les
+        # caches étant communs, une chaîne est revalidée au même rythme pour tous les lecteurs
+        self.refresh_min = OQEE_REFRESH_MIN
+        self.refresh_max = OQEE_REFRESH_MAX
+        self.refresh_lead_factor = OQEE_REFRESH_LEAD_FACTOR
+        self.announce_lead = OQEE_AD_ANNOUNCE_LEAD
+        self.program_cache_ttl = 30
+        self.max_staleness = OQEE_MAX_STALENESS
+        
+        # Cache disque optionnel, écrit en arrière-plan (un seul thread)
+        self.store = store
+        self.store_executor: Optional[ThreadPoolExecutor] = None
+        
+        # Le client d'origine puis ses vues
+        self.clients: List["OqeeClient"] = []
+
+
+class _Shared:
+    """Attribut d'OqeeClient lu et écrit dans son SharedOqeeState."""
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __get__(self, client: Optional["OqeeClient"], owner: type) -> Any:
+        if client is None:
+            return self
+        return getattr(client.shared, self.name)
+    
+    def __set__(self, client: "OqeeClient", value: Any) -> None:
+        setattr(client.shared, self.name, value)
 
-console = Console()
 
 class OqeeClient:
-    """Client pour l'API OQEE (Pubs et EPG)."""
+    """
+    Client pour l'API OQEE (Pubs et EPG).
+    
+    Un client sert le planning d'une chaîne regardée. Pour plusieurs Freebox Players,
+    view() crée un client par lecteur adossé au même SharedOqeeState (caches, session
+    HTTP, disjoncteurs...) : le trafic OQEE suit le nombre de chaînes distinctes
+    regardées, pas le nombre de lecteurs.
+    """
+    
+    # État partagé avec les vues (voir SharedOqeeState)
+    channel_mapping = _Shared("channel_mapping")
+    base_url = _Shared("base_url")
+    _session = _Shared("session")
+    _ad_cache = _Shared("ad_cache")
+    _epg_cache = _Shared("epg_cache")
+    _epg_attempts = _Shared("epg_attempts")
+    _ad_attempts = _Shared("ad_attempts")
+    _http_cache = _Shared("http_cache")
+    fetch_stats = _Shared("fetch_stats")
+    capture = _Shared("capture")
+    breakers = _Shared("breakers")
+    backoff_rng = _Shared("backoff_rng")
+    _inflight = _Shared("inflight")
+    budget = _Shared("budget")
+    refresh_min = _Shared("refresh_min")
+    refresh_max = _Shared("refresh_max")
+    refresh_lead_factor = _Shared("refresh_lead_factor")
+    announce_lead = _Shared("announce_lead")
+    _program_cache_ttl = _Shared("program_cache_ttl")
+    max_staleness = _Shared("max_staleness")
+    store = _Shared("store")
+    _store_executor = _Shared("store_executor")
     
-    def __init__(self, channel_mapping: dict = CHANNEL_MAPPING):
-        self.channel_mapping = channel_mapping
+    def __init__(
+        self,
+        channel_mapping: Optional[Dict[str, str]] = None,
+        base_url: str = OQEE_API_URL,
+        store: Optional[CacheStore] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        clock: Clock = SYSTEM_CLOCK,
+        budget: Optional[RequestBudget] = None,
+    ):
+        self.shared = SharedOqeeState(
+            CHANNEL_MAPPING if channel_mapping is None else channel_mapping, base_url, store, session, clock, budget,
+        )
+        # Le client d'origine possède la session et le cache disque ; une vue ne les ferme pas
+        self._owner = True
+        self._attach()
+        if store is not None:
+            self._load_from_store()
+
+    def _attach(self) -> None:
+        """Inscrit le client auprès de l'état partagé et initialise son état propre au lecteur."""
+        self.clock = self.shared.clock
+        self.shared.clients.append(self)
         
-        # Caches
-        self._ad_breaks: List[AdBreak] = []
+        # État propre au lecteur : chaîne regardée, planning servi, rafraîchisseur
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        
+        # Données servies pour la chaîne regardée
+        self._ad_index: AdBreakIndex = AdBreakIndex()
         self._ad_breaks_last_fetch: float = 0
         self._current_channel_id: Optional[str] = None
-        self._all_ads_passed_notified: bool = False
         self._first_run: bool = True
+        self._served_provisional: bool = False
         
-        self._current_program: Optional[TVProgram] = None
-        self._current_program_last_fetch: float = 0
-        self._program_channel_uuid: Optional[str] = None
-        
-        self.ad_cache_ttl = AD_BREAKS_CACHE_TTL
-        self._program_cache_ttl = 30
+        # Rafraîchissement en tâche de fond (stale-while-revalidate)
+        self.on_update: Optional[Callable[[], None]] = None
+        self._watched_channel_uuid: Optional[str] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._refresh_tick: float = 1.0
 
-    async def fetch_ad_breaks(self, channel_id: str) -> List[AdBreak]:
-        """Récupère les périodes de publicité."""
-        url = f"https://api.oqee.net/api/v1/live/anti_adskipping/{channel_id}"
+    def view(self) -> "OqeeClient":
+        """
+        Client pour un autre lecteur, adossé au même SharedOqeeState.
         
+        La vue a sa propre chaîne regardée, son planning servi, son on_update et son
+        rafraîchisseur ; tout le reste est commun. Fermer une vue ne ferme rien : la
+        session et le cache disque appartiennent au client d'origine.
+        """
+        view = type(self).__new__(type(self))
+        view.shared = self.shared
+        view._owner = False
+        view._attach()
+        return view
+
+    def _clients(self) -> List["OqeeClient"]:
+        """Le client d'origine et toutes ses vues."""
+        return self.shared.clients
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self) -> None:
+        """Ouvre la session HTTP poolée (une seule poignée de main TCP/TLS par connexion)."""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit_per_host=OQEE_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=OQEE_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=OQEE_DNS_CACHE_TTL,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=OQEE_REQUEST_TIMEOUT),
+        )
+
+    async def close(self) -> None:
+        """Ferme la session HTTP et ses connexions (et termine les écritures disque)."""
+        if not self._owner:
+            return
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.budget is not None:
+            self.budget.close()
+        if self._store_executor is not None:
+            self._store_executor.shutdown(wait=True)
+            self._store_executor = None
+
+    def _load_from_store(self) -> None:
+        """Charge les plannings persistés (servis jusqu'au premier fetch live)."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return []
-                    
-                    data = await response.json()
-                    if not data.get('success'):
-                        return []
-                    
-                    periods = data.get('result', {}).get('periods', [])
-                    ad_breaks = []
-                    
-                    for period in periods:
-                        if period.get('type') == 'ad_break':
-                            start_time = period.get('start_time')
-                            # Si end_time manque, on estime à +5 min
-                            end_time = period.get('end_time', start_time + 300)
-                            
-                            if start_time:
-                                ad_breaks.append(AdBreak(start_time=start_time, end_time=end_time))
-                    return ad_breaks
+            ads = self.store.load_ad_breaks(max_age=PERSISTENT_CACHE_MAX_AGE, now=self.clock.time())
+            blocks = self.store.load_epg_blocks(min_window=epg_window_start(self.clock.time()) - EPG_WINDOW)
         except Exception as e:
-            console.print(f"[red]❌ Erreur API OQEE: {e}[/red]")
-            return []
+            logger.warning("Cache disque illisible: %s", e)
+            return
+        
+        for channel_id, (ad_breaks, fetched_at) in ads.items():
+            self._ad_cache[channel_id] = _AdCacheEntry(
+                index=AdBreakIndex.from_breaks(ad_breaks), fetched_at=fetched_at, provisional=True
+            )
+        for (channel_id, window_start), (programs, fetched_at) in blocks.items():
+            self._epg_cache[(channel_id, window_start)] = _EpgCacheEntry(
+                block=EpgBlock.from_programs(window_start, programs), fetched_at=fetched_at
+            )
 
-    async def fetch_current_program(self, channel_id: str) -> Optional[TVProgram]:
-        """Récupère le programme TV actuel."""
-        current_time = int(time.time())
-        # Alignement sur 6h pour l'API
-        start_timestamp = (current_time // 21600) * 21600
+    def _persist(self, fn, *args) -> None:
+        """Écrit dans le cache disque sans bloquer la boucle."""
+        if self._store_executor is None:
+            self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="freetv-store")
+        future = asyncio.get_running_loop().run_in_executor(self._store_executor, fn, *args)
+        future.add_done_callback(self._on_persisted)
+
+    @staticmethod
+    def _on_persisted(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Écriture cache disque impossible: %s", future.exception())
+
+    def set_channel_mapping(self, mapping: Dict[str, str]) -> None:
+        """
+        Remplace le mapping des chaînes sans redémarrer.
         
-        url = f"https://api.oqee.net/api/v1/epg/by_channel/{channel_id}/{start_timestamp}"
+        Les caches sont indexés par ID OQEE : ceux des chaînes toujours mappées restent
+        chauds, ceux des IDs retirés sont oubliés. Si l'ID de la chaîne regardée change,
+        son planning est resservi (ou redemandé) immédiatement. Le client d'origine et
+        toutes ses vues passent au nouveau mapping.
+        """
+        previous = self.channel_mapping
+        self.channel_mapping = mapping = dict(mapping)
+        for channel_id in set(previous.values()) - set(mapping.values()):
+            self._forget_channel(channel_id)
         
+        for client in self._clients():
+            watched = client._watched_channel_uuid
+            if watched and previous.get(watched) != mapping.get(watched):
+                client._serve_from_cache(watched, client.clock.time())
+                if client._wakeup is not None:
+                    client._wakeup.set()
+
+    def _forget_channel(self, channel_id: str) -> None:
+        """Oublie les caches mémoire d'un ID OQEE qui n'est plus mappé."""
+        self._ad_cache.pop(channel_id, None)
+        self._ad_attempts.pop(channel_id, None)
+        self.fetch_stats.pop(channel_id, None)
+        self._http_cache.pop(self._ad_breaks_url(channel_id), None)
+        for cache in (self._epg_cache, self._epg_attempts):
+            for key in [key for key in cache if key[0] == channel_id]:
+                del cache[key]
+                self._http_cache.pop(self._epg_url(*key), None)
+
+    def start_refresher(self) -> None:
+        """Lance la tâche de rafraîchissement en arrière-plan."""
+        if self._refresher is not None and not self._refresher.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop_refresher(self) -> None:
+        """Arrête la tâche de rafraîchissement."""
+        if self._refresher is None:
+            return
+        self._refresher.cancel()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return None
-                    
-                    data = await response.json()
-                    if not data.get('success'):
-                        return None
-                    
-                    entries = data.get('result', {}).get('entries', [])
-                    for entry in entries:
-                        if entry.get('type') == 'live':
-                            live_data = entry.get('live', {})
-                            start = live_data.get('start', 0)
-                            end = live_data.get('end', 0)
-                            
-                            if start <= current_time <= end:
-                                duration = end - start
-                                return TVProgram(
-                                    title=live_data.get('title', 'Programme inconnu'),
-                                    category=live_data.get('category', ''),
-                                    sub_category=live_data.get('sub_category', ''),
-                                    start_time=start,
-                                    end_time=end,
-                                    duration_seconds=duration if duration > 0 else live_data.get('duration_seconds', 0),
-                                    description=live_data.get('description', '')
-                                )
+            await self._refresher
+        except asyncio.CancelledError:
+            pass
+        self._refresher = None
+
+    def watch(self, channel_uuid: Optional[str]) -> None:
+        """
+        Indique la chaîne regardée (non bloquant).
+        
+        Le rafraîchisseur est réveillé immédiatement en cas de changement de chaîne ;
+        les données de l'ancienne chaîne ne sont plus servies.
+        """
+        if channel_uuid == self._watched_channel_uuid:
+            return
+        self._watched_channel_uuid = channel_uuid
+        if channel_uuid and self._current_channel_id != channel_uuid:
+            # Chaîne préchauffée : servie depuis la mémoire dès ce tick
+            if self._serve_from_cache(channel_uuid, self.clock.time()):
+                self.cache_hits += 1
+                OQEE_AD_CACHE.inc("watch", "hit")
+            else:
+                self.cache_misses += 1
+                OQEE_AD_CACHE.inc("watch", "miss")
+        elif not channel_uuid:
+            self._set_ad_breaks(None, [])
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _refresh_loop(self) -> None:
+        """Boucle de fond : revalide les caches sans jamais bloquer le moteur."""
+        while True:
+            self._wakeup.clear()
+            channel_uuid = self._watched_channel_uuid
+            if channel_uuid:
+                try:
+                    await self.update_cache(channel_uuid)
+                except Exception as e:
+                    logger.error("Erreur rafraîchissement OQEE: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._refresh_tick)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Retourne la session poolée partagée, ouverte à la demande si besoin."""
+        if self._session is None or self._session.closed:
+            await self.open()
+        return self._session
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                f"oqee/{endpoint}", max_delay=OQEE_BREAKER_MAX_DELAY, clock=self.clock, rng=self.backoff_rng,
+            )
+        return breaker
+
+    async def _fetch(
+        self, url: str, channel_id: str, parse: Callable[[dict], Any], endpoint: str = "anti_adskipping",
+        priority: Priority = Priority.REFRESH,
+    ) -> Optional[Tuple[Any, bool]]:
+        """
+        GET conditionnel et compressé d'une ressource OQEE, partagé entre appelants concurrents.
+        
+        Tant qu'une requête vers `url` est en cours, les autres appels l'attendent et
+        reçoivent le même résultat parsé (comptés dans FetchStats.coalesced).
+        
+        Returns:
+            (résultat parsé, changé ?) ou None si l'API échoue
+        """
+        return await self._single_flight(
+            (endpoint, channel_id, url), lambda: self._fetch_once(url, channel_id, parse, endpoint, priority), None,
+            priority,
+        )
+
+    async def _fetch_once(
+        self, url: str, channel_id: str, parse: Callable[[dict], Any], endpoint: str,
+        priority: Priority = Priority.REFRESH,
+    ) -> Optional[Tuple[Any, bool]]:
+        """
+        GET conditionnel et compressé d'une ressource OQEE.
+        
+        Envoie If-None-Match / If-Modified-Since quand le serveur a fourni des validateurs,
+        et ne reparse pas un corps identique au précédent (même empreinte).
+        
+        Les erreurs réseau, 5xx et 429 alimentent le disjoncteur de la route : ouvert,
+        il renvoie None sans requête (le dernier planning connu reste servi). Sinon la
+        requête attend un jeton du budget partagé, servi par `priority`.
+        
+        Returns:
+            (résultat parsé, changé ?) ou None si l'API échoue
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            return None
+        if self.budget is not None:
+            try:
+                await self.budget.acquire(priority, key=(endpoint, channel_id))
+            except BaseException:
+                breaker.release()
+                raise
+        stats = self.fetch_stats.setdefault(channel_id, FetchStats())
+        cached = self._http_cache.get(url)
+        
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        
+        start = time.perf_counter()
+        outcome = "error"
+        healthy: Optional[bool] = None
+        try:
+            session = await self._get_session()
+            async with session.get(url, headers=headers) as response:
+                stats.requests += 1
+                # Un 404 (chaîne sans anti-pub) ne dit rien de la santé de l'API
+                healthy = response.status < 500 and response.status != 429
+                if response.status == 304 and cached is not None:
+                    self._capture(url, 304, None, start)
+                    stats.not_modified += 1
+                    outcome = "not_modified"
+                    return cached.parsed, False
+                if response.status != 200:
+                    self._capture(url, response.status, None, start)
+                    stats.errors += 1
+                    return None
+                
+                body = await response.read()
+                self._capture(url, 200, body, start)
+                # Taille sur le fil (compressée) si le serveur l'annonce
+                stats.bytes_received += response.content_length or len(body)
+                
+                digest = hashlib.sha1(body).digest()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if cached is not None and cached.digest == digest:
+                    stats.parse_skips += 1
+                    self._http_cache[url] = _HttpCacheEntry(etag, last_modified, digest, cached.parsed)
+                    outcome = "unchanged"
+                    return cached.parsed, False
+                
+                parsed = parse(json.loads(body))
+                if parsed is None:
+                    stats.errors += 1
                     return None
+                self._http_cache[url] = _HttpCacheEntry(etag, last_modified, digest, parsed)
+                outcome = "changed"
+                return parsed, True
         except Exception as e:
-            console.print(f"[dim red]⚠️  Erreur API EPG: {e}[/dim red]")
+            healthy = False
+            stats.errors += 1
+            logger.error("Erreur API OQEE (chaîne %s): %s", channel_id, e)
             return None
+        finally:
+            if healthy is None:
+                breaker.release()
+            elif healthy:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            OQEE_LATENCY.observe(time.perf_counter() - start, endpoint)
+            OQEE_REQUESTS.inc(endpoint, outcome)
+
+    def _capture(self, url: str, status: int, body: Optional[bytes], start: float) -> None:
+        if self.capture is not None:
+            path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+            self.capture.record("oqee", body, time.perf_counter() - start, path=path, status=status)
+
+    def _ad_breaks_url(self, channel_id: str) -> str:
+        return f"{self.base_url}/live/anti_adskipping/{channel_id}"
+
+    def _epg_url(self, channel_id: str, window_start: int) -> str:
+        return f"{self.base_url}/epg/by_channel/{channel_id}/{window_start}"
+
+    @staticmethod
+    def _parse_ad_breaks(data: dict) -> Optional[List[AdBreak]]:
+        """Extrait les pubs d'une réponse anti_adskipping."""
+        if not data.get('success'):
+            return None
+        
+        periods = data.get('result', {}).get('periods', [])
+        ad_breaks = []
+        
+        for period in periods:
+            if period.get('type') == 'ad_break':
+                start_time = period.get('start_time')
+                # Si end_time manque, on estime à +5 min
+                estimated_end = period.get('end_time') is None
+                end_time = start_time + 300 if estimated_end and start_time else period.get('end_time')
+                
+                if start_time:
+                    ad_breaks.append(AdBreak(start_time=start_time, end_time=end_time, estimated_end=estimated_end))
+        return ad_breaks
+
+    @staticmethod
+    def _parse_epg_block(window_start: int, data: dict) -> Optional[EpgBlock]:
+        """Extrait les programmes d'une réponse epg/by_channel."""
+        if not data.get('success'):
+            return None
+        
+        programs = []
+        entries = data.get('result', {}).get('entries', [])
+        for entry in entries:
+            if entry.get('type') == 'live':
+                live_data = entry.get('live', {})
+                start = live_data.get('start', 0)
+                end = live_data.get('end', 0)
+                duration = end - start
+                programs.append(TVProgram(
+                    title=live_data.get('title', 'Programme inconnu'),
+                    category=live_data.get('category', ''),
+                    sub_category=live_data.get('sub_category', ''),
+                    start_time=start,
+                    end_time=end,
+                    duration_seconds=duration if duration > 0 else live_data.get('duration_seconds', 0),
+                    description=live_data.get('description', '')
+                ))
+        return EpgBlock.from_programs(window_start, programs)
+
+    async def fetch_ad_breaks(self, channel_id: str, priority: Priority = Priority.REFRESH) -> Optional[List[AdBreak]]:
+        """Récupère les périodes de publicité (None si l'API est injoignable)."""
+        result = await self._fetch(self._ad_breaks_url(channel_id), channel_id, self._parse_ad_breaks, priority=priority)
+        return result[0] if result is not None else None
+
+    async def fetch_epg_block(
+        self, channel_id: str, window_start: int, priority: Priority = Priority.EPG,
+    ) -> Optional[EpgBlock]:
+        """Récupère le bloc EPG de 6h commençant à `window_start` (None si l'API échoue)."""
+        result = await self._fetch(
+            self._epg_url(channel_id, window_start), channel_id,
+            lambda data: self._parse_epg_block(window_start, data), endpoint="epg", priority=priority,
+        )
+        return result[0] if result is not None else None
+
+    async def fetch_current_program(self, channel_id: str) -> Optional[TVProgram]:
+        """Récupère le programme TV actuel."""
+        current_time = int(self.clock.time())
+        block = await self.fetch_epg_block(channel_id, epg_window_start(current_time))
+        return block.program_at(current_time) if block else None
 
     def _merge_close_ad_breaks(self, ad_breaks: List[AdBreak], max_gap: int = AD_MERGE_MAX_GAP) -> List[AdBreak]:
         """Fusionne les ad_breaks proches."""
@@ -114,9 +618,11 @@ class OqeeClient:
         for next_ad in sorted_ads[1:]:
             gap = next_ad.start_time - current.end_time
             if gap <= max_gap:
+                last = next_ad if next_ad.end_time >= current.end_time else current
                 current = AdBreak(
                     start_time=current.start_time,
-                    end_time=max(current.end_time, next_ad.end_time)
+                    end_time=last.end_time,
+                    estimated_end=last.estimated_end,
                 )
             else:
                 merged.append(current)
@@ -125,71 +631,274 @@ class OqeeClient:
         merged.append(current)
         return merged
 
-    async def update_cache(self, channel_uuid: str):
-        """Met à jour les caches (pubs et programme)."""
-        current_time = time.time()
-        
-        # 1. Update Ad Breaks
-        if self._current_channel_id != channel_uuid:
-            self._all_ads_passed_notified = False
-        
-        future_ads_count = sum(1 for ad in self._ad_breaks if ad.start_time > current_time)
-        all_ads_passed = len(self._ad_breaks) > 0 and future_ads_count == 0
-        
-        if future_ads_count > 0:
-            self._all_ads_passed_notified = False # Reset if new ads appear
-            
-        need_ad_refresh = (
-            self._first_run or
-            not self._ad_breaks or
-            self._current_channel_id != channel_uuid or
-            (current_time - self._ad_breaks_last_fetch) > self.ad_cache_ttl or
-            (all_ads_passed and not self._all_ads_passed_notified)
+    async def _single_flight(
+        self, key: Tuple[str, ...], refresh: Callable[[], Awaitable[T]], default: T,
+        priority: Priority = Priority.REFRESH,
+    ) -> T:
+        """
+        Exécute `refresh` une seule fois à la fois par clé (endpoint, ID OQEE, ...), pour le
+        client et ses vues.
+        
+        Un appelant qui arrive pendant l'exécution attend son résultat au lieu de refaire
+        la requête ; s'il est plus urgent, la requête en attente d'un jeton du budget
+        passe à sa priorité. Si l'exécution échoue ou est annulée, les appelants en
+        attente reçoivent `default` (comme pour un fetch raté).
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            endpoint, channel_id = key[0], key[1]
+            self.fetch_stats.setdefault(channel_id, FetchStats()).coalesced += 1
+            OQEE_COALESCED.inc(endpoint)
+            if self.budget is not None:
+                self.budget.boost((endpoint, channel_id), priority)
+            return await asyncio.shield(pending)
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        result = default
+        try:
+            result = await refresh()
+            return result
+        finally:
+            del self._inflight[key]
+            pending.set_result(result)
+
+    async def refresh_ad_breaks(self, channel_id: str, priority: Priority = Priority.REFRESH) -> bool:
+        """Rafraîchit le cache des pubs d'une chaîne. Retourne False si le fetch a échoué."""
+        return await self._single_flight(
+            ("anti_adskipping", channel_id), lambda: self._refresh_ad_breaks(channel_id, priority), False, priority,
+        )
+
+    async def _refresh_ad_breaks(self, channel_id: str, priority: Priority) -> bool:
+        entry = self._ad_cache.get(channel_id)
+        self._ad_attempts[channel_id] = self.clock.time()
+        result = await self._fetch(
+            self._ad_breaks_url(channel_id), channel_id, self._parse_ad_breaks, priority=priority,
         )
+        if result is None:
+            # Le planning chargé du disque n'est plus "provisoire" : il vieillit normalement
+            if entry is not None:
+                entry.provisional = False
+            return False
+        
+        raw_ads, changed = result
+        fetched_at = self.clock.time()
+        if not changed and entry is not None and not entry.provisional:
+            # Réponse identique (304 ou même empreinte) : ni parsing ni fusion
+            entry.fetched_at = fetched_at
+        else:
+            merged = self._merge_close_ad_breaks(raw_ads, max_gap=AD_MERGE_MAX_GAP)
+            self._ad_cache[channel_id] = _AdCacheEntry(index=AdBreakIndex.from_breaks(merged), fetched_at=fetched_at)
+            if self.store is not None:
+                self._persist(self.store.save_ad_breaks, channel_id, merged, fetched_at)
+        
+        # Le préchauffage ou un autre lecteur peut rafraîchir la chaîne regardée : on la sert tout de suite
+        for client in self._clients():
+            watched = client._watched_channel_uuid
+            if watched and client.channel_mapping.get(watched) == channel_id:
+                client._serve_from_cache(watched, client.clock.time())
+        return True
+
+    def _epg_missing_windows(self, channel_id: str, current_time: float) -> List[int]:
+        """Fenêtres EPG à (re)télécharger : la courante, et la suivante à l'approche de la bascule."""
+        window = epg_window_start(current_time)
+        windows = [window]
+        if window + EPG_WINDOW - current_time <= EPG_PREFETCH_LEAD:
+            windows.append(window + EPG_WINDOW)
+        
+        missing = []
+        for window_start in windows:
+            entry = self._epg_cache.get((channel_id, window_start))
+            if entry is not None and current_time - entry.fetched_at <= EPG_BLOCK_TTL:
+                continue
+            # Pas plus d'une tentative par _program_cache_ttl si l'API échoue
+            last_attempt = self._epg_attempts.get((channel_id, window_start), 0)
+            if current_time - last_attempt < self._program_cache_ttl:
+                continue
+            missing.append(window_start)
+        return missing
+
+    async def refresh_epg(self, channel_id: str, priority: Priority = Priority.EPG) -> None:
+        """Télécharge les blocs EPG manquants d'une chaîne (et précharge le suivant)."""
+        await self._single_flight(("epg", channel_id), lambda: self._refresh_epg(channel_id, priority), None, priority)
+
+    async def _refresh_epg(self, channel_id: str, priority: Priority) -> None:
+        current_time = self.clock.time()
+        for window_start in self._epg_missing_windows(channel_id, current_time):
+            self._epg_attempts[(channel_id, window_start)] = current_time
+            block = await self.fetch_epg_block(channel_id, window_start, priority)
+            if block is not None:
+                previous = self._epg_cache.get((channel_id, window_start))
+                self._epg_cache[(channel_id, window_start)] = _EpgCacheEntry(block=block, fetched_at=current_time)
+                if self.store is not None and (previous is None or previous.block is not block):
+                    self._persist(self.store.save_epg_block, channel_id, window_start, list(block.programs), current_time)
+        
+        # Oubli des fenêtres passées (on garde la précédente : un programme peut la chevaucher)
+        oldest = epg_window_start(current_time) - EPG_WINDOW
+        for cache in (self._epg_cache, self._epg_attempts):
+            for key in [key for key in cache if key[0] == channel_id and key[1] < oldest]:
+                del cache[key]
+                self._http_cache.pop(self._epg_url(*key), None)
+
+    def get_program(self, channel_id: str, current_time: float) -> Optional[TVProgram]:
+        """Programme diffusé sur une chaîne, lu dans le cache EPG."""
+        window = epg_window_start(current_time)
+        for window_start in (window, window - EPG_WINDOW):
+            entry = self._epg_cache.get((channel_id, window_start))
+            program = entry.block.program_at(current_time) if entry else None
+            if program is not None:
+                return program
+        return None
+
+    def get_next_program(self, channel_id: str, current_time: float) -> Optional[TVProgram]:
+        """Programme suivant sur une chaîne (éventuellement dans la fenêtre suivante)."""
+        window = epg_window_start(current_time)
+        for window_start in (window, window + EPG_WINDOW):
+            entry = self._epg_cache.get((channel_id, window_start))
+            program = entry.block.next_program(current_time) if entry else None
+            if program is not None:
+                return program
+        return None
+
+    def _serve_from_cache(self, channel_uuid: str, current_time: float) -> bool:
+        """
+        Sert le planning d'une chaîne depuis le cache mémoire.
         
+        Returns:
+            True si une donnée suffisamment fraîche était disponible
+        """
         channel_id = self.channel_mapping.get(channel_uuid)
+        if not channel_id:
+            # Chaîne non mappée : on sait qu'il n'y a rien à servir
+            self._set_ad_breaks(channel_uuid, [])
+            return True
         
-        if need_ad_refresh:
-            if channel_id:
-                raw_ads = await self.fetch_ad_breaks(channel_id)
-                self._ad_breaks = self._merge_close_ad_breaks(raw_ads, max_gap=AD_MERGE_MAX_GAP)
-                self._ad_breaks_last_fetch = current_time
-                self._current_channel_id = channel_uuid
-                self._first_run = False
-            else:
-                self._ad_breaks = []
+        entry = self._ad_cache.get(channel_id)
+        if entry is None or (not entry.provisional and current_time - entry.fetched_at > self.max_staleness):
+            # Rien de fiable (jamais récupéré, ou dernier planning trop ancien)
+            self._set_ad_breaks(None, [])
+            return False
+        
+        self._ad_breaks_last_fetch = entry.fetched_at
+        self._served_provisional = entry.provisional
+        self._set_ad_breaks(channel_uuid, entry.index)
+        return True
 
-        # 2. Update Program
-        need_prog_refresh = (
-            not self._current_program or
-            self._program_channel_uuid != channel_uuid or
-            (current_time - self._current_program_last_fetch) > self._program_cache_ttl
-        )
+    async def update_cache(self, channel_uuid: str):
+        """Met à jour les caches (pubs et programme)."""
+        current_time = self.clock.time()
+        channel_id = self.channel_mapping.get(channel_uuid)
+        if not channel_id:
+            self._serve_from_cache(channel_uuid, current_time)
+            return
         
-        if need_prog_refresh:
-            self._program_channel_uuid = channel_uuid
-            if channel_id:
-                self._current_program = await self.fetch_current_program(channel_id)
-                self._current_program_last_fetch = current_time
-            else:
-                self._current_program = None
+        # 1. Update Ad Breaks (cadence adaptative : voir ad_refresh_interval)
+        entry = self._ad_cache.get(channel_id)
+        if self._first_run or entry is None or self._current_channel_id != channel_uuid:
+            # Rien de servi pour cette chaîne : tout de suite, puis une tentative par refresh_min (404, panne)
+            need_ad_refresh = current_time - self._ad_attempts.get(channel_id, 0) >= self.refresh_min
+            priority = Priority.WATCHED
+        else:
+            need_ad_refresh = current_time - entry.fetched_at >= self.ad_refresh_interval(channel_id, current_time)
+            priority = Priority.REFRESH
+        
+        OQEE_AD_CACHE.inc("update", "refresh" if need_ad_refresh else "hit")
+        if need_ad_refresh and await self.refresh_ad_breaks(channel_id, priority):
+            self._first_run = False
+
+        # 2. Update Program (blocs EPG de 6h, téléchargés une fois par fenêtre)
+        if self._epg_missing_windows(channel_id, current_time):
+            await self.refresh_epg(channel_id)
+        
+        # Échec ou pas, on sert le dernier planning connu (dans la limite de max_staleness),
+        # sauf si l'utilisateur a zappé pendant le fetch
+        if self._watched_channel_uuid in (None, channel_uuid):
+            self._serve_from_cache(channel_uuid, self.clock.time())
+
+    def ad_refresh_interval(self, channel_id: str, current_time: float) -> float:
+        """
+        Âge maximal du planning pub d'une chaîne avant de le redemander.
+        
+        Pendant une pub dont la fin est estimée (end_time absent) : refresh_min, pour
+        démuter dès que la vraie fin est publiée. Sinon, une fraction du temps restant
+        avant la prochaine borne (fin de la pub en cours, début de la suivante, fin du
+        programme), entre refresh_min et refresh_max. Sans borne connue : refresh_max.
+        
+        Jamais plus de announce_lead - UNMUTE_BUFFER : une pub publiée announce_lead
+        secondes avant son début est vue avant l'instant de son mute anticipé.
+        """
+        entry = self._ad_cache.get(channel_id)
+        index = entry.index if entry is not None else AdBreakIndex()
+        
+        active = index.active(current_time)
+        if active is not None:
+            if active.estimated_end:
+                return self.refresh_min
+            boundary: Optional[float] = active.end_time
+        else:
+            upcoming = [ad.start_time for ad in index.future(current_time, limit=1)]
+            program = self.get_program(channel_id, current_time)
+            if program is not None and program.end_time > current_time:
+                upcoming.append(program.end_time)
+            boundary = min(upcoming) if upcoming else None
+        
+        ceiling = max(self.refresh_min, min(self.refresh_max, self.announce_lead - UNMUTE_BUFFER))
+        if boundary is None:
+            return ceiling
+        interval = (boundary - current_time) * self.refresh_lead_factor
+        return min(ceiling, max(self.refresh_min, interval))
+
+    @property
+    def next_ad_refresh(self) -> float:
+        """Heure (Unix) du prochain rafraîchissement du planning de la chaîne regardée (0 si inconnue)."""
+        channel_id = self.watched_channel_id
+        entry = self._ad_cache.get(channel_id) if channel_id else None
+        if entry is None:
+            return 0
+        return entry.fetched_at + self.ad_refresh_interval(channel_id, self.clock.time())
+
+    def _set_ad_breaks(self, channel_uuid: Optional[str], ad_breaks: Iterable[AdBreak]) -> None:
+        """Remplace le planning servi et notifie le moteur s'il a changé."""
+        index = ad_breaks if isinstance(ad_breaks, AdBreakIndex) else AdBreakIndex.from_breaks(ad_breaks)
+        changed = index != self._ad_index or channel_uuid != self._current_channel_id
+        self._ad_index = index
+        self._current_channel_id = channel_uuid
+        if changed and self.on_update is not None:
+            self.on_update()
 
     def get_active_ad_break(self, current_time: int) -> Optional[AdBreak]:
-        for ad in self._ad_breaks:
-            if ad.is_active(current_time):
-                return ad
-        return None
+        return self._ad_index.active(current_time)
     
     def get_next_ad_break(self, current_time: int) -> Optional[AdBreak]:
-        future_ads = [ad for ad in self._ad_breaks if ad.start_time > current_time]
-        if future_ads:
-            return min(future_ads, key=lambda ad: ad.start_time)
-        return None
+        return self._ad_index.next(current_time)
+
+    @property
+    def ad_index(self) -> AdBreakIndex:
+        return self._ad_index
 
     @property
     def ad_breaks(self) -> List[AdBreak]:
-        return self._ad_breaks
+        return list(self._ad_index.breaks)
+    
+    @property
+    def served_from_disk(self) -> bool:
+        """Vrai si le planning servi vient du cache disque (pas encore confirmé en live)."""
+        return self._served_provisional
+    
+    @property
+    def watched_channel_id(self) -> Optional[str]:
+        """ID OQEE de la chaîne regardée."""
+        return self.channel_mapping.get(self._watched_channel_uuid) if self._watched_channel_uuid else None
+    
+    @property
+    def ad_breaks_channel(self) -> Optional[str]:
+        """UUID de la chaîne à laquelle appartient le planning servi."""
+        return self._current_channel_id
     
     @property
     def current_program(self) -> Optional[TVProgram]:
-        return self._current_program
+        channel_id = self.channel_mapping.get(self._watched_channel_uuid or self._current_channel_id)
+        return self.get_program(channel_id, self.clock.time()) if channel_id else None
+
+    @property
+    def next_program(self) -> Optional[TVProgram]:
+        channel_id = self.channel_mapping.get(self._watched_channel_uuid or self._current_channel_id)
+        return self.get_next_program(channel_id, self.clock.time()) if channel_id else None
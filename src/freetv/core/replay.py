@@ -0,0 +1,262 @@
+"""
+Replay Simulator.
+Feeds recorded player-status and OQEE timelines to the real engine under a virtual clock.
+"""
+import gzip
+import json
+import time
+import asyncio
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..models import PlayerStatus, VolumeState
+from .capture import SEGMENT_GLOB
+from .clock import Clock, VirtualClock
+from .engine import AutoMuteEngine, load_configured_mapping
+from .oqee import OqeeClient
+
+# URL fictive : les chemins enregistrés sont relatifs à l'URL de base de l'API OQEE
+REPLAY_BASE_URL = "http://replay.invalid"
+
+EVENT_KINDS = ("player_status", "volume", "oqee")
+
+
+@dataclass(frozen=True)
+class TimelineEvent:
+    """Réponse enregistrée, valable à partir de `t` jusqu'à la suivante de même clé."""
+    t: float  # Unix timestamp
+    kind: str  # player_status, volume ou oqee
+    key: str  # Chemin OQEE ("/live/anti_adskipping/536"), vide pour la Freebox
+    data: Any  # `result` de la réponse Freebox, ou corps JSON complet OQEE
+    status: int = 200
+
+
+class Timeline:
+    """
+    Chronologie de réponses API, une par ligne JSON (fichier .jsonl ou .jsonl.gz) :
+
+        {"t": 1700000000.0, "kind": "player_status", "data": {...}}
+        {"t": 1700000000.2, "kind": "volume", "data": {"mute": false, "volume": 20}}
+        {"t": 1700000000.4, "kind": "oqee", "path": "/live/anti_adskipping/536", "status": 200, "data": {...}}
+
+    C'est le format écrit par `CaptureLog`. Les autres champs (latence, etc.)
+    et les types inconnus sont ignorés ; un 304 ne remplace pas la réponse précédente.
+    """
+
+    def __init__(self, events: Iterable[TimelineEvent]):
+        self.events: List[TimelineEvent] = sorted(events, key=lambda event: event.t)
+        self._series: Dict[Tuple[str, str], Tuple[List[float], List[TimelineEvent]]] = {}
+        for event in self.events:
+            times, series = self._series.setdefault((event.kind, event.key), ([], []))
+            times.append(event.t)
+            series.append(event)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "Timeline":
+        return cls(
+            TimelineEvent(
+                t=float(record["t"]), kind=record["kind"], key=record.get("path", ""),
+                data=record.get("data"), status=int(record.get("status", 200)),
+            )
+            for record in records
+            if record.get("kind") in EVENT_KINDS and record.get("status") != 304
+        )
+
+    @classmethod
+    def load(cls, *paths: Union[str, Path]) -> "Timeline":
+        """Charge des fichiers ou des répertoires de capture (tous leurs segments)."""
+        files: List[Path] = []
+        for path in map(Path, paths):
+            files.extend(sorted(path.glob(SEGMENT_GLOB)) if path.is_dir() else [path])
+        
+        records = []
+        for path in files:
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                try:
+                    for line in f:
+                        if line.strip():
+                            records.append(json.loads(line))
+                except (EOFError, ValueError):
+                    # Segment en cours d'écriture ou tronqué (crash) : on garde le début
+                    pass
+        return cls.from_records(records)
+
+    @property
+    def start(self) -> float:
+        return self.events[0].t if self.events else 0.0
+
+    @property
+    def end(self) -> float:
+        return self.events[-1].t if self.events else 0.0
+
+    def latest(self, kind: str, key: str, t: float) -> Optional[TimelineEvent]:
+        """Dernière réponse enregistrée à l'instant `t` (None avant la première)."""
+        found = self._series.get((kind, key))
+        if found is None:
+            return None
+        times, series = found
+        i = bisect_right(times, t)
+        return series[i - 1] if i > 0 else None
+
+
+@dataclass(frozen=True)
+class MuteDecision:
+    """Commande de mute envoyée par le moteur pendant le rejeu."""
+    at: float
+    mute: bool
+    channel_uuid: Optional[str]
+
+    def to_json(self) -> str:
+        when = datetime.fromtimestamp(self.at, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        return json.dumps({
+            "t": round(self.at, 3), "time": when[:-4] + "Z", "channel": self.channel_uuid, "mute": self.mute,
+        })
+
+
+class ReplayFreeboxClient:
+    """
+    FreeboxClient rejouant les statuts enregistrés.
+
+    L'état de mute est simulé (seules les commandes du moteur le changent) :
+    celui de l'enregistrement reflète les décisions de l'ancienne version.
+    Seul le niveau de volume enregistré est repris.
+    """
+
+    def __init__(self, timeline: Timeline, clock: Clock):
+        self.timeline = timeline
+        self.clock = clock
+        self.mute = False
+        self.decisions: List[MuteDecision] = []
+        self._last_player_status: Optional[PlayerStatus] = None
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def get_player_status(self) -> Optional[PlayerStatus]:
+        event = self.timeline.latest("player_status", "", self.clock.time())
+        if event is None or event.status != 200:
+            return None
+        self._last_player_status = PlayerStatus.from_api_response(event.data)
+        return self._last_player_status
+
+    async def get_volume_state(self) -> Optional[VolumeState]:
+        event = self.timeline.latest("volume", "", self.clock.time())
+        volume = event.data.get("volume", 0) if event is not None and event.data else 0
+        return VolumeState(mute=self.mute, volume=volume)
+
+    async def set_mute(self, mute: bool) -> bool:
+        self.mute = mute
+        channel = self._last_player_status.channel_uuid if self._last_player_status else None
+        self.decisions.append(MuteDecision(at=self.clock.time(), mute=mute, channel_uuid=channel))
+        return True
+
+
+class _ReplayResponse:
+    """Sous-ensemble d'aiohttp.ClientResponse lu par OqeeClient._fetch."""
+
+    def __init__(self, status: int, body: bytes):
+        self.status = status
+        self.headers: Dict[str, str] = {}
+        self.content_length = len(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def __aenter__(self) -> "_ReplayResponse":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+
+class ReplayOqeeSession:
+    """Session HTTP factice servant les réponses OQEE enregistrées à l'heure virtuelle."""
+
+    def __init__(self, timeline: Timeline, clock: Clock, base_url: str = REPLAY_BASE_URL):
+        self.timeline = timeline
+        self.clock = clock
+        self.base_url = base_url.rstrip("/")
+        self.closed = False
+        self.requests = 0
+        # Corps sérialisés une seule fois par réponse enregistrée
+        self._bodies: Dict[int, bytes] = {}
+
+    def get(self, url: str, headers: Optional[dict] = None) -> _ReplayResponse:
+        self.requests += 1
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        event = self.timeline.latest("oqee", path, self.clock.time())
+        if event is None:
+            return _ReplayResponse(404, b"")
+        body = self._bodies.get(id(event))
+        if body is None:
+            body = self._bodies[id(event)] = json.dumps(event.data).encode()
+        return _ReplayResponse(event.status, body)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@dataclass
+class ReplayResult:
+    decisions: List[MuteDecision]
+    simulated_seconds: float
+    wall_seconds: float
+    oqee_requests: int
+
+
+def replay(
+    timeline: Timeline,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    channel_mapping: Optional[Dict[str, str]] = None,
+    setup: Optional[Callable[[AutoMuteEngine], None]] = None,
+) -> ReplayResult:
+    """
+    Rejoue `timeline` avec le vrai AutoMuteEngine en temps virtuel.
+    
+    `channel_mapping` : par défaut, celui du moteur en direct (config.py complété par
+    CHANNEL_MAPPING_FILE), lu au moment de l'appel. `setup` est appelé sur le moteur
+    avant son démarrage (réglages à comparer).
+
+    Returns:
+        Les décisions de mute, dans l'ordre, et la durée simulée/réelle
+    """
+    start = timeline.start if start is None else start
+    end = timeline.end if end is None else end
+    clock = VirtualClock(start)
+    if channel_mapping is None:
+        channel_mapping = load_configured_mapping()
+
+    async def main() -> Tuple[List[MuteDecision], int]:
+        fbx_client = ReplayFreeboxClient(timeline, clock)
+        session = ReplayOqeeSession(timeline, clock)
+        oqee_client = OqeeClient(channel_mapping=channel_mapping, base_url=REPLAY_BASE_URL, session=session, clock=clock)
+        oqee_client.backoff_rng.seed(0)  # Backoff des disjoncteurs reproductible d'un rejeu à l'autre
+        # Ni capture, ni préchauffage, ni socket réelle en temps virtuel, quelle que soit la configuration
+        engine = AutoMuteEngine(fbx_client=fbx_client, oqee_client=oqee_client, clock=clock,
+                                capture=False, warm=False, serve_metrics=False)
+        if setup is not None:
+            setup(engine)
+        async with engine:
+            task = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(end - clock.time())
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return fbx_client.decisions, session.requests
+
+    wall_start = time.perf_counter()
+    decisions, requests = clock.run(main())
+    return ReplayResult(
+        decisions=decisions,
+        simulated_seconds=clock.time() - start,
+        wall_seconds=time.perf_counter() - wall_start,
+        oqee_requests=requests,
+    )
@@ -0,0 +1,107 @@
+"""
+Mute Scheduler.
+Turns the merged AdBreak list into timed mute/unmute transitions.
+"""
+import asyncio
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from ..config import UNMUTE_BUFFER
+from ..models import AdBreak
+from .clock import SYSTEM_CLOCK, Clock
+
+
+@dataclass(frozen=True)
+class MuteTransition:
+    """Changement d'état du mute à un instant donné."""
+    at: float  # Unix timestamp
+    mute: bool
+    boundary: float = 0  # Début de la pub (mute) ou fin de la pub (démute) à l'origine de la transition
+
+
+def build_transitions(ad_breaks: Iterable[AdBreak], buffer: int = UNMUTE_BUFFER) -> List[MuteTransition]:
+    """
+    Calcule les transitions mute/unmute à partir des pubs.
+
+    Reproduit la logique de polling : on mute `buffer` secondes avant le début
+    d'une pub (pub imminente) et on démute après la dernière seconde de la pub
+    (`is_active` inclut `end_time`). Les fenêtres qui se chevauchent sont fusionnées
+    pour ne jamais démuter entre deux pubs proches.
+    """
+    windows = sorted((ad.start_time - buffer, ad.end_time + 1, ad.start_time, ad.end_time) for ad in ad_breaks)
+
+    # [début fenêtre, fin fenêtre, début de la première pub, fin de la dernière pub]
+    merged: List[List[float]] = []
+    for start, end, ad_start, ad_end in windows:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+                merged[-1][3] = ad_end
+        else:
+            merged.append([start, end, ad_start, ad_end])
+
+    transitions = []
+    for start, end, ad_start, ad_end in merged:
+        transitions.append(MuteTransition(at=start, mute=True, boundary=ad_start))
+        transitions.append(MuteTransition(at=end, mute=False, boundary=ad_end))
+    return transitions
+
+
+class MuteScheduler:
+    """Déclenche les transitions de mute aux instants exacts via `loop.call_at`."""
+
+    def __init__(self, on_transition: Callable[[bool], None], buffer: int = UNMUTE_BUFFER, clock: Clock = SYSTEM_CLOCK):
+        self._on_transition = on_transition
+        self.buffer = buffer
+        self.clock = clock
+        self._transitions: List[MuteTransition] = []
+        self._times: List[float] = []
+        self._handles: List[asyncio.TimerHandle] = []
+
+    def schedule(self, ad_breaks: Iterable[AdBreak]) -> bool:
+        """
+        Remplace le planning courant.
+
+        Returns:
+            L'état de mute attendu maintenant (à appliquer immédiatement)
+        """
+        self.cancel()
+        self._transitions = build_transitions(ad_breaks, self.buffer)
+        self._times = [transition.at for transition in self._transitions]
+
+        loop = asyncio.get_running_loop()
+        now = self.clock.time()
+        loop_now = loop.time()
+        for transition in self._transitions:
+            if transition.at > now:
+                handle = loop.call_at(loop_now + (transition.at - now), self._fire, transition)
+                self._handles.append(handle)
+
+        return self.expected_state(now)
+
+    def cancel(self) -> None:
+        """Annule tous les timers en attente."""
+        for handle in self._handles:
+            handle.cancel()
+        self._handles = []
+        self._transitions = []
+        self._times = []
+
+    def expected_state(self, current_time: float) -> bool:
+        """État de mute attendu à `current_time` d'après le planning."""
+        transition = self.last_transition(current_time)
+        return transition.mute if transition else False
+
+    def last_transition(self, current_time: float) -> Optional[MuteTransition]:
+        """Dernière transition passée (celle qui fixe l'état attendu)."""
+        i = bisect_right(self._times, current_time)
+        return self._transitions[i - 1] if i > 0 else None
+
+    def next_transition(self, current_time: float) -> Optional[MuteTransition]:
+        """Prochaine transition planifiée."""
+        i = bisect_right(self._times, current_time)
+        return self._transitions[i] if i < len(self._transitions) else None
+
+    def _fire(self, transition: MuteTransition) -> None:
+        self._on_transition(transition.mute)
@@ -0,0 +1,150 @@
+"""
+Persistent Cache Store.
+SQLite cache of merged ad breaks and EPG blocks, for warm starts.
+"""
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import CACHE_DIR
+from ..models import AdBreak, TVProgram
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ad_fetches (
+    channel_id TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ad_breaks (
+    channel_id TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    estimated_end INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (channel_id, start_time)
+);
+CREATE TABLE IF NOT EXISTS epg_fetches (
+    channel_id TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, window_start)
+);
+CREATE TABLE IF NOT EXISTS epg_programs (
+    channel_id TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sub_category TEXT NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (channel_id, window_start, start_time)
+);
+CREATE INDEX IF NOT EXISTS ad_breaks_by_end ON ad_breaks (channel_id, end_time);
+"""
+
+
+def default_cache_dir() -> Path:
+    """Répertoire de cache : CACHE_DIR, sinon $XDG_CACHE_HOME/freetv."""
+    return Path(CACHE_DIR) if CACHE_DIR else Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "freetv"
+
+
+def default_cache_path() -> Path:
+    """Chemin par défaut : $XDG_CACHE_HOME/freetv/cache.sqlite3."""
+    return default_cache_dir() / "cache.sqlite3"
+
+
+class CacheStore:
+    """
+    Cache disque indexé par chaîne et par temps.
+
+    Chaque opération ouvre sa propre connexion : les écritures peuvent être
+    faites depuis un thread sans bloquer la boucle asyncio.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            # Cache créé avant la colonne estimated_end : fins persistées considérées comme réelles
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ad_breaks)")}
+            if "estimated_end" not in columns:
+                conn.execute("ALTER TABLE ad_breaks ADD COLUMN estimated_end INTEGER NOT NULL DEFAULT 0")
+                conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=5)
+
+    def save_ad_breaks(self, channel_id: str, ad_breaks: List[AdBreak], fetched_at: float) -> None:
+        """Remplace le planning pub d'une chaîne."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM ad_breaks WHERE channel_id = ?", (channel_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO ad_breaks (channel_id, start_time, end_time, estimated_end) VALUES (?, ?, ?, ?)",
+                [(channel_id, ad.start_time, ad.end_time, int(ad.estimated_end)) for ad in ad_breaks],
+            )
+            conn.execute("INSERT OR REPLACE INTO ad_fetches VALUES (?, ?)", (channel_id, fetched_at))
+
+    def load_ad_breaks(self, max_age: float, now: Optional[float] = None) -> Dict[str, Tuple[List[AdBreak], float]]:
+        """Plannings pub récupérés il y a moins de `max_age` secondes, sans les pubs déjà terminées."""
+        now = time.time() if now is None else now
+        result: Dict[str, Tuple[List[AdBreak], float]] = {}
+        with closing(self._connect()) as conn:
+            fetches = conn.execute(
+                "SELECT channel_id, fetched_at FROM ad_fetches WHERE fetched_at >= ?",
+                (now - max_age,),
+            ).fetchall()
+            for channel_id, fetched_at in fetches:
+                rows = conn.execute(
+                    "SELECT start_time, end_time, estimated_end FROM ad_breaks "
+                    "WHERE channel_id = ? AND end_time >= ? ORDER BY start_time",
+                    (channel_id, now),
+                ).fetchall()
+                result[channel_id] = (
+                    [AdBreak(start_time=start, end_time=end, estimated_end=bool(estimated)) for start, end, estimated in rows],
+                    fetched_at,
+                )
+        return result
+
+    def save_epg_block(self, channel_id: str, window_start: int, programs: List[TVProgram], fetched_at: float) -> None:
+        """Remplace un bloc EPG et oublie les blocs de plus d'un jour."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM epg_programs WHERE channel_id = ? AND window_start = ?",
+                (channel_id, window_start),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO epg_programs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (channel_id, window_start, p.start_time, p.end_time, p.title, p.category,
+                     p.sub_category, p.duration_seconds, p.description)
+                    for p in programs
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO epg_fetches VALUES (?, ?, ?)",
+                (channel_id, window_start, fetched_at),
+            )
+            oldest = window_start - 86400
+            conn.execute("DELETE FROM epg_programs WHERE window_start < ?", (oldest,))
+            conn.execute("DELETE FROM epg_fetches WHERE window_start < ?", (oldest,))
+
+    def load_epg_blocks(self, min_window: int) -> Dict[Tuple[str, int], Tuple[List[TVProgram], float]]:
+        """Blocs EPG dont la fenêtre commence à `min_window` ou après."""
+        result: Dict[Tuple[str, int], Tuple[List[TVProgram], float]] = {}
+        with closing(self._connect()) as conn:
+            fetches = conn.execute(
+                "SELECT channel_id, window_start, fetched_at FROM epg_fetches WHERE window_start >= ?",
+                (min_window,),
+            ).fetchall()
+            for channel_id, window_start, fetched_at in fetches:
+                rows = conn.execute(
+                    "SELECT title, category, sub_category, start_time, end_time, duration_seconds, description "
+                    "FROM epg_programs WHERE channel_id = ? AND window_start = ? ORDER BY start_time",
+                    (channel_id, window_start),
+                ).fetchall()
+                result[(channel_id, window_start)] = ([TVProgram(*row) for row in rows], fetched_at)
+        return result
@@ -0,0 +1,200 @@
+"""
+Multi-Player Supervisor.
+Runs one engine per Freebox Player in a single event loop, all served by one shared OQEE client.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional
+
+from ..config import (
+    FREEBOX_PORT, CHECK_INTERVAL_TV_OFF, CAPTURE_ENABLED, METRICS_ENABLED, WARMER_ENABLED, WARMER_CHANNELS,
+)
+from .capture import CaptureLog
+from .client import FreeboxClient
+from .clock import SYSTEM_CLOCK, Clock
+from .engine import AutoMuteEngine, build_oqee_client
+from .lag import LoopLagMonitor
+from .mapping import ChannelMappingWatcher
+from .metrics import REGISTRY, MetricsServer
+from .oqee import OqeeClient
+from .warmer import ScheduleWarmer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PlayerConfig:
+    """Un Freebox Player supervisé."""
+    name: str
+    host: str
+    port: str = FREEBOX_PORT
+
+
+def parse_players(spec: str) -> List[PlayerConfig]:
+    """
+    Lit la liste des players : "salon=192.168.1.10,chambre=192.168.1.11:8443".
+
+    Le nom est facultatif (player1, player2... par défaut), le port aussi (FREEBOX_PORT).
+    Les retours à la ligne valent des virgules (liste lue depuis un fichier).
+    """
+    players: List[PlayerConfig] = []
+    for i, item in enumerate((part.strip() for part in spec.replace("\n", ",").split(",")), 1):
+        if not item:
+            continue
+        name, _, address = item.rpartition("=")
+        host, _, port = address.partition(":")
+        if not host:
+            raise ValueError(f"player sans hôte: {item!r}")
+        players.append(PlayerConfig(name=name.strip() or f"player{i}", host=host.strip(), port=port.strip() or FREEBOX_PORT))
+    names = [player.name for player in players]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"noms de players en double: {', '.join(duplicates)}")
+    return players
+
+
+class Supervisor:
+    """
+    Fait tourner un AutoMuteEngine par Freebox Player dans la même boucle asyncio.
+
+    Chaque moteur reçoit une vue du même OqeeClient (OqeeClient.view) : cache par ID
+    OQEE, requêtes en cours dédupliquées, session, disjoncteurs et capture communs. Deux
+    players sur la même chaîne ne coûtent qu'une requête OQEE. Un player injoignable
+    au démarrage est écarté, une boucle de player qui plante est relancée : les
+    autres continuent.
+    """
+
+    def __init__(
+        self,
+        fbx_clients: Mapping[str, FreeboxClient],
+        oqee_client: Optional[OqeeClient] = None,
+        clock: Clock = SYSTEM_CLOCK,
+        serve_metrics: bool = METRICS_ENABLED,
+    ):
+        if not fbx_clients:
+            raise ValueError("aucun player à superviser")
+        self.clock = clock
+        self.mapping_watcher: Optional[ChannelMappingWatcher] = None
+        if oqee_client is None:
+            oqee_client, self.mapping_watcher = build_oqee_client(clock)
+        self.oqee_client = oqee_client
+
+        # Services du processus, une seule fois pour tous les players
+        self.loop_lag = LoopLagMonitor()
+        self.capture: Optional[CaptureLog] = CaptureLog(clock=clock) if CAPTURE_ENABLED else None
+        if self.capture:
+            # État OQEE partagé : les fetchs des moteurs, du préchauffage et du client d'origine sont capturés
+            self.oqee_client.capture = self.capture
+        # serve_metrics=False : un worker de parc, dont le parent sert le /metrics agrégé
+        self.metrics_server: Optional[MetricsServer] = MetricsServer() if serve_metrics else None
+        self.warmer: Optional[ScheduleWarmer] = None
+        if WARMER_ENABLED:
+            self.warmer = ScheduleWarmer(self.oqee_client, WARMER_CHANNELS or None)
+
+        self.engines: Dict[str, AutoMuteEngine] = {}
+        for name, fbx_client in fbx_clients.items():
+            engine = AutoMuteEngine(fbx_client=fbx_client, oqee_client=oqee_client.view(), clock=clock, supervised=True)
+            engine.loop_lag = self.loop_lag
+            if self.capture and hasattr(engine.fbx_client, "capture"):
+                engine.fbx_client.capture = self.capture
+            self.engines[name] = engine
+        self.restarts: Dict[str, int] = {name: 0 for name in self.engines}
+        self.dropped: Dict[str, str] = {}  # Players écartés au démarrage -> erreur
+        self.restart_delay: float = CHECK_INTERVAL_TV_OFF
+
+        REGISTRY.gauge("freetv_players", "Players supervisés en fonctionnement.", lambda: len(self.engines))
+        REGISTRY.gauge("freetv_loop_lag_p99_seconds", "Retard p99 de la boucle asyncio.",
+                       lambda: self.loop_lag.percentile(99))
+        REGISTRY.gauge("freetv_step_duration_seconds", "Durée de la plus longue dernière itération de contrôle.",
+                       lambda: max((engine.last_step_duration for engine in self.engines.values()), default=0.0))
+
+    @classmethod
+    def from_players(cls, players: List[PlayerConfig], clock: Clock = SYSTEM_CLOCK) -> "Supervisor":
+        return cls({player.name: FreeboxClient(player.host, player.port, clock=clock) for player in players}, clock=clock)
+
+    async def __aenter__(self):
+        if self.capture:
+            try:
+                self.capture.start()
+            except OSError as e:
+                logger.warning("Capture désactivée: %s", e)
+                self.capture = None
+        await self.oqee_client.open()
+
+        # Connexion de tous les players en parallèle ; ceux qui échouent sont écartés
+        names = list(self.engines)
+        results = await asyncio.gather(*(self.engines[name].__aenter__() for name in names), return_exceptions=True)
+        failures = {name: result for name, result in zip(names, results) if isinstance(result, BaseException)}
+        for name, error in failures.items():
+            logger.error("Player %s écarté: %s", name, error)
+            self.dropped[name] = str(error) or type(error).__name__
+            del self.engines[name]
+        if not self.engines:
+            await self._stop_services()
+            raise next(iter(failures.values()))
+
+        if self.mapping_watcher:
+            self.mapping_watcher.start()
+        if self.clock.realtime:
+            self.loop_lag.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.warning("Endpoint /metrics désactivé: %s", e)
+                self.metrics_server = None
+        if self.warmer:
+            self.warmer.start()
+        logger.info("%d player(s) supervisé(s): %s", len(self.engines), ", ".join(self.engines))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.gather(
+            *(engine.__aexit__(exc_type, exc_val, exc_tb) for engine in self.engines.values()),
+            return_exceptions=True,
+        )
+        if self.mapping_watcher:
+            await self.mapping_watcher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await self.loop_lag.stop()
+        if self.warmer:
+            await self.warmer.stop()
+        await self._stop_services()
+
+    async def _stop_services(self) -> None:
+        await self.oqee_client.close()
+        if self.capture:
+            await asyncio.get_running_loop().run_in_executor(None, self.capture.stop)
+
+    def health(self) -> Dict[str, dict]:
+        """État de chaque player, sérialisable en JSON (et picklable)."""
+        players: Dict[str, dict] = {
+            name: {"connected": False, "error": error} for name, error in self.dropped.items()
+        }
+        for name, engine in self.engines.items():
+            status = engine.fbx_client._last_player_status
+            players[name] = {
+                "connected": True,
+                "tv_on": bool(status and status.is_tv_on),
+                "channel": engine._watched_channel,
+                "muted_by_us": engine._is_muted_by_us,
+                "steps": engine.steps,
+                "step_seconds": engine.last_step_duration,
+                "restarts": self.restarts[name],
+            }
+        return players
+
+    async def run(self) -> None:
+        """Fait tourner la boucle de contrôle de chaque player jusqu'à annulation."""
+        await asyncio.gather(*(self._run_player(name, engine) for name, engine in self.engines.items()))
+
+    async def _run_player(self, name: str, engine: AutoMuteEngine) -> None:
+        while True:
+            try:
+                await engine.run()
+            except Exception as e:
+                self.restarts[name] += 1
+                logger.exception("Player %s: boucle interrompue (%s), relance dans %ss", name, e, self.restart_delay)
+                await asyncio.sleep(self.restart_delay)
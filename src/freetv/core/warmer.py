@@ -0,0 +1,74 @@
+"""
+Schedule Warmer.
+Keeps ad schedules and current programs fresh for several channels.
+"""
+import asyncio
+import logging
+from typing import Iterable, Optional, Tuple
+
+from ..config import WARMER_INTERVAL, WARMER_CONCURRENCY
+from .budget import Priority
+from .oqee import OqeeClient
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleWarmer:
+    """Préchauffe les caches OQEE des chaînes pour que le zapping soit servi depuis la mémoire."""
+
+    def __init__(
+        self,
+        oqee_client: OqeeClient,
+        channel_uuids: Optional[Iterable[str]] = None,
+        interval: float = WARMER_INTERVAL,
+        concurrency: int = WARMER_CONCURRENCY,
+    ):
+        self.oqee_client = oqee_client
+        # None : toutes les chaînes du mapping courant (suit les rechargements)
+        self.channel_uuids: Optional[Tuple[str, ...]] = tuple(channel_uuids) if channel_uuids is not None else None
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.rounds: int = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Lance le préchauffage en arrière-plan."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Arrête le préchauffage."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def warm_once(self) -> None:
+        """Rafraîchit toutes les chaînes, en parallèle sous une limite de concurrence."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        mapping = self.oqee_client.channel_mapping
+        watched = self.oqee_client.watched_channel_id
+
+        async def warm(channel_id: str) -> None:
+            async with semaphore:
+                # Dernier servi quand le budget OQEE est épuisé : différé, jamais abandonné
+                await self.oqee_client.refresh_ad_breaks(channel_id, Priority.WARMING)
+                await self.oqee_client.refresh_epg(channel_id, Priority.WARMING)
+
+        # La chaîne regardée est déjà suivie par le rafraîchisseur principal
+        uuids = mapping if self.channel_uuids is None else self.channel_uuids
+        channel_ids = {mapping[uuid] for uuid in uuids if uuid in mapping} - {watched}
+        await asyncio.gather(*(warm(channel_id) for channel_id in channel_ids))
+        self.rounds += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.warm_once()
+            except Exception as e:
+                logger.error("Erreur préchauffage OQEE: %s", e)
+            await asyncio.sleep(self.interval)
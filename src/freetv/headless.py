@@ -0,0 +1,74 @@
+"""
+Headless Entry Point.
+Runs the engine with plain logging only: never imports Rich.
+"""
+import sys
+import signal
+import asyncio
+import logging
+from typing import List, Union
+
+from .config import LOG_LEVEL
+from .core.engine import AutoMuteEngine
+from .core.fleet import FleetRunner
+from .core.supervisor import PlayerConfig, Supervisor
+
+logger = logging.getLogger("freetv")
+
+LOG_FORMAT = "%(asctime)s level=%(levelname)s logger=%(name)s %(message)s"
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """Journal texte sur stderr, une ligne par événement (lisible par journald)."""
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT, stream=sys.stderr)
+
+
+async def run(engine: Union[AutoMuteEngine, Supervisor, FleetRunner]) -> None:
+    """Fait tourner la boucle de contrôle jusqu'à annulation (SIGTERM/SIGINT)."""
+    task = asyncio.ensure_future(engine.run())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows / thread secondaire : Ctrl+C reste géré par asyncio.run
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+
+async def main(engine: Union[AutoMuteEngine, Supervisor, FleetRunner, None] = None) -> int:
+    """Point d'entrée sans interface (moteur, superviseur ou parc). Retourne le code de sortie."""
+    configure_logging()
+    logger.info("Démarrage du moteur Auto-Mute (headless)")
+    try:
+        async with engine or AutoMuteEngine() as running:
+            await run(running)
+    except PermissionError as e:
+        logger.error(
+            "%s Activez-la dans l'interface Freebox : Paramètres > Gestion des accès > "
+            "Applications > Freepybox > 'Contrôle du Freebox Player'.", e
+        )
+        return 1
+    except Exception as e:
+        logger.exception("Erreur fatale: %s", e)
+        return 1
+    logger.info("Arrêt du moteur Auto-Mute")
+    return 0
+
+
+async def supervise(players: List[PlayerConfig]) -> int:
+    """Plusieurs Freebox Players dans ce processus (construits dans la boucle qui les fera tourner)."""
+    return await main(Supervisor.from_players(players))
+
+
+async def fleet(players: List[PlayerConfig], workers: int) -> int:
+    """Players répartis sur `workers` processus (0 = un par cœur)."""
+    return await main(FleetRunner(players, workers))
@@ -1,9 +1,10 @@
 """
 Data models for Freebox Auto-Mute.
 """
-from dataclasses import dataclass
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 @dataclass
 class PlayerStatus:
@@ -48,6 +49,7 @@ class AdBreak:
     """Période de publicité."""
     start_time: int  # Unix timestamp
     end_time: int    # Unix timestamp
+    estimated_end: bool = False  # end_time absent de l'API, estimé à +5 min
     
     def is_active(self, current_time: int) -> bool:
         """Vérifie si la pub est active maintenant."""
@@ -71,6 +73,65 @@ class AdBreak:
         return f"AdBreak({start} -> {end})"
 
 
+@dataclass(frozen=True)
+class AdBreakIndex:
+    """
+    Index immuable et trié des pubs d'une chaîne.
+    
+    Construit une fois par fetch à partir des pubs fusionnées (sans chevauchement),
+    il répond aux requêtes active / prochaine / imminente / compteurs par bisection.
+    """
+    breaks: Tuple[AdBreak, ...] = ()
+    _starts: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, '_starts', tuple(ad.start_time for ad in self.breaks))
+    
+    @classmethod
+    def from_breaks(cls, ad_breaks: Iterable[AdBreak]) -> 'AdBreakIndex':
+        """Crée un index trié par heure de début."""
+        return cls(tuple(sorted(ad_breaks, key=lambda ad: ad.start_time)))
+    
+    def __len__(self) -> int:
+        return len(self.breaks)
+    
+    def __iter__(self) -> Iterator[AdBreak]:
+        return iter(self.breaks)
+    
+    def active(self, current_time: float) -> Optional[AdBreak]:
+        """Pub en cours à `current_time`."""
+        i = bisect_right(self._starts, current_time) - 1
+        if i >= 0 and self.breaks[i].is_active(current_time):
+            return self.breaks[i]
+        return None
+    
+    def next(self, current_time: float) -> Optional[AdBreak]:
+        """Première pub qui commence après `current_time`."""
+        i = bisect_right(self._starts, current_time)
+        return self.breaks[i] if i < len(self.breaks) else None
+    
+    def imminent(self, current_time: float, within: float) -> Optional[AdBreak]:
+        """Prochaine pub si elle commence dans `within` secondes ou moins."""
+        ad = self.next(current_time)
+        if ad is not None and ad.start_time - current_time <= within:
+            return ad
+        return None
+    
+    def future(self, current_time: float, limit: Optional[int] = None) -> List[AdBreak]:
+        """Pubs à venir, dans l'ordre."""
+        i = bisect_right(self._starts, current_time)
+        end = len(self.breaks) if limit is None else i + limit
+        return list(self.breaks[i:end])
+    
+    def future_count(self, current_time: float) -> int:
+        """Nombre de pubs qui n'ont pas encore commencé."""
+        return len(self.breaks) - bisect_right(self._starts, current_time)
+    
+    def past_count(self, current_time: float) -> int:
+        """Nombre de pubs déjà commencées (en cours ou passées)."""
+        return bisect_right(self._starts, current_time)
+
+
 @dataclass
 class VolumeState:
     """État du volume Freebox."""
@@ -103,3 +164,49 @@ class TVProgram:
             return 0
         elapsed = current_time - self.start_time
         return min(100, max(0, (elapsed / self.duration_seconds) * 100))
+
+
+@dataclass(frozen=True)
+class EpgBlock:
+    """Bloc EPG de 6h d'une chaîne, trié par heure de début."""
+    window_start: int
+    programs: Tuple[TVProgram, ...] = ()
+    _starts: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, '_starts', tuple(p.start_time for p in self.programs))
+    
+    @classmethod
+    def from_programs(cls, window_start: int, programs: Iterable[TVProgram]) -> 'EpgBlock':
+        """Crée un bloc trié par heure de début."""
+        return cls(window_start, tuple(sorted(programs, key=lambda p: p.start_time)))
+    
+    def __len__(self) -> int:
+        return len(self.programs)
+    
+    def program_at(self, current_time: float) -> Optional[TVProgram]:
+        """Programme diffusé à `current_time`."""
+        i = bisect_right(self._starts, current_time) - 1
+        if i >= 0 and self.programs[i].is_active(current_time):
+            return self.programs[i]
+        return None
+    
+    def next_program(self, current_time: float) -> Optional[TVProgram]:
+        """Premier programme qui commence après `current_time`."""
+        i = bisect_right(self._starts, current_time)
+        return self.programs[i] if i < len(self.programs) else None
+
+
+@dataclass(frozen=True)
+class EngineSnapshot:
+    """Photo immuable de l'état du moteur, publiée par la boucle de contrôle."""
+    player_status: Optional[PlayerStatus] = None
+    volume_state: Optional[VolumeState] = None
+    ad_index: AdBreakIndex = AdBreakIndex()
+    current_program: Optional[TVProgram] = None
+    ad_last_fetch: float = 0
+    ad_next_refresh: float = 0
+    time_to_first_decision: Optional[float] = None
+    loop_lag_p99: float = 0.0
+    loop_lag_max: float = 0.0
+    published_at: float = 0
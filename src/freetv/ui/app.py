@@ -0,0 +1,62 @@
+"""
+TUI Entry Point.
+Rich Live display fed by engine snapshots.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from rich.console import Console
+from rich.live import Live
+from rich.logging import RichHandler
+
+from ..core.engine import AutoMuteEngine
+from .console import console as default_console
+from .display import StatusDisplay
+from .renderer import StatusRenderer
+
+
+def configure_logging(console: Console) -> None:
+    """Les erreurs du moteur passent par la console Rich (les infos noieraient l'écran)."""
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(message)s",
+        handlers=[RichHandler(console=console, show_path=False)],
+    )
+
+
+async def run(engine: AutoMuteEngine, console: Console = default_console, screen: bool = True) -> None:
+    """Boucle de contrôle et rendu indépendants jusqu'à annulation."""
+    # Pas de rafraîchissement automatique : le renderer redessine à RENDER_FPS
+    with Live(console=console, auto_refresh=False, screen=screen) as live:
+        # Le moteur publie des snapshots, le renderer les affiche à son rythme
+        renderer = StatusRenderer(engine, live)
+        tasks = [asyncio.ensure_future(engine.run()), asyncio.ensure_future(renderer.run())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Tâches terminées avant la sortie du moteur (__aexit__) et de Live
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def main(engine: Optional[AutoMuteEngine] = None, console: Console = default_console) -> int:
+    """Point d'entrée avec l'interface Rich. Retourne le code de sortie."""
+    configure_logging(console)
+    try:
+        async with engine or AutoMuteEngine() as running:
+            console.clear()
+            console.print("[bold green]🚀 Démarrage du moteur Auto-Mute...[/bold green]\n")
+            await run(running, console)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]👋 Au revoir ![/yellow]")
+    except PermissionError:
+        console.print()
+        console.print(StatusDisplay.permission_error_panel())
+        console.print()
+        return 1
+    except Exception as e:
+        console.print(f"\n[red]❌ Erreur fatale: {e}[/red]")
+        return 1
+    return 0
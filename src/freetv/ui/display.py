@@ -4,13 +4,13 @@ Preserves the exact visual style of the original script.
 """
 import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional
 
 from rich.panel import Panel
 from rich import box
 
-from ..models import PlayerStatus, VolumeState, AdBreak, TVProgram
-from ..config import AD_BREAKS_CACHE_TTL
+from ..models import PlayerStatus, VolumeState, AdBreak, AdBreakIndex, TVProgram, EngineSnapshot
+from ..config import OQEE_REFRESH_MIN
 
 def fmt_dur(s):
     """Format duration in seconds to human readable string."""
@@ -20,20 +20,40 @@ def fmt_dur(s):
 class StatusDisplay:
     """Gère l'affichage du statut."""
     
+    @staticmethod
+    def from_snapshot(snapshot: EngineSnapshot, now: Optional[float] = None) -> Panel:
+        """Crée le panneau à partir d'un snapshot du moteur."""
+        current_time = int(time.time() if now is None else now)
+        return StatusDisplay.create_panel(
+            player_status=snapshot.player_status,
+            volume_state=snapshot.volume_state,
+            ad_index=snapshot.ad_index,
+            active_ad=snapshot.ad_index.active(current_time),
+            next_ad=snapshot.ad_index.next(current_time),
+            current_program=snapshot.current_program,
+            ad_last_fetch=snapshot.ad_last_fetch,
+            ad_next_refresh=snapshot.ad_next_refresh,
+            loop_lag_ms=snapshot.loop_lag_p99 * 1000,
+            now=current_time,
+        )
+    
     @staticmethod
     def create_panel(
         player_status: Optional[PlayerStatus],
         volume_state: Optional[VolumeState],
-        ad_breaks: List[AdBreak],
+        ad_index: AdBreakIndex,
         active_ad: Optional[AdBreak],
         next_ad: Optional[AdBreak],
         current_program: Optional[TVProgram],
-        ad_last_fetch: float
+        ad_last_fetch: float,
+        loop_lag_ms: Optional[float] = None,
+        now: Optional[float] = None,
+        ad_next_refresh: Optional[float] = None,
     ) -> Panel:
         """
         Crée un panneau d'affichage intuitif avec timeline verticale.
         """
-        current_time = int(time.time())
+        current_time = int(time.time() if now is None else now)
         content_parts = []
         
         # 1. EN-TÊTE : Chaîne & Programme
@@ -93,9 +113,9 @@ class StatusDisplay:
         vol_level = f"({volume_state.volume})" if volume_state else ""
         
         # Compteurs pubs
-        total_ads = len(ad_breaks)
-        future_ads = sum(1 for ad in ad_breaks if ad.start_time > current_time)
-        past_ads = total_ads - future_ads
+        total_ads = len(ad_index)
+        future_ads = ad_index.future_count(current_time)
+        past_ads = ad_index.past_count(current_time)
         
         # Message d'état principal
         if active_ad:
@@ -190,12 +210,11 @@ class StatusDisplay:
         agenda_items = []
         
         # Item 1: Maintenant
-        now_str = datetime.now().strftime('%H:%M')
+        now_str = datetime.fromtimestamp(current_time).strftime('%H:%M')
         agenda_items.append(f"[cyan bold]{now_str}[/cyan bold]  📍 [cyan]Maintenant[/cyan]")
         
         # Items: Pubs futures (Max 3)
-        future_ads_list = [ad for ad in ad_breaks if ad.start_time > current_time]
-        for ad in future_ads_list[:3]:
+        for ad in ad_index.future(current_time, limit=3):
             t_start = datetime.fromtimestamp(ad.start_time).strftime('%H:%M')
             dur = fmt_dur(ad.duration_seconds())
             
@@ -223,8 +242,11 @@ class StatusDisplay:
         
         # Footer compact
         if not active_ad and future_ads == 0:
-             ttl_wait = max(0, AD_BREAKS_CACHE_TTL - int(current_time - ad_last_fetch))
+             next_refresh = ad_next_refresh or ad_last_fetch + OQEE_REFRESH_MIN
+             ttl_wait = max(0, int(next_refresh - current_time))
              content_parts.append(f"[dim italic]Refresh auto dans {ttl_wait}s...[/dim italic]")
+        if loop_lag_ms is not None:
+             content_parts.append(f"[dim]⏱️  Latence boucle (p99) : {loop_lag_ms:.1f} ms[/dim]")
 
         content = "\n".join(content_parts)
         
@@ -242,3 +264,26 @@ class StatusDisplay:
             box=box.ROUNDED,
             padding=(0, 2)
         )
+
+    @staticmethod
+    def permission_error_panel() -> Panel:
+        """Explique comment accorder la permission 'Contrôle du Freebox Player'."""
+        return Panel(
+            "[bold red]⚠️  PERMISSION MANQUANTE[/bold red]\n\n"
+            "L'application n'a pas la permission [yellow]'Contrôle du Freebox Player'[/yellow].\n\n"
+            "[bold]📋 SOLUTION :[/bold]\n\n"
+            "1. Ouvrez votre navigateur : [cyan]http://192.168.1.254[/cyan]\n"
+            "   (ou http://mafreebox.freebox.fr)\n\n"
+            "2. Connectez-vous avec votre mot de passe Freebox\n\n"
+            "3. Allez dans :\n"
+            "   • Paramètres de la Freebox\n"
+            "   • Gestion des accès\n"
+            "   • Onglet 'Applications'\n\n"
+            "4. Trouvez l'application [cyan]'Freepybox'[/cyan] et activez :\n"
+            "   [green]✅ Contrôle du Freebox Player[/green]\n\n"
+            "5. Sauvegardez et relancez l'application\n\n"
+            "[dim]💡 Ou utilisez l'assistant : [cyan]./setup.sh[/cyan][/dim]",
+            title="[bold]Configuration requise[/bold]",
+            border_style="red",
+            box=box.DOUBLE
+        )
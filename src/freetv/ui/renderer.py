@@ -0,0 +1,36 @@
+"""
+TUI Renderer.
+Consumes engine snapshots at its own frame rate, off the control loop.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from rich.live import Live
+
+from ..config import RENDER_FPS
+from ..models import EngineSnapshot
+from .display import StatusDisplay
+
+
+class StatusRenderer:
+    """Affiche les snapshots du moteur sans jamais bloquer sa boucle de contrôle."""
+
+    def __init__(self, engine, live: Live, fps: float = RENDER_FPS):
+        self.engine = engine
+        self.live = live
+        self.fps = fps
+
+    async def run(self) -> None:
+        """Boucle de rendu : la construction du panneau se fait dans un thread dédié."""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="freetv-render")
+        try:
+            while True:
+                await loop.run_in_executor(executor, self.render, self.engine.snapshot)
+                await asyncio.sleep(1 / self.fps)
+        finally:
+            # Annulation : la boucle n'attend pas la fin d'une image en cours de construction
+            executor.shutdown(wait=False)
+
+    def render(self, snapshot: EngineSnapshot) -> None:
+        self.live.update(StatusDisplay.from_snapshot(snapshot, now=self.engine.clock.time()), refresh=True)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests de l'index trié des pubs (recherches par bisection).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import random
+
+from freetv.models import AdBreak, AdBreakIndex
+
+
+def linear_reference(ads, t, within=10):
+    """Anciennes recherches linéaires, servent de référence."""
+    active = next((ad for ad in ads if ad.is_active(t)), None)
+    future = [ad for ad in ads if ad.start_time > t]
+    nxt = min(future, key=lambda ad: ad.start_time) if future else None
+    imminent = next((ad for ad in ads if 0 < ad.start_time - t <= within), None)
+    return active, nxt, imminent, len(future)
+
+
+def test_index_matches_linear_scan():
+    """L'index donne les mêmes réponses que les parcours linéaires."""
+    print("🧪 Test AdBreakIndex vs parcours linéaire\n")
+    rng = random.Random(42)
+
+    # Pubs disjointes, comme après _merge_close_ad_breaks, fournies dans le désordre
+    ads, t = [], 1000
+    for _ in range(200):
+        t += rng.randint(61, 3000)
+        duration = rng.randint(0, 400)
+        ads.append(AdBreak(t, t + duration))
+        t += duration
+    shuffled = ads[:]
+    rng.shuffle(shuffled)
+    index = AdBreakIndex.from_breaks(shuffled)
+
+    assert len(index) == len(ads)
+    for probe in range(0, t + 5000, 37):
+        active, nxt, imminent, future_count = linear_reference(ads, probe)
+        assert index.active(probe) == active
+        assert index.next(probe) == nxt
+        assert index.imminent(probe, 10) == imminent
+        assert index.future_count(probe) == future_count
+        assert index.past_count(probe) == len(ads) - future_count
+    print(f"✅ {len(ads)} pubs, réponses identiques sur toute la plage\n")
+
+
+def test_index_edges():
+    """Bornes inclusives et index vide."""
+    print("🧪 Test des bornes\n")
+    index = AdBreakIndex.from_breaks([AdBreak(200, 300), AdBreak(100, 150)])
+
+    assert index.active(100) == AdBreak(100, 150)
+    assert index.active(150) == AdBreak(100, 150)
+    assert index.active(151) is None
+    assert index.next(100) == AdBreak(200, 300)
+    assert index.future(0, limit=1) == [AdBreak(100, 150)]
+    assert index.imminent(190, 10) == AdBreak(200, 300)
+    assert index.imminent(189, 10) is None
+    print("✅ Bornes respectées")
+
+    empty = AdBreakIndex()
+    assert not empty
+    assert empty.active(0) is None and empty.next(0) is None
+    assert empty.future_count(0) == 0
+    assert empty == AdBreakIndex.from_breaks([])
+    print("✅ Index vide\n")
+
+
+if __name__ == "__main__":
+    test_index_matches_linear_scan()
+    test_index_edges()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Tests des disjoncteurs (backoff exponentiel, appel test, clients OQEE/Freebox).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+from freetv.core.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from freetv.core.client import FreeboxClient
+from freetv.core.clock import VirtualClock
+from freetv.core.metrics import BREAKER_OPEN_SECONDS
+from freetv.core.oqee import OqeeClient
+
+START = 1_700_000_000.0
+
+
+def test_state_machine():
+    """Ouverture au seuil, un seul appel test, délai doublé puis fermeture."""
+    print("🧪 Test états du disjoncteur\n")
+
+    clock = VirtualClock(START)
+    breaker = CircuitBreaker("test/endpoint", failure_threshold=3, base_delay=2, max_delay=5,
+                             jitter=0.5, clock=clock, rng=random.Random(1))
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    # Délai tiré dans [1, 2] s (base 2 s, aléa 50 %)
+    first_delay = breaker.retry_at - clock.monotonic()
+    assert 1.0 <= first_delay <= 2.0, first_delay
+
+    clock.advance(first_delay)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow(), "un seul appel test à la fois"
+    breaker.record_failure()
+    second_delay = breaker.retry_at - clock.monotonic()
+    assert breaker.state == OPEN and 2.0 <= second_delay <= 4.0, second_delay
+
+    clock.advance(second_delay)
+    assert breaker.allow()
+    breaker.record_failure()
+    # Plafonné à max_delay
+    assert breaker.retry_at - clock.monotonic() <= 5.0
+
+    # Appel test annulé : le suivant peut partir
+    clock.advance(5.0)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+    before = BREAKER_OPEN_SECONDS.count("test/endpoint")
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.opens == 0
+    assert BREAKER_OPEN_SECONDS.count("test/endpoint") == before + 1
+    print("✅ Seuil, appel test unique, backoff plafonné, durée d'ouverture mesurée\n")
+
+
+class _Response:
+    def __init__(self, status, body):
+        self.status = status
+        self.headers = {}
+        self.content_length = len(body)
+        self._body = body
+
+    async def read(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+
+class FlakySession:
+    """Session HTTP factice : 503 tant que `down`, sinon un planning vide."""
+
+    def __init__(self):
+        self.closed = False
+        self.down = True
+        self.requests = 0
+
+    def get(self, url, headers=None):
+        self.requests += 1
+        if self.down:
+            return _Response(503, b"")
+        return _Response(200, json.dumps({"success": True, "result": {"periods": []}}).encode())
+
+    async def close(self):
+        self.closed = True
+
+
+def test_oqee_outage_backoff():
+    """Pendant une panne OQEE, le rafraîchissement n'interroge plus l'API à chaque tick."""
+    print("🧪 Test panne OQEE\n")
+
+    async def scenario():
+        clock = VirtualClock(START)
+        session = FlakySession()
+        client = OqeeClient(base_url="http://oqee.invalid", session=session, clock=clock)
+        client.backoff_rng.seed(0)
+
+        # 10 minutes de panne, un tick par seconde
+        for _ in range(600):
+            assert await client.fetch_ad_breaks("536") is None
+            clock.advance(1.0)
+        outage_requests = session.requests
+
+        # Retour de l'API : l'appel test passe au plus tard après le délai maximal
+        session.down = False
+        for _ in range(int(client.breaker("anti_adskipping").max_delay) + 1):
+            if await client.fetch_ad_breaks("536") is not None:
+                break
+            clock.advance(1.0)
+        return outage_requests, client.breaker("anti_adskipping")
+
+    outage_requests, breaker = asyncio.run(scenario())
+    # Sans disjoncteur : 600 requêtes
+    assert outage_requests < 20, outage_requests
+    assert breaker.state == CLOSED
+    print(f"✅ {outage_requests} requêtes en 10 min de panne (au lieu de 600), reprise à la fin\n")
+
+
+def test_oqee_not_found_is_healthy():
+    """Un 404 (chaîne sans anti-pub) n'ouvre pas le disjoncteur."""
+    print("🧪 Test 404 OQEE\n")
+
+    class NotFoundSession(FlakySession):
+        def get(self, url, headers=None):
+            self.requests += 1
+            return _Response(404, b"")
+
+    async def scenario():
+        session = NotFoundSession()
+        client = OqeeClient(base_url="http://oqee.invalid", session=session, clock=VirtualClock(START))
+        for _ in range(10):
+            await client.fetch_ad_breaks("536")
+        return session.requests, client.breaker("anti_adskipping").state
+
+    requests, state = asyncio.run(scenario())
+    assert requests == 10 and state == CLOSED
+    print("✅ Les 404 ne comptent pas comme des pannes\n")
+
+
+def test_freebox_short_circuit():
+    """Freebox injoignable : les appels sont refusés sans réseau, set_mute renvoie False."""
+    print("🧪 Test disjoncteur Freebox\n")
+
+    calls = []
+
+    async def unreachable(*args):
+        calls.append(args)
+        raise ConnectionError("Freebox injoignable")
+
+    async def scenario():
+        clock = VirtualClock(START)
+        client = FreeboxClient(clock=clock)
+        client.fbx = SimpleNamespace(player=SimpleNamespace(
+            get_player_status=unreachable, get_player_volume=unreachable, set_player_volume=unreachable,
+        ))
+        results = []
+        for _ in range(10):
+            results.append(await client.get_player_status())
+        results.append(await client.set_mute(True))
+        return results, client.breaker("get_player_status").state
+
+    results, state = asyncio.run(scenario())
+    assert results[:10] == [None] * 10 and results[10] is False
+    assert state == OPEN
+    # 3 statuts (seuil) + 1 set_mute (disjoncteur distinct)
+    assert len(calls) == 4, len(calls)
+    print("✅ 4 appels réseau au lieu de 11\n")
+
+
+if __name__ == "__main__":
+    test_state_machine()
+    test_oqee_outage_backoff()
+    test_oqee_not_found_is_healthy()
+    test_freebox_short_circuit()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
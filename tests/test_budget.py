@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests du budget de requêtes OQEE (seau à jetons, file par priorité).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import gc
+import time
+
+from fakes import FakeOqee, start_server
+from freetv.core.budget import Priority, RequestBudget
+from freetv.core.clock import VirtualClock
+from freetv.core.metrics import OQEE_BUDGET_DEFERRAL, REGISTRY
+from freetv.core.oqee import OqeeClient
+from freetv.core.warmer import ScheduleWarmer
+
+START = 1_700_000_000.0
+
+
+def run_virtual(clock: VirtualClock, coro):
+    loop = clock.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_queued_by_priority():
+    """Budget épuisé : servis par priorité puis par arrivée, au rythme des jetons, aucun abandonné."""
+    print("🧪 Test file par priorité\n")
+
+    clock = VirtualClock(START)
+    budget = RequestBudget(rate=2, burst=2, clock=clock)
+    served = []
+
+    async def request(name: str, priority: Priority):
+        deferral = await budget.acquire(priority)
+        served.append((name, round(clock.monotonic(), 3), round(deferral, 3)))
+
+    async def scenario():
+        await request("rafale 1", Priority.WARMING)
+        await request("rafale 2", Priority.WARMING)
+        tasks = [asyncio.ensure_future(request(name, priority)) for name, priority in (
+            ("warm a", Priority.WARMING), ("epg", Priority.EPG), ("warm b", Priority.WARMING),
+            ("refresh", Priority.REFRESH), ("watched", Priority.WATCHED),
+        )]
+        await asyncio.sleep(0)
+        depth = budget.depth
+        await asyncio.gather(*tasks)
+        return depth
+
+    before = OQEE_BUDGET_DEFERRAL.count("warming")
+    depth = run_virtual(clock, scenario())
+    assert depth == 5
+    assert [name for name, _, _ in served] == [
+        "rafale 1", "rafale 2", "watched", "refresh", "epg", "warm a", "warm b",
+    ], served
+    # Un jeton toutes les 0,5 s après la rafale
+    assert [at for _, at, _ in served[2:]] == [0.5, 1.0, 1.5, 2.0, 2.5], served
+    assert served[-1][2] == 2.5 and budget.depth == 0
+    assert budget.granted == 7 and budget.deferred == 5
+    assert OQEE_BUDGET_DEFERRAL.count("warming") - before == 4
+    assert "freetv_oqee_budget_queue_depth 0" in REGISTRY.render()
+    print("✅ watched, refresh, epg puis préchauffage, un toutes les 0,5 s\n")
+
+
+def test_boost_and_cancel():
+    """Un appelant urgent remonte la requête qu'il rejoint ; un appelant annulé ne consomme rien."""
+    print("🧪 Test remontée et annulation\n")
+
+    clock = VirtualClock(START)
+    budget = RequestBudget(rate=1, burst=1, clock=clock)
+    served = []
+
+    async def request(name: str, priority: Priority, key=None):
+        await budget.acquire(priority, key)
+        served.append(name)
+
+    async def scenario():
+        await budget.acquire(Priority.WATCHED)
+        cancelled = asyncio.ensure_future(request("annulé", Priority.WATCHED))
+        tasks = [asyncio.ensure_future(request(name, priority, key)) for name, priority, key in (
+            ("warm 536", Priority.WARMING, ("anti_adskipping", "536")),
+            ("refresh 537", Priority.REFRESH, ("anti_adskipping", "537")),
+        )]
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        # La chaîne 536 devient regardée pendant son préchauffage
+        budget.boost(("anti_adskipping", "536"), Priority.WATCHED)
+        await asyncio.gather(*tasks)
+        return clock.monotonic()
+
+    elapsed = run_virtual(clock, scenario())
+    assert served == ["warm 536", "refresh 537"], served
+    assert elapsed == 2.0, elapsed
+    print("✅ préchauffage remonté devant la revalidation, annulation sans jeton perdu\n")
+
+
+def test_watched_channel_served_before_warming():
+    """Le préchauffage de 6 chaînes ne retarde pas le planning de la chaîne regardée."""
+    print("🧪 Test budget partagé par le client OQEE\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)])
+    mapping = {f"uuid-webtv-{i}": str(500 + i) for i in range(7)}
+    arrivals = []
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        client = OqeeClient(channel_mapping=mapping, base_url=url,
+                            budget=RequestBudget(rate=40, burst=1))
+        original = client._fetch_once
+
+        async def record(request_url, channel_id, parse, endpoint, priority):
+            result = await original(request_url, channel_id, parse, endpoint, priority)
+            arrivals.append((endpoint, channel_id))
+            return result
+
+        client._fetch_once = record
+        client.watch("uuid-webtv-0")
+        warmer = ScheduleWarmer(client, concurrency=6)
+        try:
+            warming = asyncio.ensure_future(warmer.warm_once())
+            await asyncio.sleep(0.01)
+            await client.update_cache("uuid-webtv-0")
+            served_after = len(arrivals)
+            await warming
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client, served_after
+
+    client, served_after = asyncio.run(scenario())
+    # Le planning regardé passe avant tout le préchauffage en attente (au plus une requête devant lui)
+    assert ("anti_adskipping", "500") in arrivals[:2], arrivals
+    assert served_after <= 3, arrivals
+    assert oqee.requests["anti_adskipping"] == 7, oqee.requests
+    assert client.budget.deferred > 0 and client.budget.depth == 0
+    print(f"✅ chaîne regardée servie en position {arrivals.index(('anti_adskipping', '500')) + 1} "
+          f"sur {len(arrivals)} requêtes, préchauffage complet\n")
+
+
+def test_queue_depth_gauge_sums_live_budgets():
+    """La jauge de file additionne les budgets vivants, sans garder en vie ceux qui ne servent plus."""
+    print("🧪 Test jauge de profondeur de file\n")
+
+    def depth():
+        line = next(line for line in REGISTRY.render().splitlines()
+                    if line.startswith("freetv_oqee_budget_queue_depth "))
+        return float(line.split()[1])
+
+    async def scenario():
+        budgets = [RequestBudget(rate=1, burst=1) for _ in range(2)]
+        for budget in budgets:
+            await budget.acquire()
+        waiters = [asyncio.ensure_future(budget.acquire()) for budget in budgets for _ in range(2)]
+        await asyncio.sleep(0)
+        queued = depth()
+        for waiter in waiters:
+            waiter.cancel()
+        for budget in budgets:
+            budget.close()
+        return queued
+
+    assert asyncio.run(scenario()) == 4
+    gc.collect()
+    assert depth() == 0
+    print("✅ 2 budgets, 4 requêtes en file, puis plus rien\n")
+
+
+if __name__ == "__main__":
+    test_queued_by_priority()
+    test_boost_and_cancel()
+    test_watched_channel_served_before_warming()
+    test_queue_depth_gauge_sums_live_budgets()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests du journal de capture (segments gzip tournants relus par le rejeu).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+from aiohttp import web
+
+from freetv.core.capture import CaptureLog
+from freetv.core.oqee import OqeeClient
+from freetv.core.replay import Timeline
+
+
+def test_capture_roundtrip():
+    """Ce qui est capturé se relit tel quel avec Timeline.load."""
+    print("🧪 Test capture → Timeline\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = CaptureLog(tmp)
+        capture.start()
+        capture.record("player_status", {"power_state": "running"}, 0.031)
+        capture.record("volume", {"mute": False, "volume": 20}, 0.02)
+        capture.record("oqee", b'{"success": true,\n "result": {"periods": []}}', 0.08,
+                       path="/live/anti_adskipping/536", status=200)
+        capture.record("oqee", None, 0.05, path="/live/anti_adskipping/536", status=304)
+        capture.record("oqee", b"<html>502</html>", 0.05, path="/epg/by_channel/536/0", status=502)
+        capture.stop()
+
+        assert capture.records == 5 and capture.dropped == 0
+        assert len(capture.segments()) == 1
+        timeline = Timeline.load(tmp)
+
+    kinds = [(e.kind, e.key, e.status) for e in timeline.events]
+    # Le 304 n'est pas une nouvelle réponse pour le rejeu
+    assert kinds == [
+        ("player_status", "", 200), ("volume", "", 200),
+        ("oqee", "/live/anti_adskipping/536", 200), ("oqee", "/epg/by_channel/536/0", 502),
+    ], kinds
+    assert timeline.events[2].data == {"success": True, "result": {"periods": []}}
+    assert timeline.events[3].data is None
+    print("✅ Statut, volume, corps OQEE et erreurs relus\n")
+
+
+def test_rotation_and_pruning():
+    """Les segments tournent à la taille demandée et les plus anciens sont supprimés."""
+    print("🧪 Test rotation des segments\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = CaptureLog(tmp, segment_bytes=16384, max_segments=3)
+        capture.start()
+        for i in range(2000):
+            # Données peu compressibles pour remplir les segments
+            capture.record("player_status", {"noise": os.urandom(64).hex(), "i": i}, 0.01)
+        capture.stop()
+
+        segments = capture.segments()
+        assert len(segments) == 3, segments
+        # zlib émet par blocs : un segment dépasse la limite d'au plus un bloc
+        assert all(p.stat().st_size < 16384 * 2 for p in segments)
+        timeline = Timeline.load(tmp)
+
+    numbers = [e.data["i"] for e in timeline.events]
+    # Seule la fin de l'enregistrement reste, dans l'ordre
+    assert numbers == list(range(numbers[0], 2000)) and numbers[0] > 0
+    print(f"✅ 3 segments conservés ({len(numbers)} réponses les plus récentes)\n")
+
+
+def test_oqee_fetch_is_captured():
+    """Les fetchers OQEE alimentent la capture (chemin relatif, statut, latence)."""
+    print("🧪 Test capture des requêtes OQEE\n")
+
+    async def anti_adskipping(request):
+        return web.json_response({"success": True, "result": {"periods": [
+            {"type": "ad_break", "start_time": 100, "end_time": 200},
+        ]}})
+
+    async def scenario(tmp):
+        app = web.Application()
+        app.router.add_get("/live/anti_adskipping/{channel_id}", anti_adskipping)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        capture = CaptureLog(tmp)
+        capture.start()
+        try:
+            async with OqeeClient(base_url=f"http://127.0.0.1:{port}") as client:
+                client.capture = capture
+                await client.fetch_ad_breaks("536")
+        finally:
+            capture.stop()
+            await runner.cleanup()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+        lines = Timeline.load(Path(tmp)).events
+
+    assert len(lines) == 1
+    event = lines[0]
+    assert event.kind == "oqee" and event.key == "/live/anti_adskipping/536"
+    assert event.data["result"]["periods"][0]["start_time"] == 100
+    print("✅ Réponse OQEE capturée avec son chemin\n")
+
+
+if __name__ == "__main__":
+    test_capture_roundtrip()
+    test_rotation_and_pruning()
+    test_oqee_fetch_is_captured()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
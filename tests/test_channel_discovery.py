@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests du mode découverte de scripts/channel_mapper.py (sondes parallèles + guides TV).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'scripts')
+sys.path.insert(0, 'benchmarks')
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from channel_mapper import ChannelMapper, match_channels, normalize_title, positive_int
+from fakes import start_server
+from freetv.core.oqee import epg_window_start
+
+WINDOW = epg_window_start(time.time())
+
+# ID OQEE -> (UUID Freebox, titres de la soirée)
+CHANNELS = {
+    "536": ("uuid-webtv-612", ["Journal de 13h", "Les Feux de l'amour", "Grand Film"]),
+    "537": ("uuid-webtv-613", ["Le 12.45", "Météo", "Série inédite"]),
+    "270": ("uuid-webtv-201", ["Télématin", "Tout le monde veut prendre sa place", "Journal"]),
+}
+
+
+def schedule(titles):
+    return [(WINDOW + i * 7200, title) for i, title in enumerate(titles)]
+
+
+def oqee_app(requests):
+    async def anti_adskipping(request):
+        requests.append(request.match_info["channel_id"])
+        if request.match_info["channel_id"] not in CHANNELS and request.match_info["channel_id"] != "999":
+            return web.Response(status=404)
+        return web.json_response({"success": True, "result": {"periods": []}})
+
+    async def epg(request):
+        # 999 : ID valide sans guide correspondant (chaîne absente du bouquet)
+        titles = CHANNELS.get(request.match_info["channel_id"], (None, ["Autre chose", "Encore autre chose"]))[1]
+        return web.json_response({"success": True, "result": {"entries": [
+            {"type": "live", "live": {"title": title.upper(), "start": start, "end": start + 7200}}
+            for start, title in schedule(titles)
+        ]}})
+
+    app = web.Application()
+    app.router.add_get("/live/anti_adskipping/{channel_id}", anti_adskipping)
+    app.router.add_get("/epg/by_channel/{channel_id}/{start}", epg)
+    return app
+
+
+def fake_freebox_tv():
+    async def get_tv_channels():
+        return {uuid: {"name": f"Chaîne {oqee_id}"} for oqee_id, (uuid, _) in CHANNELS.items()}
+
+    async def get_tv_default_bouquet_channels():
+        return [{"uuid": uuid, "number": n, "available": True} for n, (uuid, _) in enumerate(CHANNELS.values(), 1)]
+
+    async def get_tv_programs_by_date(date):
+        # Une tranche de guide : les programmes qui commencent dans les 2 h
+        return {
+            uuid: {f"{uuid}-{start}": {"title": title, "date": start, "duration": 7200}
+                   for start, title in schedule(titles) if date <= start < date + 7200}
+            for uuid, titles in CHANNELS.values()
+        }
+
+    return SimpleNamespace(tv=SimpleNamespace(
+        get_tv_channels=get_tv_channels,
+        get_tv_default_bouquet_channels=get_tv_default_bouquet_channels,
+        get_tv_programs_by_date=get_tv_programs_by_date,
+    ))
+
+
+def test_match_channels():
+    """Association par programmes communs, ambiguïtés écartées."""
+    print("🧪 Test association des guides\n")
+
+    freebox = {"a": {(1, "x"), (2, "y"), (3, "z")}, "b": {(1, "p"), (2, "q")}}
+    oqee = {"10": {(1, "x"), (2, "y"), (3, "z")}, "20": {(1, "p"), (2, "q")}, "21": {(1, "p"), (2, "q")}}
+    matched, ambiguous = match_channels(freebox, oqee)
+    assert matched == {"a": ("10", 3)} and ambiguous == {"b"}
+    assert normalize_title("Les Feux de l'Amour") == normalize_title("LES FEUX DE L AMOUR")
+    print("✅ Paire sûre retenue, chaîne jumelle signalée\n")
+
+
+def test_discover_writes_mappings():
+    """La découverte sonde la plage en parallèle et écrit channel_mappings.json."""
+    print("🧪 Test découverte\n")
+
+    requests = []
+
+    async def scenario(output):
+        runner, url = await start_server(oqee_app(requests))
+        mapper = ChannelMapper(oqee_base_url=url)
+        mapper.fbx = fake_freebox_tv()
+        try:
+            await mapper.discover(range(1, 1001), concurrency=16, output=output)
+        finally:
+            await runner.cleanup()
+        return mapper
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            mapper = asyncio.run(scenario("channel_mappings.json"))
+            data = json.loads(Path("channel_mappings.json").read_text(encoding="utf-8"))
+        finally:
+            os.chdir(cwd)
+
+    assert len(requests) == 1000
+    assert data["mappings"] == {uuid: oqee_id for oqee_id, (uuid, _) in CHANNELS.items()}
+    assert mapper.probe_failures["http_404"] == 996
+    print(f"✅ {len(data['mappings'])} chaînes associées sur 1000 IDs sondés\n")
+
+
+def test_concurrency_must_be_positive():
+    """--concurrency 0 refusé (Semaphore(0) bloquerait la découverte)."""
+    print("🧪 Test --concurrency\n")
+
+    assert positive_int("8") == 8
+    for value in ("0", "-3", "abc"):
+        try:
+            positive_int(value)
+            assert False, value
+        except argparse.ArgumentTypeError:
+            pass
+    print("✅ 0, négatif et non numérique refusés\n")
+
+
+if __name__ == "__main__":
+    test_match_channels()
+    test_discover_writes_mappings()
+    test_concurrency_must_be_positive()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests du mapping des chaînes externe (fichier JSON, rechargement à chaud).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import json
+import os
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+from freetv.core.mapping import ChannelMappingWatcher, load_channel_mapping
+from freetv.core.oqee import OqeeClient, _AdCacheEntry
+from freetv.models import AdBreak, AdBreakIndex
+
+
+def write(path: Path, mappings: dict, raw: str = None) -> None:
+    path.write_text(raw if raw is not None else json.dumps({"total_channels": len(mappings), "mappings": mappings}))
+    # mtime strictement croissant, même sur un système de fichiers à résolution grossière
+    stamp = time.time_ns() + len(path.read_bytes())
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_load_formats():
+    """Format de channel_mapper.py et objet simple acceptés, le reste refusé."""
+    print("🧪 Test formats de fichier\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "channel_mappings.json"
+        write(path, {"uuid-a": "1"})
+        assert load_channel_mapping(path) == {"uuid-a": "1"}
+        path.write_text('{"uuid-b": 2}')
+        assert load_channel_mapping(path) == {"uuid-b": "2"}
+        path.write_text('["uuid-c"]')
+        try:
+            load_channel_mapping(path)
+            assert False, "une liste n'est pas un mapping"
+        except ValueError:
+            pass
+    print("✅ {\"mappings\": ...} et {uuid: id} lus, liste refusée\n")
+
+
+def test_watcher_reloads_on_change_and_sighup():
+    """Rechargement sur modification du fichier et sur SIGHUP ; fichier cassé ignoré."""
+    print("🧪 Test rechargement à chaud\n")
+
+    published = []
+
+    async def scenario(path):
+        watcher = ChannelMappingWatcher(path, published.append, defaults={"uuid-default": "9"}, interval=0.02)
+        assert watcher.load() == {"uuid-default": "9", "uuid-a": "1"}
+        watcher.start()
+        try:
+            write(path, {"uuid-a": "1", "uuid-b": "2"})
+            await asyncio.sleep(0.1)
+            write(path, {}, raw='{"mappings": {"uuid-a": ')  # Écriture en cours
+            await asyncio.sleep(0.1)
+            # Contenu remplacé sans que la surveillance ne le voie : SIGHUP force la relecture
+            watcher._signature = watcher._stat()
+            path.write_text(json.dumps({"mappings": {"uuid-a": "10"}}))
+            watcher._signature = watcher._stat()
+            os.kill(os.getpid(), signal.SIGHUP)
+            await asyncio.sleep(0.05)
+        finally:
+            await watcher.stop()
+        return watcher
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "channel_mappings.json"
+        write(path, {"uuid-a": "1"})
+        watcher = asyncio.run(scenario(path))
+
+    assert published == [
+        {"uuid-default": "9", "uuid-a": "1", "uuid-b": "2"},
+        {"uuid-default": "9", "uuid-a": "10"},
+    ], published
+    assert watcher.mapping == published[-1]
+    print("✅ 2 rechargements publiés, version à moitié écrite ignorée\n")
+
+
+def test_set_channel_mapping_keeps_warm_caches():
+    """Les caches des chaînes inchangées survivent, la chaîne regardée suit son nouvel ID."""
+    print("🧪 Test caches conservés\n")
+
+    now = time.time()
+    client = OqeeClient(channel_mapping={"uuid-a": "1", "uuid-b": "2", "uuid-c": "3"})
+    for channel_id, start in (("1", 100), ("2", 200), ("3", 300), ("4", 400)):
+        client._ad_cache[channel_id] = _AdCacheEntry(
+            index=AdBreakIndex.from_breaks([AdBreak(now + start, now + start + 60)]), fetched_at=now,
+        )
+    client.watch("uuid-b")
+    assert client.ad_breaks[0].start_time == now + 200
+
+    updates = []
+    client.on_update = lambda: updates.append(client.ad_breaks_channel)
+    client.set_channel_mapping({"uuid-a": "1", "uuid-b": "4", "uuid-d": "5"})
+
+    assert "1" in client._ad_cache and "4" in client._ad_cache
+    assert "2" not in client._ad_cache and "3" not in client._ad_cache
+    assert client.ad_breaks[0].start_time == now + 400 and updates == ["uuid-b"]
+    assert client.watched_channel_id == "4"
+    print("✅ Cache de uuid-a conservé, uuid-b servi depuis son nouvel ID\n")
+
+
+if __name__ == "__main__":
+    test_load_formats()
+    test_watcher_reloads_on_change_and_sighup()
+    test_set_channel_mapping_keeps_warm_caches()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests du cache EPG par fenêtre de 6h.
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import time
+
+from freetv.models import EpgBlock, TVProgram
+from freetv.core.oqee import OqeeClient, EPG_WINDOW, epg_window_start
+
+
+def make_block(window_start):
+    """Bloc de 6 programmes d'une heure."""
+    programs = [
+        TVProgram(f"P{window_start + h * 3600}", "Cat", "", window_start + h * 3600, window_start + (h + 1) * 3600, 3600)
+        for h in range(6)
+    ]
+    return EpgBlock.from_programs(window_start, reversed(programs))
+
+
+def test_epg_block_lookup():
+    """Programme courant et suivant par bisection."""
+    print("🧪 Test EpgBlock\n")
+    block = make_block(0)
+    assert block.program_at(10).start_time == 0
+    assert block.program_at(3600 * 2 + 1).start_time == 7200
+    assert block.next_program(10).start_time == 3600
+    assert block.next_program(EPG_WINDOW) is None
+    print("✅ Programme courant / suivant\n")
+
+
+def test_epg_fetched_once_per_window():
+    """Un seul téléchargement par fenêtre, la suivante préchargée avant la bascule."""
+    print("🧪 Test cache EPG par fenêtre\n")
+    client = OqeeClient()
+    calls = []
+
+    async def fake_fetch(channel_id, window_start, priority=None):
+        calls.append(window_start)
+        return make_block(window_start)
+
+    client.fetch_epg_block = fake_fetch
+
+    async def scenario():
+        now = time.time()
+        for _ in range(10):
+            await client.refresh_epg("536")
+        return now
+
+    now = asyncio.run(scenario())
+    window = epg_window_start(now)
+    expected = [window] if window + EPG_WINDOW - now > 600 else [window, window + EPG_WINDOW]
+    assert calls == expected, calls
+    assert client.get_program("536", now).is_active(now)
+    print(f"✅ {len(calls)} téléchargement(s) pour 10 rafraîchissements")
+
+    # Proche de la bascule : la fenêtre suivante est aussi demandée
+    fresh = OqeeClient()
+    assert fresh._epg_missing_windows("536", window + 60) == [window]
+    assert fresh._epg_missing_windows("536", window + EPG_WINDOW - 60) == [window, window + EPG_WINDOW]
+    print("✅ Fenêtre suivante préchargée avant la bascule\n")
+
+
+if __name__ == "__main__":
+    test_epg_block_lookup()
+    test_epg_fetched_once_per_window()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
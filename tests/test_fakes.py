@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests des faux services HTTP utilisés par les benchmarks (benchmarks/fakes.py).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import time
+
+from fakes import FakeFreebox, FakeOqee, LocalFreeboxClient, start_server
+from freetv.core.oqee import OqeeClient
+
+
+def test_freebox_client_against_fake():
+    """Le vrai FreeboxClient pilote le faux Freebox OS (statut, volume, mute)."""
+    print("🧪 Test FreeboxClient ↔ FakeFreebox\n")
+
+    async def scenario():
+        fbx = FakeFreebox(latency=0.01, jitter=0.005, seed=1)
+        runner, url = await start_server(fbx.app())
+        client = LocalFreeboxClient(url)
+        try:
+            await client.connect()
+            status = await client.get_player_status()
+            volume = await client.get_volume_state()
+            muted = await client.set_mute(True)
+            volume_after = await client.get_volume_state()
+            await client.disconnect()
+        finally:
+            await runner.cleanup()
+        return fbx, status, volume, muted, volume_after
+
+    fbx, status, volume, muted, volume_after = asyncio.run(scenario())
+    assert status.is_tv_on and status.channel_uuid == "uuid-webtv-612"
+    assert volume.mute is False and volume.volume == 20
+    assert muted and volume_after.mute is True
+    assert [mute for _, mute in fbx.mute_events] == [True]
+    assert fbx.requests["set_volume"] == 1 and fbx.requests["status"] == 1
+    print(f"✅ Statut, volume et mute OK ({sum(fbx.requests.values())} requêtes)\n")
+
+
+def test_oqee_client_against_fake():
+    """Le vrai OqeeClient lit les pubs du faux OQEE."""
+    print("🧪 Test OqeeClient ↔ FakeOqee\n")
+
+    now = int(time.time())
+
+    async def scenario():
+        oqee = FakeOqee([(now + 100, now + 200)], latency=0.01, jitter=0.005, seed=1)
+        runner, url = await start_server(oqee.app())
+        try:
+            async with OqeeClient(base_url=url) as client:
+                ads = await client.fetch_ad_breaks("536")
+        finally:
+            await runner.cleanup()
+        return oqee, ads
+
+    oqee, ads = asyncio.run(scenario())
+    assert [(ad.start_time, ad.end_time) for ad in ads] == [(now + 100, now + 200)]
+    assert oqee.requests["anti_adskipping"] == 1
+    print("✅ Pubs lues depuis le faux OQEE\n")
+
+
+if __name__ == "__main__":
+    test_freebox_client_against_fake()
+    test_oqee_client_against_fake()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
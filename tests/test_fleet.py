@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests du parc multi-processus (répartition, agrégation des métriques, workers relancés).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import os
+import signal
+import time
+
+from fakes import fake_box
+from freetv.core.fleet import FleetRunner, shard_players
+from freetv.core.metrics import MetricsRegistry, merge_exports
+from freetv.core.supervisor import PlayerConfig
+
+PLAYERS = [PlayerConfig(f"box{i}", f"10.0.0.{i}") for i in range(6)]
+
+
+async def wait_for(predicate, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "délai dépassé"
+        await asyncio.sleep(0.05)
+
+
+def test_shard_players():
+    """Lots équilibrés, jamais de worker sans player."""
+    print("🧪 Test répartition\n")
+
+    shards = shard_players(PLAYERS, 4)
+    assert [len(shard) for shard in shards] == [2, 2, 1, 1]
+    assert sorted(p.name for shard in shards for p in shard) == sorted(p.name for p in PLAYERS)
+    assert len(shard_players(PLAYERS[:2], 8)) == 2
+    print("✅ 6 players sur 4 workers : 2/2/1/1\n")
+
+
+def test_merge_exports():
+    """Compteurs et histogrammes sommés, jauges gardées par worker."""
+    print("🧪 Test agrégation des métriques\n")
+
+    exports = {}
+    for worker, (requests, lag) in enumerate(((3, 0.01), (4, 0.02))):
+        registry = MetricsRegistry()
+        registry.counter("freetv_x_total", "X.", ("call",)).inc("status", amount=requests)
+        registry.histogram("freetv_x_seconds", "X.", buckets=(0.1, 1.0)).observe(0.05)
+        registry.gauge("freetv_lag_seconds", "Lag.", lambda lag=lag: lag)
+        exports[str(worker)] = registry.export()
+
+    text = merge_exports(exports).render()
+    assert 'freetv_x_total{call="status"} 7' in text
+    assert 'freetv_x_seconds_bucket{le="0.1"} 2' in text and "freetv_x_seconds_count 2" in text
+    assert 'freetv_lag_seconds{worker="0"} 0.01' in text and 'freetv_lag_seconds{worker="1"} 0.02' in text
+    assert text.count("# TYPE freetv_lag_seconds gauge") == 1
+    print("✅ 3 + 4 requêtes = 7, une série de retard par worker\n")
+
+
+def test_fleet_runs_and_restarts_workers():
+    """2 processus, 6 faux players : santé et métriques agrégées, worker tué relancé."""
+    print("🧪 Test parc multi-processus\n")
+
+    async def scenario():
+        fleet = FleetRunner(PLAYERS, workers=2, client_factory=fake_box, report_interval=0.2)
+        async with fleet:
+            task = asyncio.ensure_future(fleet.run())
+            await wait_for(lambda: fleet.health()["totals"]["connected"] == len(PLAYERS))
+            await wait_for(lambda: all(r["players"]["box0" if i == 0 else "box1"]["steps"] > 1
+                                       for i, r in fleet.reports.items()) and len(fleet.reports) == 2)
+            health = fleet.health()
+            metrics = fleet.render()
+
+            killed = fleet.processes[1]
+            killed.kill()
+            await wait_for(lambda: fleet.worker_restarts[1] == 1 and 1 in fleet.reports)
+            assert fleet.processes[1] is not killed and fleet.processes[1].is_alive()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return fleet, health, metrics
+
+    fleet, health, metrics = asyncio.run(scenario())
+    assert health["totals"]["workers_alive"] == 2 and health["totals"]["tv_on"] == len(PLAYERS)
+    assert {state["worker"] for state in health["players"].values()} == {0, 1}
+    assert f'freetv_oqee_ad_cache_total{{path="watch",result="hit"}} {len(PLAYERS)}' in metrics
+    assert 'freetv_players{worker="0"} 3' in metrics and "freetv_fleet_workers_alive 2" in metrics
+    assert not any(process.is_alive() for process in fleet.processes.values())
+    print(f"✅ {health['totals']['connected']} players sur 2 processus, worker 1 relancé\n")
+
+
+def test_sighup_relayed_to_workers():
+    """kill -HUP au parent : relayé aux workers, personne n'est tué."""
+    print("🧪 Test SIGHUP du parc\n")
+
+    async def scenario():
+        fleet = FleetRunner(PLAYERS[:2], workers=2, client_factory=fake_box, report_interval=0.2)
+        async with fleet:
+            task = asyncio.ensure_future(fleet.run())
+            await wait_for(lambda: len(fleet.reports) == 2)
+            os.kill(os.getpid(), signal.SIGHUP)
+            os.kill(os.getpid(), signal.SIGHUP)
+            sent = time.time()
+            await wait_for(lambda: all(report["at"] > sent + 0.2 for report in fleet.reports.values()))
+            alive = [process.is_alive() for process in fleet.processes.values()]
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return fleet, alive
+
+    fleet, alive = asyncio.run(scenario())
+    assert alive == [True, True] and not fleet.worker_restarts
+    print("✅ Parent et workers toujours en vie après SIGHUP\n")
+
+
+if __name__ == "__main__":
+    test_shard_players()
+    test_merge_exports()
+    test_fleet_runs_and_restarts_workers()
+    test_sighup_relayed_to_workers()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests de la porte d'accès Freebox (lectures partagées, mute dédoublonné, cadence).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+from freetv.core.client import FreeboxClient
+from freetv.core.clock import VirtualClock
+from freetv.core.gate import ApiGate
+from freetv.core.metrics import FREEBOX_SAVED
+
+START = 1_700_000_000.0
+ROUND_TRIP = 0.03
+
+
+class FakePlayerApi:
+    """API player de freebox_api en mémoire : compte les appels, aller-retour de 30 ms."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.mute = False
+        self.fail_next_set = False
+        self.volume_latency = ROUND_TRIP
+
+    async def get_player_status(self):
+        self.calls["status"] += 1
+        await asyncio.sleep(ROUND_TRIP)
+        return {"power_state": "running", "player": {"state": {"playback_state": "playing"}},
+                "foreground_app": {"context": {"channel": {"channelUuid": "uuid-webtv-612"}}}}
+
+    async def get_player_volume(self):
+        self.calls["volume"] += 1
+        mute = self.mute  # État lu à l'arrivée de la requête
+        await asyncio.sleep(self.volume_latency)
+        return {"mute": mute, "volume": 20}
+
+    async def set_player_volume(self, data):
+        self.calls["set_volume"] += 1
+        await asyncio.sleep(ROUND_TRIP)
+        if self.fail_next_set:
+            self.fail_next_set = False
+            raise ConnectionError("Freebox injoignable")
+        self.mute = data["mute"]
+
+
+def make_client(clock: VirtualClock, api: FakePlayerApi, gate: ApiGate = None) -> FreeboxClient:
+    client = FreeboxClient(clock=clock, gate=gate or ApiGate(read_window=0.5, clock=clock))
+    client.fbx = SimpleNamespace(player=api)
+    return client
+
+
+def run_virtual(clock: VirtualClock, coro):
+    loop = clock.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_overlapping_status_reads_coalesced():
+    """Deux consommateurs d'une box : statuts simultanés ou rapprochés lus une seule fois."""
+    print("🧪 Test lectures de statut partagées\n")
+
+    clock = VirtualClock(START)
+    api = FakePlayerApi()
+    gate = ApiGate(read_window=0.5, clock=clock)
+    engine, display = make_client(clock, api, gate), make_client(clock, api, gate)
+
+    async def scenario():
+        statuses = await asyncio.gather(*(client.get_player_status() for client in (engine, display) * 3))
+        await asyncio.sleep(0.2)
+        recent = await display.get_player_status()
+        await asyncio.sleep(0.5)
+        fresh = await engine.get_player_status()
+        return statuses, recent, fresh
+
+    before = FREEBOX_SAVED.value("get_player_status", "coalesced")
+    statuses, recent, fresh = run_virtual(clock, scenario())
+    assert all(status.channel_uuid == "uuid-webtv-612" for status in statuses)
+    assert recent is statuses[0] and fresh is not recent
+    assert api.calls["status"] == 2, api.calls
+    assert FREEBOX_SAVED.value("get_player_status", "coalesced") - before == 5
+    print("✅ 7 lectures, 2 requêtes (fenêtre de 0,5 s)\n")
+
+
+def test_redundant_mute_dropped():
+    """set_mute vers l'état déjà confirmé : pas de requête ; commandes croisées sérialisées."""
+    print("🧪 Test mute dédoublonné\n")
+
+    clock = VirtualClock(START)
+    api = FakePlayerApi()
+    client = make_client(clock, api)
+
+    async def scenario():
+        results = []
+        volume = await client.get_volume_state()
+        results.append(await client.set_mute(False))  # Confirmé par la lecture : rien à envoyer
+        # Deux timers qui se chevauchent : la seconde commande voit la première confirmée
+        results += await asyncio.gather(client.set_mute(True), client.set_mute(True))
+        after = await client.get_volume_state()  # Relue après la commande, pas resservie
+        api.fail_next_set = True
+        results.append(await client.set_mute(False))
+        results.append(await client.set_mute(False))  # État inconnu après l'échec : renvoyée
+        return volume, after, results
+
+    volume, after, results = run_virtual(clock, scenario())
+    assert volume.mute is False and after.mute is True
+    assert results == [True, True, True, False, True], results
+    assert api.calls["set_volume"] == 3 and api.calls["volume"] == 2, api.calls
+    assert api.mute is False and client.confirmed_mute is False
+    print("✅ 5 commandes, 3 requêtes (dont une ratée puis renvoyée)\n")
+
+
+def test_calls_bounded_and_spaced():
+    """Au plus 2 lectures en cours, départs espacés d'au moins 20 ms ; le mute ne fait pas la queue."""
+    print("🧪 Test cadence de la box\n")
+
+    clock = VirtualClock(START)
+    gate = ApiGate(max_concurrent=2, min_interval=0.02, read_window=0, clock=clock)
+    starts, running = [], []
+
+    async def call(name: str):
+        starts.append((name, round(clock.monotonic(), 3)))
+        running.append(name)
+        peak = len([other for other in running if other != "mute"])
+        await asyncio.sleep(0.1)
+        running.remove(name)
+        return peak
+
+    async def scenario():
+        reads = [asyncio.ensure_future(gate.read(f"read{i}", lambda i=i: call(f"read{i}"))) for i in range(4)]
+        await asyncio.sleep(0.05)
+        await gate.write(lambda: call("mute"))
+        return await asyncio.gather(*reads)
+
+    peaks = run_virtual(clock, scenario())
+    assert max(peaks) <= 2, peaks
+    assert starts == [("read0", 0.0), ("read1", 0.02), ("mute", 0.05), ("read2", 0.1), ("read3", 0.12)], starts
+    print("✅ 2 lectures à la fois, mute envoyé sans attendre les lectures en file\n")
+
+
+def test_read_after_write_not_joined():
+    """Lecture du volume partie avant un mute : l'appel suivant relit la box, confirmed_mute reste juste."""
+    print("🧪 Test lecture en cours invalidée\n")
+
+    clock = VirtualClock(START)
+    api = FakePlayerApi()
+    api.volume_latency = 4 * ROUND_TRIP  # Réponse du volume après la fin du mute
+    client = make_client(clock, api)
+
+    async def scenario():
+        before = asyncio.ensure_future(client.get_volume_state())
+        await asyncio.sleep(ROUND_TRIP / 2)  # Lecture partie, sans réponse
+        await client.set_mute(True)
+        after = await client.get_volume_state()
+        return await before, after
+
+    before, after = run_virtual(clock, scenario())
+    assert api.calls["volume"] == 2, api.calls
+    assert before.mute is False and after.mute is True
+    assert client.confirmed_mute is True
+    print("✅ Lecture pré-commande non partagée, état confirmé après le mute\n")
+
+
+if __name__ == "__main__":
+    test_overlapping_status_reads_coalesced()
+    test_redundant_mute_dropped()
+    test_calls_bounded_and_spaced()
+    test_read_after_write_not_joined()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
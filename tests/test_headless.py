@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests du mode --headless (aucun import de Rich).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import subprocess
+
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+
+
+def test_headless_never_imports_rich():
+    """Le point d'entrée et le moteur se chargent sans Rich."""
+    print("🧪 Test imports du mode headless\n")
+
+    code = (
+        "import sys; sys.path.insert(0, 'src')\n"
+        "import freetv.__main__, freetv.headless\n"
+        "assert 'rich' not in sys.modules, sorted(m for m in sys.modules if m.startswith('rich'))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    print("✅ freetv.__main__ et freetv.headless n'importent pas Rich\n")
+
+
+def test_headless_permission_error():
+    """Une permission manquante est journalisée et donne un code de sortie non nul."""
+    print("🧪 Test permission manquante en headless\n")
+
+    class DeniedClient:
+        _last_player_status = None
+
+        async def connect(self):
+            raise PermissionError("Permission 'Contrôle du Freebox Player' manquante.")
+
+        async def disconnect(self):
+            pass
+
+    from freetv import headless
+
+    async def scenario():
+        engine = AutoMuteEngine(fbx_client=DeniedClient(), oqee_client=OqeeClient(base_url="http://127.0.0.1:9"))
+        return engine, await headless.main(engine)
+
+    engine, code = asyncio.run(scenario())
+    assert code == 1
+    assert engine.oqee_client._session is None or engine.oqee_client._session.closed
+    print("✅ Code de sortie 1, session OQEE fermée\n")
+
+
+if __name__ == "__main__":
+    test_headless_never_imports_rich()
+    test_headless_permission_error()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
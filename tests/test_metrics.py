@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests des métriques Prometheus (compteurs, histogrammes, endpoint /metrics).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+
+import aiohttp
+
+from fakes import FakeFreeboxClient
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.metrics import REGISTRY, MetricsRegistry, MetricsServer
+from freetv.core.oqee import OqeeClient
+from freetv.core.scheduler import build_transitions
+from freetv.models import AdBreak
+
+
+def test_exposition_format():
+    """Compteurs et histogrammes rendus au format texte Prometheus."""
+    print("🧪 Test format d'exposition\n")
+
+    registry = MetricsRegistry()
+    calls = registry.counter("demo_calls_total", "Appels.", ("call", "outcome"))
+    latency = registry.histogram("demo_seconds", "Durée.", ("call",), buckets=(0.1, 1.0))
+    registry.gauge("demo_gauge", "Jauge.", lambda: 0.5)
+
+    calls.inc("status", "ok")
+    calls.inc("status", "ok")
+    calls.inc("status", "error")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "status")
+
+    text = registry.render()
+    assert '# TYPE demo_calls_total counter' in text
+    assert 'demo_calls_total{call="status",outcome="ok"} 2' in text
+    assert 'demo_calls_total{call="status",outcome="error"} 1' in text
+    # Seaux cumulatifs, bornes inclusives
+    assert 'demo_seconds_bucket{call="status",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{call="status",le="1"} 3' in text
+    assert 'demo_seconds_bucket{call="status",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{call="status"} 4' in text
+    assert 'demo_seconds_sum{call="status"} 3.65' in text
+    assert 'demo_gauge 0.5' in text
+    print("✅ Compteurs, seaux cumulatifs et jauges conformes\n")
+
+
+def test_transition_boundaries():
+    """Chaque transition connaît la pub dont on mesure le retard."""
+    print("🧪 Test bornes des transitions\n")
+
+    transitions = build_transitions([AdBreak(100, 200), AdBreak(205, 250)], buffer=10)
+    assert [(t.at, t.mute, t.boundary) for t in transitions] == [(90, True, 100), (251, False, 250)]
+    print("✅ Mute rattaché au début de la 1re pub, démute à la fin de la dernière\n")
+
+
+def test_metrics_endpoint():
+    """L'endpoint /metrics est servi par la boucle asyncio."""
+    print("🧪 Test endpoint /metrics\n")
+
+    registry = MetricsRegistry()
+    registry.counter("demo_total", "Démo.").inc()
+
+    async def scenario():
+        server = MetricsServer(registry, host="127.0.0.1", port=0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{server.port}/metrics") as response:
+                    return response.status, response.content_type, await response.text()
+        finally:
+            await server.stop()
+
+    status, content_type, text = asyncio.run(scenario())
+    assert status == 200 and content_type == "text/plain"
+    assert "demo_total 1" in text
+    print("✅ /metrics répond en text/plain\n")
+
+
+def test_process_gauges_not_bound_to_last_instance():
+    """Jauges du moteur : celles du moteur démarré, retirées à l'arrêt."""
+    print("🧪 Test jauges du processus\n")
+
+    def gauge(name):
+        lines = [line for line in REGISTRY.render().splitlines() if line.startswith(name + " ")]
+        return float(lines[0].split()[1]) if lines else None
+
+    async def scenario():
+        running = AutoMuteEngine(fbx_client=FakeFreeboxClient(), oqee_client=OqeeClient(channel_mapping={}))
+        running.metrics_server = None
+        async with running:
+            running.last_step_duration = 0.25
+            # Un moteur construit à côté (rejeu, bench) ne remplace pas les jauges du moteur démarré
+            AutoMuteEngine(fbx_client=FakeFreeboxClient(), oqee_client=OqeeClient(channel_mapping={}))
+            during = gauge("freetv_step_duration_seconds")
+        return during, gauge("freetv_step_duration_seconds")
+
+    during, after = asyncio.run(scenario())
+    assert during == 0.25 and after is None, (during, after)
+
+    print("✅ Jauges liées au moteur démarré, retirées à son arrêt\n")
+
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_transition_boundaries()
+    test_metrics_endpoint()
+    test_process_gauges_not_bound_to_last_instance()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tests des fetchs OQEE : requêtes conditionnelles, empreinte du corps, échec d'API, coalescence.
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import time
+
+from aiohttp import web
+
+from freetv.core.metrics import OQEE_COALESCED
+from freetv.core.oqee import OqeeClient, epg_window_start
+
+
+def make_app(state):
+    """Faux OQEE : ETag optionnel, panne et latence simulables."""
+    async def anti_adskipping(request):
+        state.setdefault("requests", []).append(request.path)
+        await asyncio.sleep(state.get("delay", 0))
+        if state["down"]:
+            return web.Response(status=503)
+        etag = '"v%d"' % state["version"]
+        if state["etag"] and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        response = web.json_response({"success": True, "result": {"periods": state["periods"]}})
+        if state["etag"]:
+            response.headers["ETag"] = etag
+        return response
+
+    async def epg(request):
+        state.setdefault("requests", []).append(request.path)
+        await asyncio.sleep(state.get("delay", 0))
+        start = int(request.match_info["start"])
+        return web.json_response({"success": True, "result": {"entries": [
+            {"type": "live", "live": {"title": "Journal", "start": start, "end": start + 21600}},
+        ]}})
+
+    app = web.Application()
+    app.router.add_get("/live/anti_adskipping/{channel_id}", anti_adskipping)
+    app.router.add_get("/epg/by_channel/{channel_id}/{start}", epg)
+    return app
+
+
+async def with_server(state, scenario):
+    runner = web.AppRunner(make_app(state))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = OqeeClient(base_url=f"http://127.0.0.1:{port}")
+    try:
+        await client.open()
+        return await scenario(client)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def periods(now):
+    return [{"type": "ad_break", "start_time": now + 60, "end_time": now + 240}]
+
+
+def test_conditional_requests():
+    """Un ETag inchangé donne un 304 : pas de parsing ni de fusion."""
+    print("🧪 Test requêtes conditionnelles (ETag)\n")
+    state = {"down": False, "etag": True, "version": 1, "periods": periods(int(time.time()))}
+
+    async def scenario(client):
+        assert await client.refresh_ad_breaks("536")
+        index = client._ad_cache["536"].index
+        assert await client.refresh_ad_breaks("536")
+        assert client._ad_cache["536"].index is index, "L'index ne doit pas être reconstruit"
+        return client.fetch_stats["536"]
+
+    stats = asyncio.run(with_server(state, scenario))
+    print(f"  {stats}")
+    assert stats.requests == 2 and stats.not_modified == 1
+    print("✅ 304 compté, index réutilisé\n")
+
+
+def test_identical_body_skips_parsing():
+    """Sans validateurs, un corps identique n'est pas reparsé."""
+    print("🧪 Test empreinte du corps\n")
+    state = {"down": False, "etag": False, "version": 1, "periods": periods(int(time.time()))}
+
+    async def scenario(client):
+        for _ in range(3):
+            assert await client.refresh_ad_breaks("536")
+        state["periods"] = periods(int(time.time()) + 600)
+        assert await client.refresh_ad_breaks("536")
+        return client.fetch_stats["536"], client._ad_cache["536"].index
+
+    stats, index = asyncio.run(with_server(state, scenario))
+    print(f"  {stats}")
+    assert stats.parse_skips == 2 and stats.bytes_received > 0
+    assert index.breaks[0].start_time == state["periods"][0]["start_time"]
+    print("✅ Corps identiques ignorés, changement pris en compte\n")
+
+
+def test_failure_keeps_last_schedule():
+    """Une panne OQEE ne vide pas le planning servi (pas de démute en pleine pub)."""
+    print("🧪 Test panne OQEE\n")
+    state = {"down": False, "etag": False, "version": 1, "periods": periods(int(time.time()))}
+
+    async def scenario(client):
+        await client.update_cache("uuid-webtv-612")
+        state["down"] = True
+        client._ad_cache["536"].fetched_at -= client.refresh_max + 1
+        await client.update_cache("uuid-webtv-612")
+        return len(client.ad_index), client.fetch_stats["536"].errors
+
+    served, errors = asyncio.run(with_server(state, scenario))
+    assert served == 1 and errors >= 1
+    print("✅ Dernier planning connu toujours servi\n")
+
+
+def test_concurrent_callers_share_one_request():
+    """Appels simultanés pour la même chaîne : une requête par ressource, résultat parsé partagé."""
+    print("🧪 Test coalescence des requêtes\n")
+    now = int(time.time())
+    state = {"down": False, "etag": False, "version": 1, "periods": periods(now), "delay": 0.05}
+    before = OQEE_COALESCED.value("anti_adskipping"), OQEE_COALESCED.value("epg")
+
+    async def scenario(client):
+        window = epg_window_start(now)
+        ads = await asyncio.gather(*(client.fetch_ad_breaks("536") for _ in range(3)), client.refresh_ad_breaks("536"))
+        blocks = await asyncio.gather(client.fetch_epg_block("536", window), client.fetch_epg_block("536", window),
+                                      client.fetch_epg_block("537", window))
+        return ads, blocks, client.fetch_stats
+
+    ads, blocks, stats = asyncio.run(with_server(state, scenario))
+    assert sorted(state["requests"]) == sorted([
+        "/live/anti_adskipping/536", f"/epg/by_channel/536/{epg_window_start(now)}",
+        f"/epg/by_channel/537/{epg_window_start(now)}",
+    ]), state["requests"]
+    assert ads[0] is ads[1] is ads[2] and ads[3] is True
+    assert blocks[0] is blocks[1] and blocks[2] is not blocks[0]
+    assert stats["536"].coalesced == 4 and stats["536"].requests == 2
+    assert OQEE_COALESCED.value("anti_adskipping") - before[0] == 3
+    assert OQEE_COALESCED.value("epg") - before[1] == 1
+    print("✅ 7 appels, 3 requêtes HTTP, 4 appels coalescés\n")
+
+
+if __name__ == "__main__":
+    test_conditional_requests()
+    test_identical_body_skips_parsing()
+    test_failure_keeps_last_schedule()
+    test_concurrent_callers_share_one_request()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests de la cadence adaptative du planning pub OQEE.
+"""
+import sys
+sys.path.insert(0, 'src')
+
+from freetv.core.clock import VirtualClock
+from freetv.core.oqee import OqeeClient, _AdCacheEntry, _EpgCacheEntry, epg_window_start
+from freetv.models import AdBreak, AdBreakIndex, EpgBlock, TVProgram
+
+NOW = 1_700_000_000
+
+
+def client_with(ad_breaks, programs=()):
+    client = OqeeClient(clock=VirtualClock(NOW))
+    client.refresh_min, client.refresh_max, client.refresh_lead_factor = 3, 30, 0.25
+    client.announce_lead = 60
+    client._ad_cache["536"] = _AdCacheEntry(index=AdBreakIndex.from_breaks(ad_breaks), fetched_at=NOW)
+    window = epg_window_start(NOW)
+    client._epg_cache[("536", window)] = _EpgCacheEntry(block=EpgBlock.from_programs(window, list(programs)), fetched_at=NOW)
+    return client
+
+
+def program(start, end):
+    return TVProgram(title="Film", category="", sub_category="", start_time=start, end_time=end,
+                     duration_seconds=end - start, description="")
+
+
+def test_interval_follows_schedule():
+    """Intervalle rare au calme, resserré à l'approche d'une borne, minimal pendant une fin estimée."""
+    print("🧪 Test intervalle de rafraîchissement\n")
+
+    # Rien à l'horizon : refresh_max
+    assert client_with([]).ad_refresh_interval("536", NOW) == 30
+    # Pub dans 40 min : refresh_max ; dans 60 s : 15 s ; dans 5 s : refresh_min
+    assert client_with([AdBreak(NOW + 2400, NOW + 2640)]).ad_refresh_interval("536", NOW) == 30
+    assert client_with([AdBreak(NOW + 60, NOW + 300)]).ad_refresh_interval("536", NOW) == 15
+    assert client_with([AdBreak(NOW + 5, NOW + 300)]).ad_refresh_interval("536", NOW) == 3
+    # Fin de programme dans 40 s, sans pub annoncée : 10 s
+    assert client_with([], [program(NOW - 3000, NOW + 40)]).ad_refresh_interval("536", NOW) == 10
+    # Pub en cours, fin connue dans 100 s : 25 s ; fin estimée : refresh_min
+    assert client_with([AdBreak(NOW - 20, NOW + 100)]).ad_refresh_interval("536", NOW) == 25
+    estimated = AdBreak(NOW - 20, NOW + 280, estimated_end=True)
+    assert client_with([estimated]).ad_refresh_interval("536", NOW) == 3
+    print("✅ 30 s au calme → 3 s près des bornes et pendant une fin estimée\n")
+
+
+def test_interval_keeps_mute_lead():
+    """Pubs annoncées 20 s à l'avance, mute 10 s avant : jamais plus de 10 s entre deux requêtes."""
+    print("🧪 Test plafond d'annonce\n")
+
+    def interval(ad_breaks, programs=()):
+        client = client_with(ad_breaks, programs)
+        client.announce_lead = 20
+        return client.ad_refresh_interval("536", NOW)
+
+    assert interval([]) == 10
+    assert interval([AdBreak(NOW + 2400, NOW + 2640)]) == 10
+    assert interval([AdBreak(NOW - 20, NOW + 100)]) == 10
+    # Plus serré que le plafond : inchangé
+    assert interval([], [program(NOW - 3000, NOW + 20)]) == 5
+    print("✅ Plafonné à l'avance d'annonce moins UNMUTE_BUFFER\n")
+
+
+def test_estimated_end_survives_parse_and_merge():
+    """Le drapeau de fin estimée vient de l'API et suit la pub qui termine la fusion."""
+    print("🧪 Test fin estimée\n")
+
+    parsed = OqeeClient._parse_ad_breaks({"success": True, "result": {"periods": [
+        {"type": "ad_break", "start_time": 100, "end_time": 200},
+        {"type": "ad_break", "start_time": 230},
+    ]}})
+    assert [(ad.end_time, ad.estimated_end) for ad in parsed] == [(200, False), (530, True)]
+
+    merged = OqeeClient()._merge_close_ad_breaks(parsed, max_gap=60)
+    assert merged == [AdBreak(100, 530, estimated_end=True)]
+    print("✅ end_time absent → +5 min estimé, conservé après fusion\n")
+
+
+if __name__ == "__main__":
+    test_interval_follows_schedule()
+    test_interval_keeps_mute_lead()
+    test_estimated_end_survives_parse_and_merge()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
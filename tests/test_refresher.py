@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests du rafraîchisseur OQEE en tâche de fond : moteur jamais bloqué, planning périmé retiré.
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import time
+
+from fakes import FakeFreeboxClient, FakeOqee, start_server
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+from freetv.models import AdBreak
+
+CHANNEL = "uuid-webtv-612"
+MAPPING = {CHANNEL: "536"}
+
+
+def test_run_step_never_waits_for_oqee():
+    """OQEE à 1 s de latence : les itérations restent au rythme de la Freebox, le planning arrive ensuite."""
+    print("🧪 Test itérations non bloquées par OQEE\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)], latency=1.0)
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        engine = AutoMuteEngine(fbx_client=FakeFreeboxClient(latency=0.01),
+                                oqee_client=OqeeClient(channel_mapping=MAPPING, base_url=url))
+        engine.metrics_server = None
+        try:
+            async with engine:
+                durations = []
+                for _ in range(5):
+                    await engine.run_step()
+                    durations.append(engine.last_step_duration)
+                    await asyncio.sleep(0.05)
+                during = (oqee.requests["anti_adskipping"], engine.oqee_client.ad_breaks)
+                await asyncio.sleep(1.2)
+                await engine.run_step()
+                after = engine.oqee_client.ad_breaks
+        finally:
+            await runner.cleanup()
+        return durations, during, after
+
+    durations, (requests, during), after = asyncio.run(scenario())
+    assert max(durations) < 0.2, durations
+    assert requests == 1 and during == [], (requests, during)
+    assert after == [AdBreak(now + 600, now + 780)], after
+    print(f"✅ 5 itérations en {max(durations) * 1000:.0f} ms max pendant un fetch de 1 s\n")
+
+
+def test_stale_schedule_dropped():
+    """OQEE en panne : dernier planning servi jusqu'à max_staleness, plus rien au-delà."""
+    print("🧪 Test planning périmé\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)])
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        client = OqeeClient(channel_mapping=MAPPING, base_url=url)
+        client.max_staleness = 0.3
+        client.refresh_min = client.refresh_max = 0.1
+        served = []
+        try:
+            client.watch(CHANNEL)
+            await client.update_cache(CHANNEL)
+            served.append((client.ad_breaks_channel, len(client.ad_breaks)))
+            await runner.cleanup()  # Panne : connexions refusées
+            for _ in range(2):
+                await asyncio.sleep(0.2)
+                await client.update_cache(CHANNEL)
+                served.append((client.ad_breaks_channel, len(client.ad_breaks)))
+        finally:
+            await client.close()
+        return served, client.fetch_stats["536"]
+
+    served, stats = asyncio.run(scenario())
+    # Servi à 0 s, encore à 0,2 s malgré l'échec, retiré à 0,4 s
+    assert served == [(CHANNEL, 1), (CHANNEL, 1), (None, 0)], served
+    assert stats.errors >= 1, stats
+    print("✅ Planning servi 0,3 s après le dernier succès, puis retiré\n")
+
+
+if __name__ == "__main__":
+    test_run_step_never_waits_for_oqee()
+    test_stale_schedule_dropped()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
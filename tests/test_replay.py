@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests du rejeu en temps virtuel (horloge injectable).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from freetv.config import CHANNEL_MAPPING_FILE, UNMUTE_BUFFER
+from freetv.core.clock import VirtualClock
+from freetv.core.replay import Timeline, replay
+
+START = 1_700_000_000.0
+
+
+def status(channel_uuid, power_state="running"):
+    return {
+        "power_state": power_state,
+        "player": {"state": {"playback_state": "playing"}},
+        "foreground_app": {"context": {"channel": {"channelUuid": channel_uuid}}},
+    }
+
+
+def ads(*periods):
+    return {"success": True, "result": {"periods": [
+        {"type": "ad_break", "start_time": start, "end_time": end} for start, end in periods
+    ]}}
+
+
+def evening():
+    """TF1 avec deux pubs, zapping sur M6 (une pub), puis TV éteinte."""
+    s = int(START)
+    return [
+        {"t": START, "kind": "player_status", "data": status("uuid-webtv-612")},
+        {"t": START, "kind": "oqee", "path": "/live/anti_adskipping/536",
+         "data": ads((s + 600, s + 780), (s + 2400, s + 2580))},
+        {"t": START, "kind": "oqee", "path": "/live/anti_adskipping/537", "data": ads((s + 3900, s + 4020))},
+        {"t": START + 3600, "kind": "player_status", "data": status("uuid-webtv-613")},
+        {"t": START + 5400, "kind": "player_status", "data": status("", power_state="standby")},
+        {"t": START + 7200, "kind": "player_status", "data": status("", power_state="standby")},
+    ]
+
+
+def test_virtual_clock():
+    """Les sleeps et timers s'exécutent sans attendre, dans l'ordre."""
+    print("🧪 Test horloge virtuelle\n")
+
+    clock = VirtualClock(START)
+    fired = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_at(loop.time() + 3600, lambda: fired.append(clock.time()))
+        await asyncio.sleep(7200)
+        return clock.time()
+
+    wall = time.perf_counter()
+    end = clock.run(scenario())
+    assert end == START + 7200
+    assert fired == [START + 3600]
+    assert time.perf_counter() - wall < 1
+    print("✅ 2h virtuelles instantanées, timer à l'heure\n")
+
+
+def test_replay_decisions():
+    """Le moteur rejoue la soirée et mute aux bons instants."""
+    print("🧪 Test rejeu d'une soirée\n")
+
+    s = int(START)
+    result = replay(Timeline.from_records(evening()))
+    decisions = [(round(d.at - s), d.mute, d.channel_uuid) for d in result.decisions]
+    print(f"  {len(decisions)} décisions en {result.wall_seconds:.2f}s pour {result.simulated_seconds / 3600:.1f}h")
+
+    b = UNMUTE_BUFFER
+    assert decisions == [
+        (600 - b, True, "uuid-webtv-612"), (781, False, "uuid-webtv-612"),
+        (2400 - b, True, "uuid-webtv-612"), (2581, False, "uuid-webtv-612"),
+        (3900 - b, True, "uuid-webtv-613"), (4021, False, "uuid-webtv-613"),
+    ], decisions
+    assert result.simulated_seconds == 7200
+    print("✅ Décisions attendues, y compris après le zapping\n")
+
+
+def test_replay_is_deterministic():
+    """Deux rejeux du même enregistrement (ici gzip) donnent la même sortie."""
+    print("🧪 Test rejeu déterministe\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "capture.jsonl.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for record in evening():
+                f.write(json.dumps(record) + "\n")
+        first = [d.to_json() for d in replay(Timeline.load(path)).decisions]
+        second = [d.to_json() for d in replay(Timeline.load(path)).decisions]
+
+    assert first == second and first
+    assert json.loads(first[0])["mute"] is True
+    print("✅ Sorties identiques, prêtes pour un diff\n")
+
+
+def test_replay_reads_mapping_file():
+    """Sans mapping explicite, le rejeu lit CHANNEL_MAPPING_FILE comme le moteur en direct."""
+    print("🧪 Test mapping du fichier JSON au rejeu\n")
+
+    if not CHANNEL_MAPPING_FILE or Path(CHANNEL_MAPPING_FILE).is_absolute():
+        print("⏭️  CHANNEL_MAPPING_FILE vide ou absolu : test ignoré\n")
+        return
+
+    s = int(START)
+    records = [
+        {"t": START, "kind": "player_status", "data": status("uuid-webtv-999")},
+        {"t": START, "kind": "oqee", "path": "/live/anti_adskipping/999", "data": ads((s + 600, s + 780))},
+        {"t": START + 1200, "kind": "player_status", "data": status("", power_state="standby")},
+    ]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Chaîne connue seulement du fichier (chemin relatif : lu dans le répertoire courant)
+        path = Path(tmp) / CHANNEL_MAPPING_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"mappings": {"uuid-webtv-999": "999"}}), encoding="utf-8")
+        os.chdir(tmp)
+        try:
+            result = replay(Timeline.from_records(records))
+        finally:
+            os.chdir(cwd)
+
+    decisions = [(round(d.at - s), d.mute) for d in result.decisions]
+    assert decisions == [(600 - UNMUTE_BUFFER, True), (781, False)], decisions
+    print("✅ Pub de la chaîne du fichier mutée au rejeu\n")
+
+
+def test_replay_without_process_services():
+    """Capture, préchauffage et /metrics activés par l'environnement : coupés au rejeu."""
+    print("🧪 Test rejeu sans services du processus\n")
+
+    code = (
+        "import sys; sys.path.insert(0, 'src')\n"
+        "from freetv.core.replay import Timeline, replay\n"
+        "engines = []\n"
+        "records = [{'t': 0.0, 'kind': 'player_status', 'data': {'power_state': 'standby'}},\n"
+        "           {'t': 60.0, 'kind': 'player_status', 'data': {'power_state': 'standby'}}]\n"
+        "replay(Timeline.from_records(records), setup=engines.append)\n"
+        "engine, = engines\n"
+        "assert (engine.capture, engine.warmer, engine.metrics_server) == (None, None, None)\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, CAPTURE_ENABLED="1", CAPTURE_DIR=tmp, WARMER_ENABLED="1", METRICS_ENABLED="1")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        written = list(Path(tmp).iterdir())
+
+    assert result.returncode == 0, result.stderr
+    assert written == [], written
+    print("✅ Rien de capturé, préchauffé ni servi pendant le rejeu\n")
+
+
+if __name__ == "__main__":
+    test_virtual_clock()
+    test_replay_decisions()
+    test_replay_is_deterministic()
+    test_replay_reads_mapping_file()
+    test_replay_without_process_services()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests d'une itération du moteur : appels Freebox concurrents, volume sauté si connu.
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+
+from fakes import FakeFreeboxClient
+from freetv.core.engine import AutoMuteEngine
+from freetv.core.oqee import OqeeClient
+from freetv.models import VolumeState
+
+LATENCY = 0.05
+
+
+def make_engine(fbx):
+    engine = AutoMuteEngine(fbx_client=fbx, oqee_client=OqeeClient(channel_mapping={}))
+    engine.metrics_server = None
+    return engine
+
+
+def test_concurrent_status_and_volume():
+    """Volume à revalider : statut et volume en parallèle (durée ≈ un aller-retour)."""
+    print("🧪 Test appels concurrents\n")
+
+    async def scenario():
+        fbx = FakeFreeboxClient(latency=LATENCY)
+        engine = make_engine(fbx)
+        await engine.run_step()  # TV encore inconnue : statut puis volume
+        first = engine.last_step_duration
+
+        engine.volume_revalidate_interval = 0
+        await engine.run_step()
+        concurrent = engine.last_step_duration
+        return first, concurrent, fbx.calls
+
+    first, concurrent, calls = asyncio.run(scenario())
+    assert first >= 2 * LATENCY
+    assert concurrent < 1.5 * LATENCY, concurrent
+    assert calls["get_player_status"] == 2 and calls["get_volume_state"] == 2
+    print(f"✅ {first * 1000:.0f} ms en séquentiel → {concurrent * 1000:.0f} ms en parallèle\n")
+
+
+def test_volume_skipped_when_known():
+    """Volume connu et récent : un seul appel Freebox par itération."""
+    print("🧪 Test volume sauté\n")
+
+    async def scenario():
+        fbx = FakeFreeboxClient(latency=LATENCY)
+        engine = make_engine(fbx)
+        await engine.run_step()
+        for _ in range(5):
+            await engine.run_step()
+        return fbx.calls, engine.last_step_duration
+
+    calls, duration = asyncio.run(scenario())
+    assert calls["get_player_status"] == 6 and calls["get_volume_state"] == 1
+    assert duration < 1.5 * LATENCY
+    print("✅ 6 statuts, 1 seule lecture du volume\n")
+
+
+def test_volume_failure_keeps_last_state():
+    """Échec du volume pendant l'appel concurrent : le statut est traité, l'ancien volume gardé."""
+    print("🧪 Test échec partiel\n")
+
+    class FlakyVolume(FakeFreeboxClient):
+        fail = False
+
+        async def get_volume_state(self):
+            if self.fail:
+                raise ConnectionError("volume injoignable")
+            return await super().get_volume_state()
+
+    async def scenario():
+        fbx = FlakyVolume()
+        engine = make_engine(fbx)
+        await engine.run_step()
+        known = engine._volume_state
+        fbx.channel_uuid = "uuid-webtv-613"
+        fbx.fail = True
+        engine.volume_revalidate_interval = 0
+        await engine.run_step()
+        return known, engine._volume_state, engine._watched_channel
+
+    known, after, watched = asyncio.run(scenario())
+    assert known is not None and after == known
+    assert watched == "uuid-webtv-613"
+    print("✅ Changement de chaîne pris en compte malgré l'échec du volume\n")
+
+
+def test_exit_waits_for_mute_and_unmutes():
+    """Arrêt pendant une commande de mute : elle aboutit, puis démute, avant la déconnexion."""
+    print("🧪 Test arrêt du moteur\n")
+
+    class TracedClient(FakeFreeboxClient):
+        disconnected = False
+
+        async def set_mute(self, mute):
+            assert not self.disconnected, "commande envoyée après la déconnexion"
+            return await super().set_mute(mute)
+
+        async def disconnect(self):
+            self.disconnected = True
+
+    async def scenario():
+        fbx = TracedClient(latency=LATENCY)
+        async with make_engine(fbx) as engine:
+            await engine.run_step()
+            engine._on_transition(True)  # Timer de début de pub, commande en vol à l'arrêt
+            await asyncio.sleep(0)
+        return fbx, engine
+
+    fbx, engine = asyncio.run(scenario())
+    assert [mute for _, mute in fbx.mute_calls] == [True, False], fbx.mute_calls
+    assert fbx.disconnected and not fbx.mute and not engine._pending
+    print("✅ Mute en vol terminé, TV démutée, puis déconnexion\n")
+
+
+def test_stale_volume_dropped_after_timer_mute():
+    """Volume lu avant un démute des timers et reçu après : ignoré, la pub suivante est bien mutée."""
+    print("🧪 Test volume périmé par une commande\n")
+
+    class SlowVolume(FakeFreeboxClient):
+        async def get_volume_state(self):
+            self.calls["get_volume_state"] += 1
+            mute = self.mute  # État lu à l'arrivée de la requête
+            await asyncio.sleep(self.volume_latency)
+            return VolumeState(mute=mute, volume=20)
+
+    async def scenario():
+        fbx = SlowVolume()
+        fbx.volume_latency = 0
+        engine = make_engine(fbx)
+        await engine.run_step()
+        await engine._apply_mute(True)  # Pub en cours, mutée par nous
+
+        fbx.volume_latency = LATENCY
+        engine.volume_revalidate_interval = 0
+        step = asyncio.ensure_future(engine.run_step())  # Lit mute=True
+        await asyncio.sleep(LATENCY / 2)
+        engine._on_transition(False)  # Fin de pub pendant la lecture
+        await asyncio.gather(step, *engine._pending)
+        after_step = engine._volume_state.mute
+
+        await engine._apply_mute(True)  # Pub suivante
+        return fbx, after_step
+
+    fbx, after_step = asyncio.run(scenario())
+    assert after_step is False
+    assert [mute for _, mute in fbx.mute_calls] == [True, False, True], fbx.mute_calls
+    print("✅ Lecture antérieure au démute ignorée, pub suivante mutée\n")
+
+
+if __name__ == "__main__":
+    test_concurrent_status_and_volume()
+    test_volume_skipped_when_known()
+    test_volume_failure_keeps_last_state()
+    test_exit_waits_for_mute_and_unmutes()
+    test_stale_volume_dropped_after_timer_mute()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests du planificateur de mute (timers au lieu du polling).
+"""
+import sys
+sys.path.insert(0, 'src')
+
+import asyncio
+import time
+
+from freetv.models import AdBreak
+from freetv.core.scheduler import MuteScheduler, build_transitions
+
+
+def test_build_transitions():
+    """Les fenêtres incluent le buffer et fusionnent les pubs proches."""
+    print("🧪 Test build_transitions\n")
+
+    # Pub isolée : mute `buffer` secondes avant, démute après la dernière seconde
+    transitions = build_transitions([AdBreak(100, 200)], buffer=10)
+    assert [(t.at, t.mute) for t in transitions] == [(90, True), (201, False)]
+    print("✅ Pub isolée : mute à 90, démute à 201")
+
+    # Deux pubs séparées de moins que le buffer : une seule fenêtre
+    transitions = build_transitions([AdBreak(300, 400), AdBreak(100, 200), AdBreak(205, 250)], buffer=10)
+    assert [(t.at, t.mute) for t in transitions] == [
+        (90, True), (251, False),
+        (290, True), (401, False),
+    ]
+    print("✅ Pubs proches fusionnées, pubs éloignées séparées")
+
+    assert build_transitions([], buffer=10) == []
+    print("✅ Aucune pub : aucune transition\n")
+
+
+def test_expected_state():
+    """L'état attendu suit la dernière transition passée."""
+    print("🧪 Test expected_state\n")
+
+    async def scenario():
+        scheduler = MuteScheduler(lambda mute: None, buffer=10)
+        # Pub déjà en cours : l'état attendu immédiat est "muté"
+        now = int(time.time())
+        assert scheduler.schedule([AdBreak(now - 5, now + 60)]) is True
+        assert scheduler.expected_state(now + 61) is False
+        assert scheduler.next_transition(now).mute is False
+        scheduler.cancel()
+        assert scheduler.expected_state(now) is False
+
+    asyncio.run(scenario())
+    print("✅ État attendu cohérent avec le planning\n")
+
+
+def test_timers_fire_on_boundaries():
+    """Les timers se déclenchent aux instants exacts des transitions."""
+    print("🧪 Test déclenchement des timers\n")
+
+    async def scenario():
+        fired = []
+        scheduler = MuteScheduler(lambda mute: fired.append((time.time(), mute)), buffer=0)
+
+        # Pub qui commence dans 50 ms : transitions à start (mute) et end + 1 (unmute)
+        start = time.time() + 0.05
+        scheduler.schedule([AdBreak(start, start)])
+        await asyncio.sleep(1.2)
+        return start, fired
+
+    start, fired = asyncio.run(scenario())
+    assert [mute for _, mute in fired] == [True, False]
+    lag_ms = (fired[0][0] - start) * 1000
+    print(f"  Retard du mute : {lag_ms:.1f} ms")
+    assert 0 <= lag_ms < 50, "Le mute devrait tomber à quelques ms du début de la pub"
+    print("✅ Mute déclenché à l'heure\n")
+
+
+if __name__ == "__main__":
+    test_build_transitions()
+    test_expected_state()
+    test_timers_fire_on_boundaries()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests du cache disque (CacheStore) et du démarrage à chaud d'OqeeClient.
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+from fakes import FakeOqee, start_server
+from freetv.core.oqee import EPG_WINDOW, OqeeClient, epg_window_start
+from freetv.core.store import CacheStore
+from freetv.models import AdBreak, TVProgram
+
+NOW = 1_700_000_000
+
+
+def program(title, start, end):
+    return TVProgram(title=title, category="Info", sub_category="", start_time=start, end_time=end,
+                     duration_seconds=end - start, description="")
+
+
+def test_round_trip():
+    """Plannings pub et blocs EPG relus à l'identique, chaque sauvegarde remplaçant la précédente."""
+    print("🧪 Test aller-retour du cache disque\n")
+
+    window = epg_window_start(NOW)
+    journal = program("Journal", window, window + 1800)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CacheStore(Path(tmp) / "cache.sqlite3")
+        store.save_ad_breaks("536", [AdBreak(NOW + 60, NOW + 240)], fetched_at=NOW - 10)
+        store.save_ad_breaks("536", [AdBreak(NOW + 600, NOW + 780)], fetched_at=NOW)
+        store.save_ad_breaks("537", [], fetched_at=NOW)
+        store.save_epg_block("536", window, [journal], fetched_at=NOW)
+        ads = store.load_ad_breaks(max_age=600, now=NOW)
+        blocks = store.load_epg_blocks(min_window=window)
+
+    assert ads == {"536": ([AdBreak(NOW + 600, NOW + 780)], NOW), "537": ([], NOW)}, ads
+    assert blocks == {("536", window): ([journal], NOW)}, blocks
+    print("✅ Dernier planning de chaque chaîne, bloc EPG intact\n")
+
+
+def test_expiry():
+    """Fetchs plus vieux que max_age, pubs terminées et blocs EPG de plus d'un jour : non rechargés."""
+    print("🧪 Test expiration du cache disque\n")
+
+    window = epg_window_start(NOW)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CacheStore(Path(tmp) / "cache.sqlite3")
+        store.save_ad_breaks("536", [AdBreak(NOW - 600, NOW - 420), AdBreak(NOW - 60, NOW + 120)], fetched_at=NOW)
+        store.save_ad_breaks("537", [AdBreak(NOW + 60, NOW + 240)], fetched_at=NOW - 7200)
+        store.save_epg_block("536", window - 5 * EPG_WINDOW, [program("Ancien", window - 5 * EPG_WINDOW, window)], NOW)
+        store.save_epg_block("536", window - EPG_WINDOW, [program("Veille", window - EPG_WINDOW, window)], NOW)
+        store.save_epg_block("536", window, [program("Journal", window, window + 1800)], NOW)
+        ads = store.load_ad_breaks(max_age=3600, now=NOW)
+        recent = store.load_epg_blocks(min_window=window - EPG_WINDOW)
+        kept = store.load_epg_blocks(min_window=0)
+
+    assert ads == {"536": ([AdBreak(NOW - 60, NOW + 120)], NOW)}, ads
+    assert sorted(recent) == [("536", window - EPG_WINDOW), ("536", window)], recent
+    # Le bloc de 30 h a été purgé par la dernière sauvegarde
+    assert sorted(kept) == sorted(recent), kept
+    print("✅ Planning de 2 h, pub terminée et bloc de plus d'un jour écartés\n")
+
+
+def test_provisional_reconciled_by_live_fetch():
+    """Démarrage à chaud : planning disque servi tout de suite, remplacé et réécrit au premier fetch live."""
+    print("🧪 Test réconciliation du planning provisoire\n")
+
+    mapping = {"uuid-webtv-612": "536"}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.sqlite3"
+        now = int(time.time())
+        # Planning écrit il y a 10 min : plus vieux que max_staleness, servi quand même en attendant le live
+        CacheStore(path).save_ad_breaks("536", [AdBreak(now + 60, now + 240)], fetched_at=now - 600)
+        oqee = FakeOqee([(now + 900, now + 1080)])
+
+        async def scenario():
+            runner, url = await start_server(oqee.app())
+            client = OqeeClient(channel_mapping=mapping, base_url=url, store=CacheStore(path))
+            try:
+                client.watch("uuid-webtv-612")
+                from_disk = (client.ad_breaks, client.served_from_disk)
+                await client.update_cache("uuid-webtv-612")
+                live = (client.ad_breaks, client.served_from_disk, client._ad_cache["536"].provisional)
+            finally:
+                await client.close()
+                await runner.cleanup()
+            return from_disk, live
+
+        from_disk, live = asyncio.run(scenario())
+        persisted, fetched_at = CacheStore(path).load_ad_breaks(max_age=600, now=now)["536"]
+
+    assert from_disk == ([AdBreak(now + 60, now + 240)], True), from_disk
+    assert live == ([AdBreak(now + 900, now + 1080)], False, False), live
+    assert oqee.requests["anti_adskipping"] == 1
+    assert persisted == [AdBreak(now + 900, now + 1080)] and fetched_at >= now
+    print("✅ Disque servi avant le réseau, puis planning live servi et persisté\n")
+
+
+def test_estimated_end_persisted():
+    """Une fin de pub estimée (end_time absent de l'API) le reste après rechargement."""
+    print("🧪 Test fin estimée persistée\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CacheStore(Path(tmp) / "cache.sqlite3")
+        store.save_ad_breaks("536", [
+            AdBreak(NOW + 60, NOW + 240),
+            AdBreak(NOW + 900, NOW + 1200, estimated_end=True),
+        ], fetched_at=NOW)
+        ads, fetched_at = store.load_ad_breaks(max_age=600, now=NOW)["536"]
+
+    assert fetched_at == NOW
+    assert [ad.estimated_end for ad in ads] == [False, True]
+    print("✅ estimated_end relu tel qu'enregistré\n")
+
+
+def test_old_cache_migrated():
+    """Un cache créé avant la colonne estimated_end est complété, ses pubs lues comme fins réelles."""
+    print("🧪 Test migration du cache\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.sqlite3"
+        with closing(sqlite3.connect(str(path))) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE ad_fetches (channel_id TEXT PRIMARY KEY, fetched_at REAL NOT NULL);
+                CREATE TABLE ad_breaks (channel_id TEXT NOT NULL, start_time INTEGER NOT NULL,
+                                        end_time INTEGER NOT NULL, PRIMARY KEY (channel_id, start_time));
+            """)
+            conn.execute("INSERT INTO ad_fetches VALUES ('536', ?)", (NOW,))
+            conn.execute("INSERT INTO ad_breaks VALUES ('536', ?, ?)", (NOW + 60, NOW + 240))
+
+        store = CacheStore(path)
+        ads, _ = store.load_ad_breaks(max_age=600, now=NOW)["536"]
+        store.save_ad_breaks("536", [AdBreak(NOW + 60, NOW + 360, estimated_end=True)], fetched_at=NOW)
+        reloaded, _ = store.load_ad_breaks(max_age=600, now=NOW)["536"]
+
+    assert [(ad.end_time, ad.estimated_end) for ad in ads] == [(NOW + 240, False)]
+    assert [(ad.end_time, ad.estimated_end) for ad in reloaded] == [(NOW + 360, True)]
+    print("✅ Colonne ajoutée à l'ouverture, anciennes lignes conservées\n")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_expiry()
+    test_provisional_reconciled_by_live_fetch()
+    test_estimated_end_persisted()
+    test_old_cache_migrated()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests du superviseur multi-players (un processus, un client OQEE partagé).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import time
+
+from fakes import FakeFreeboxClient, FakeOqee, start_server
+from freetv.config import EPG_PREFETCH_LEAD
+from freetv.core.oqee import EPG_WINDOW, OqeeClient, epg_window_start
+from freetv.core.supervisor import Supervisor, parse_players
+
+MAPPING = {"uuid-webtv-612": "536", "uuid-webtv-613": "537", "uuid-webtv-201": "270"}
+# 6 players, 2 chaînes distinctes
+WATCHING = {
+    "salon": "uuid-webtv-612", "cuisine": "uuid-webtv-612", "chambre": "uuid-webtv-612",
+    "bureau": "uuid-webtv-612", "ado": "uuid-webtv-613", "garage": "uuid-webtv-613",
+}
+
+
+def epg_windows(now: float) -> int:
+    """Blocs EPG demandés par chaîne au premier rafraîchissement."""
+    return 2 if epg_window_start(now) + EPG_WINDOW - now <= EPG_PREFETCH_LEAD else 1
+
+
+def test_parse_players():
+    """Noms et ports facultatifs, doublons refusés."""
+    print("🧪 Test liste des players\n")
+
+    players = parse_players("salon=192.168.1.10, chambre=192.168.1.11:8443,192.168.1.12")
+    assert [(p.name, p.host, p.port) for p in players] == [
+        ("salon", "192.168.1.10", "443"), ("chambre", "192.168.1.11", "8443"), ("player3", "192.168.1.12", "443"),
+    ]
+    for spec in ("salon=", "a=h1,a=h2"):
+        try:
+            parse_players(spec)
+            assert False, spec
+        except ValueError:
+            pass
+    print("✅ 3 players lus, hôte manquant et doublon refusés\n")
+
+
+def test_oqee_requests_scale_with_channels():
+    """6 players sur 2 chaînes : 2 plannings pub demandés, pas 6 ; tous mutés pendant la pub."""
+    print("🧪 Test cache OQEE partagé\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now - 30, now + 120)], latency=0.05)
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        fbx_clients = {name: FakeFreeboxClient(uuid) for name, uuid in WATCHING.items()}
+        supervisor = Supervisor(fbx_clients, OqeeClient(channel_mapping=MAPPING, base_url=url))
+        try:
+            async with supervisor:
+                task = asyncio.ensure_future(supervisor.run())
+                await asyncio.sleep(0.5)
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            await runner.cleanup()
+        return supervisor, fbx_clients
+
+    supervisor, fbx_clients = asyncio.run(scenario())
+    assert oqee.requests["anti_adskipping"] == 2, oqee.requests
+    assert oqee.requests["epg"] == 2 * epg_windows(now), oqee.requests
+    for name, engine in supervisor.engines.items():
+        assert engine.oqee_client.ad_breaks_channel == WATCHING[name]
+        # Muté pendant la pub, démuté à l'arrêt du superviseur
+        assert [mute for _, mute in fbx_clients[name].mute_calls] == [True, False], name
+    assert len(supervisor.oqee_client.shared.clients) == len(WATCHING) + 1
+    print(f"✅ {len(WATCHING)} players, {oqee.requests['anti_adskipping']} requêtes anti_adskipping\n")
+
+
+def test_shared_refresh_serves_every_viewer():
+    """Un fetch par un lecteur (ou le préchauffage) est servi aux autres lecteurs et suit le mapping."""
+    print("🧪 Test vues du client OQEE\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)])
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        root = OqeeClient(channel_mapping=MAPPING, base_url=url)
+        a, b, c = root.view(), root.view(), root.view()
+        updates = []
+        b.on_update = lambda: updates.append("b")
+        a.watch("uuid-webtv-612")
+        b.watch("uuid-webtv-612")
+        c.watch("uuid-webtv-201")
+        try:
+            # Requêtes simultanées de trois appelants : une seule part
+            results = await asyncio.gather(a.refresh_ad_breaks("536"), b.refresh_ad_breaks("536"),
+                                           root.refresh_ad_breaks("536"))
+            served = (a.ad_breaks_channel, b.ad_breaks_channel, c.ad_breaks_channel)
+            await c.close()  # Une vue ne ferme pas la session partagée
+            assert not root._session.closed
+            root.set_channel_mapping({"uuid-webtv-612": "536", "uuid-webtv-201": "536"})
+        finally:
+            await root.close()
+            await runner.cleanup()
+        return results, served, updates, (a, b, c)
+
+    results, served, updates, (a, b, c) = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert a.shared is b.shared is c.shared and len(a.shared.clients) == 4
+    assert oqee.requests["anti_adskipping"] == 1
+    assert served == ("uuid-webtv-612", "uuid-webtv-612", None)
+    assert updates == ["b"]
+    assert all(view.channel_mapping["uuid-webtv-201"] == "536" for view in (a, b, c))
+    assert c.ad_breaks_channel == "uuid-webtv-201" and c.ad_breaks[0].start_time == now + 600
+    print("✅ 1 requête pour 3 appelants, planning poussé aux vues, mapping propagé\n")
+
+
+def test_views_share_settings_and_capture():
+    """Réglages et capture posés sur une vue valent pour le client d'origine (et le préchauffage)."""
+    print("🧪 Test état partagé des vues\n")
+
+    class Recorder:
+        def __init__(self):
+            self.paths = []
+
+        def record(self, kind, data, latency, path=None, status=200):
+            self.paths.append(path)
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)])
+    recorder = Recorder()
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        root = OqeeClient(channel_mapping=MAPPING, base_url=url)
+        view = root.view()
+        view.capture = recorder
+        view.max_staleness, view.refresh_max = 45, 12
+        try:
+            # Fetch du client d'origine, comme le préchauffage
+            await root.refresh_ad_breaks("537")
+        finally:
+            await root.close()
+            await runner.cleanup()
+        return root, view
+
+    root, view = asyncio.run(scenario())
+    assert recorder.paths == ["/live/anti_adskipping/537"], recorder.paths
+    assert (root.max_staleness, root.refresh_max) == (45, 12)
+    assert root.capture is recorder and view.ad_breaks_channel is None
+    print("✅ Capture et cadence communes, planning servi propre à chaque vue\n")
+
+
+def test_unreachable_player_is_dropped():
+    """Un player injoignable au démarrage est écarté, les autres tournent."""
+    print("🧪 Test player injoignable\n")
+
+    class Unreachable(FakeFreeboxClient):
+        async def connect(self):
+            raise ConnectionError("box éteinte")
+
+    async def scenario():
+        supervisor = Supervisor(
+            {"salon": FakeFreeboxClient(), "chambre": Unreachable()},
+            OqeeClient(channel_mapping={}, base_url="http://127.0.0.1:9"),
+        )
+        async with supervisor:
+            await supervisor.engines["salon"].run_step()
+            names = list(supervisor.engines)
+        return names
+
+    assert asyncio.run(scenario()) == ["salon"]
+    print("✅ Seul le player joignable est supervisé\n")
+
+
+if __name__ == "__main__":
+    test_parse_players()
+    test_oqee_requests_scale_with_channels()
+    test_shared_refresh_serves_every_viewer()
+    test_views_share_settings_and_capture()
+    test_unreachable_player_is_dropped()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)
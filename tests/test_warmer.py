@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests du préchauffage des chaînes (sélection des chaînes, zapping servi depuis la mémoire).
+"""
+import sys
+sys.path.insert(0, 'src')
+sys.path.insert(0, 'benchmarks')
+
+import asyncio
+import time
+
+from fakes import FakeOqee, start_server
+from freetv.core.metrics import OQEE_AD_CACHE
+from freetv.core.oqee import OqeeClient
+from freetv.core.warmer import ScheduleWarmer
+
+MAPPING = {"uuid-webtv-612": "536", "uuid-webtv-201": "201", "uuid-webtv-202": "202", "uuid-webtv-203": "203"}
+
+
+def warmed_channels(channel_uuids=None, watched=None):
+    """Chaînes rafraîchies (pubs et EPG) par un tour de préchauffage, sans réseau."""
+    client = OqeeClient(channel_mapping=MAPPING)
+    client.watch(watched)
+    refreshed = {"ads": set(), "epg": set()}
+
+    async def refresh_ad_breaks(channel_id, priority):
+        refreshed["ads"].add(channel_id)
+
+    async def refresh_epg(channel_id, priority):
+        refreshed["epg"].add(channel_id)
+
+    client.refresh_ad_breaks, client.refresh_epg = refresh_ad_breaks, refresh_epg
+    warmer = ScheduleWarmer(client, channel_uuids)
+    asyncio.run(warmer.warm_once())
+    assert refreshed["ads"] == refreshed["epg"], refreshed
+    assert warmer.rounds == 1
+    return refreshed["ads"]
+
+
+def test_channel_selection():
+    """Tout le mapping par défaut, sinon la liste donnée ; jamais la chaîne regardée ni une chaîne non mappée."""
+    print("🧪 Test sélection des chaînes\n")
+
+    assert warmed_channels() == {"536", "201", "202", "203"}
+    assert warmed_channels(watched="uuid-webtv-612") == {"201", "202", "203"}
+    assert warmed_channels(["uuid-webtv-201", "uuid-webtv-612", "uuid-inconnue"], watched="uuid-webtv-612") == {"201"}
+    assert warmed_channels([]) == set()
+    print("✅ Mapping courant ou liste explicite, chaîne regardée et inconnues exclues\n")
+
+
+def test_zapping_hits_and_misses():
+    """Zapping vers une chaîne préchauffée : servi sans fetch (hit) ; vers une autre : miss."""
+    print("🧪 Test compteurs hit/miss du zapping\n")
+
+    now = int(time.time())
+    oqee = FakeOqee([(now + 600, now + 780)])
+
+    async def scenario():
+        runner, url = await start_server(oqee.app())
+        client = OqeeClient(channel_mapping=MAPPING, base_url=url)
+        warmer = ScheduleWarmer(client, ["uuid-webtv-201", "uuid-webtv-202"], interval=0.05)
+        try:
+            warmer.start()
+            await asyncio.sleep(0.2)
+            await warmer.stop()
+            requests = oqee.requests["anti_adskipping"]
+            client.watch("uuid-webtv-201")
+            warm = (client.ad_breaks_channel, len(client.ad_breaks))
+            client.watch("uuid-webtv-203")
+            cold = (client.ad_breaks_channel, len(client.ad_breaks))
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client, warmer.rounds, requests, warm, cold
+
+    hits, misses = OQEE_AD_CACHE.value("watch", "hit"), OQEE_AD_CACHE.value("watch", "miss")
+    client, rounds, requests, warm, cold = asyncio.run(scenario())
+    assert rounds >= 2 and requests >= 2 * rounds, (rounds, requests)
+    assert warm == ("uuid-webtv-201", 1) and cold == (None, 0), (warm, cold)
+    assert client.cache_hits == 1 and client.cache_misses == 1
+    assert OQEE_AD_CACHE.value("watch", "hit") - hits == 1
+    assert OQEE_AD_CACHE.value("watch", "miss") - misses == 1
+    assert oqee.requests["anti_adskipping"] == requests, "Le zapping ne doit rien demander à OQEE"
+    print(f"✅ {rounds} tours de préchauffage, chaîne préchauffée servie depuis la mémoire\n")
+
+
+if __name__ == "__main__":
+    test_channel_selection()
+    test_zapping_hits_and_misses()
+    print("=" * 60)
+    print("✅ Tous les tests sont passés avec succès !")
+    print("=" * 60)